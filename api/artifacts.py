@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from typing import List, Dict, Any, Optional
+import os
+
+from models.artifact import ArtifactRequest
+from service.artifact_service import ArtifactService
+
+# Create router
+router = APIRouter()
+
+# Media type of a downloaded artifact by kind
+MEDIA_TYPES = {
+    "file": "application/octet-stream",
+    "directory": "application/x-tar",
+    "bugreport": "application/zip"
+}
+
+# Dependency to get the shared ArtifactService instance
+def get_artifact_service(request: Request) -> ArtifactService:
+    """Get the shared ArtifactService instance from app.state"""
+    return request.app.state.artifact_service
+
+@router.post("/")
+async def pull_artifacts(
+    pull_request: ArtifactRequest,
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> List[Dict[str, Any]]:
+    """
+    Pull a file, directory or bugreport from one or more devices.
+    
+    Pulls run in the background, in parallel across devices; poll
+    GET /artifacts/{artifact_id} or watch artifact_update events on the
+    device topics for progress.
+    """
+    try:
+        return await artifact_service.pull(
+            pull_request.device_ids, pull_request.kind, pull_request.path, pull_request.scan_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/")
+async def get_artifacts(
+    device_id: Optional[str] = None,
+    scan_id: Optional[int] = None,
+    limit: int = 100,
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> List[Dict[str, Any]]:
+    """Get artifacts, newest first, optionally only those of a device or scan."""
+    if limit < 1 or limit > 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return await artifact_service.list_artifacts(device_id, scan_id, limit)
+
+@router.get("/stats")
+async def get_artifact_stats(
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> Dict[str, Any]:
+    """Get the number of running and queued pulls and the current throughput."""
+    return await artifact_service.stats()
+
+@router.get("/{artifact_id}")
+async def get_artifact(
+    artifact_id: int,
+    wait: float = 0,
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> Dict[str, Any]:
+    """
+    Get an artifact and the progress of its pull.
+    
+    With wait > 0 the request is held until the pull finishes or `wait`
+    seconds pass (long-polling).
+    """
+    if wait < 0 or wait > 60:
+        raise HTTPException(status_code=400, detail="wait must be between 0 and 60 seconds")
+    artifact = await artifact_service.get_artifact(artifact_id, wait)
+    if not artifact:
+        raise HTTPException(status_code=404, detail=f"Artifact with ID {artifact_id} not found")
+    return artifact
+
+@router.get("/{artifact_id}/download")
+async def download_artifact(
+    artifact_id: int,
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> FileResponse:
+    """Download a pulled artifact; the SHA-256 of the content is sent as the ETag."""
+    artifact = await artifact_service.get_artifact(artifact_id)
+    if not artifact:
+        raise HTTPException(status_code=404, detail=f"Artifact with ID {artifact_id} not found")
+    if artifact["status"] != "completed" or not os.path.exists(artifact["local_path"]):
+        raise HTTPException(status_code=404, detail=f"Artifact with ID {artifact_id} is not available")
+    
+    return FileResponse(
+        artifact["local_path"],
+        media_type=MEDIA_TYPES.get(artifact["kind"], "application/octet-stream"),
+        filename=os.path.basename(artifact["local_path"]),
+        headers={"ETag": f'"{artifact["sha256"]}"'}
+    )
+
+@router.delete("/{artifact_id}")
+async def delete_artifact(
+    artifact_id: int,
+    artifact_service: ArtifactService = Depends(get_artifact_service)
+) -> Dict[str, Any]:
+    """Delete an artifact and its file, cancelling the pull if it is still running."""
+    if not await artifact_service.delete_artifact(artifact_id):
+        raise HTTPException(status_code=404, detail=f"Artifact with ID {artifact_id} not found")
+    return {"status": "Artifact deleted", "artifact_id": artifact_id}
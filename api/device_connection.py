@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, BackgroundTasks, Request
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 
 from service.device_service import DeviceService
@@ -16,10 +16,14 @@ def get_device_service(request: Request) -> DeviceService:
 
 @router.get("/connected")
 async def get_connected_devices(
+    include_lost: bool = False,
     device_service: DeviceService = Depends(get_device_service)
 ) -> List[Dict[str, Any]]:
-    """Get all connected devices."""
-    return await device_service.get_connected_devices()
+    """
+    Get all tracked devices with their lifecycle state
+    (discovered, unauthorized, authorizing, failed, ready, scanning, lost).
+    """
+    return await device_service.get_connected_devices(include_lost)
 
 @router.get("/{device_id}")
 async def get_device_info(
@@ -52,14 +56,26 @@ async def stop_device_polling(
 @router.post("/wait")
 async def wait_for_device(
     timeout: int = 30,
+    device_id: Optional[str] = None,
+    brand: Optional[str] = None,
+    new: bool = False,
     device_service: DeviceService = Depends(get_device_service)
 ) -> Dict[str, Any]:
-    """Wait for a device to be connected."""
-    device_id = await device_service.wait_for_device(timeout)
+    """
+    Wait for a device to be connected and ready.
+    
+    Optionally only a specific device (device_id), a brand, or a device
+    that becomes ready after the request was made (new=true).
+    """
+    if timeout < 0 or timeout > 600:
+        raise HTTPException(status_code=400, detail="timeout must be between 0 and 600 seconds")
+    
+    device_id = await device_service.wait_for_device(timeout, device_id=device_id, brand=brand, new_only=new)
     if not device_id:
         return {"status": "timeout", "message": "No device connected within timeout period"}
     
     return {
         "status": "connected",
-        "device_id": device_id
+        "device_id": device_id,
+        "device": await device_service.get_device_info(device_id)
     }
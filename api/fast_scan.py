@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import Dict, Any
 import json
 
 from service.scan_service import ScanService
+from api.http_cache import scan_validators, is_not_modified, not_modified_response, json_response
 
 # Create router
 router = APIRouter()
@@ -14,33 +15,44 @@ def get_scan_service(request: Request) -> ScanService:
 @router.post("/{device_id}")
 async def perform_fast_scan(
     device_id: str,
-    background_tasks: BackgroundTasks,
     scan_service: ScanService = Depends(get_scan_service)
 ) -> Dict[str, Any]:
     """Initiate a fast scan (basic device info) in background."""
-    background_tasks.add_task(scan_service.fast_scan, device_id)
+    job = scan_service.start_scan_job(device_id, "fast")
     return {
         "status": "Scan started",
         "device_id": device_id,
         "scan_type": "fast",
-        "message": "Fast scan initiated. Progress will be sent via WebSocket."
+        "job_id": job.id,
+        "message": "Fast scan initiated. Progress will be sent via WebSocket; "
+                   f"GET /scan/jobs/{job.id}?wait=30 returns the result."
     }
 
 @router.get("/{device_id}/last")
 async def get_last_fast_scan(
     device_id: str,
+    request: Request,
     scan_service: ScanService = Depends(get_scan_service)
-) -> Dict[str, Any]:
+) -> Response:
     """Get the most recent fast scan result for a device."""
-    scans = await scan_service.get_scans_by_device_id(device_id)
+    meta = await scan_service.get_latest_scan_meta(device_id, "fast")
+    
+    if not meta:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No fast scan results found for device {device_id}"
+        )
     
-    # Filter for fast scans and get the latest
-    fast_scans = [scan for scan in scans if scan["scan_type"] == "fast"]
+    headers = scan_validators(meta)
+    if is_not_modified(request, headers):
+        return not_modified_response(request, headers)
     
-    if not fast_scans:
+    # Stored JSON is passed through without being decoded and re-encoded
+    scan = await scan_service.get_scan_json_by_id(meta["id"])
+    if not scan:
         raise HTTPException(
             status_code=404,
             detail=f"No fast scan results found for device {device_id}"
         )
     
-    return fast_scans[0]  # Return the most recent scan
+    return json_response(request, scan, headers)
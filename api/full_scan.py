@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import Dict, Any
 import json
 
 from service.scan_service import ScanService
+from api.http_cache import scan_validators, is_not_modified, not_modified_response, json_response
 from service.device_service import DeviceService
 
 # Create router
@@ -20,7 +21,6 @@ def get_device_service(request: Request) -> DeviceService:
 @router.post("/{device_id}")
 async def perform_full_scan(
     device_id: str,
-    background_tasks: BackgroundTasks,
     scan_service: ScanService = Depends(get_scan_service),
     device_service: DeviceService = Depends(get_device_service)
 ) -> Dict[str, Any]:
@@ -38,33 +38,45 @@ async def perform_full_scan(
         )
     
     # Perform scan in background to not block the response
-    background_tasks.add_task(scan_service.full_scan, device_id)
+    job = scan_service.start_scan_job(device_id, "full")
     
     return {
         "status": "Scan started",
         "device_id": device_id,
         "scan_type": "full",
-        "message": "Full scan initiated. Progress will be sent via WebSocket."
+        "job_id": job.id,
+        "message": "Full scan initiated. Progress will be sent via WebSocket; "
+                   f"GET /scan/jobs/{job.id}?wait=30 returns the result."
     }
 
 @router.get("/{device_id}/last")
 async def get_last_full_scan(
     device_id: str,
+    request: Request,
     scan_service: ScanService = Depends(get_scan_service)
-) -> Dict[str, Any]:
+) -> Response:
     """Get the most recent full scan result for a device."""
-    scans = await scan_service.get_scans_by_device_id(device_id)
+    meta = await scan_service.get_latest_scan_meta(device_id, "full")
+    
+    if not meta:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No full scan results found for device {device_id}"
+        )
     
-    # Filter for full scans and get the latest
-    full_scans = [scan for scan in scans if scan["scan_type"] == "full"]
+    headers = scan_validators(meta)
+    if is_not_modified(request, headers):
+        return not_modified_response(request, headers)
     
-    if not full_scans:
+    # Stored JSON is passed through without being decoded and re-encoded
+    scan = await scan_service.get_scan_json_by_id(meta["id"])
+    if not scan:
         raise HTTPException(
             status_code=404,
             detail=f"No full scan results found for device {device_id}"
         )
     
-    return full_scans[0]  # Return the most recent scan
+    return json_response(request, scan, headers)
 
 @router.get("/{device_id}/compare/{scan_id_1}/{scan_id_2}")
 async def compare_full_scans(
@@ -74,72 +86,34 @@ async def compare_full_scans(
     scan_service: ScanService = Depends(get_scan_service)
 ) -> Dict[str, Any]:
     """Compare two full scan results."""
-    # Get the scan results
-    scan1 = await scan_service.get_scan_by_id(scan_id_1)
-    scan2 = await scan_service.get_scan_by_id(scan_id_2)
+    try:
+        comparison = await scan_service.compare_scans(device_id, scan_id_1, scan_id_2)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if not scan1 or not scan2:
+    if not comparison:
         raise HTTPException(
             status_code=404,
             detail="One or both scan IDs not found"
         )
     
-    if scan1["device_id"] != device_id or scan2["device_id"] != device_id:
+    return comparison
+
+@router.get("/{device_id}/timeline")
+async def get_full_scan_timeline(
+    device_id: str,
+    limit: int = 10,
+    scan_service: ScanService = Depends(get_scan_service)
+) -> Dict[str, Any]:
+    """Get the differences between each of a device's most recent full scans."""
+    if limit < 2 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 2 and 100")
+    
+    timeline = await scan_service.get_scan_timeline(device_id, "full", limit)
+    if not timeline["scans"]:
         raise HTTPException(
-            status_code=400,
-            detail="Both scans must be for the specified device"
+            status_code=404,
+            detail=f"No full scan results found for device {device_id}"
         )
     
-    # Calculate differences between the scans
-    differences = {}
-    scan1_data = scan1["scan_data"]
-    scan2_data = scan2["scan_data"]
-    
-    # Check basic device info differences
-    for key in ["android_version", "security_patch", "kernel_version", 
-                "baseband_version", "bootloader_locked"]:
-        if key in scan1_data and key in scan2_data and scan1_data[key] != scan2_data[key]:
-            differences[key] = {
-                "scan1": scan1_data[key],
-                "scan2": scan2_data[key]
-            }
-    
-    # Check storage differences
-    if "storage" in scan1_data and "storage" in scan2_data:
-        storage_diff = {}
-        for key in ["total", "available"]:
-            if key in scan1_data["storage"] and key in scan2_data["storage"] and \
-               scan1_data["storage"][key] != scan2_data["storage"][key]:
-                storage_diff[key] = {
-                    "scan1": scan1_data["storage"][key],
-                    "scan2": scan2_data["storage"][key]
-                }
-        if storage_diff:
-            differences["storage"] = storage_diff
-    
-    # Check app differences if available
-    if "installed_apps" in scan1_data and "installed_apps" in scan2_data:
-        apps1 = set(scan1_data["installed_apps"])
-        apps2 = set(scan2_data["installed_apps"])
-        
-        newly_installed = list(apps2 - apps1)
-        removed = list(apps1 - apps2)
-        
-        if newly_installed or removed:
-            differences["installed_apps"] = {
-                "newly_installed": newly_installed,
-                "removed": removed
-            }
-    
-    return {
-        "device_id": device_id,
-        "scan1": {
-            "id": scan_id_1,
-            "timestamp": scan1["created_at"]
-        },
-        "scan2": {
-            "id": scan_id_2,
-            "timestamp": scan2["created_at"]
-        },
-        "differences": differences
-    }
+    return timeline
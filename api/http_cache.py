@@ -0,0 +1,134 @@
+from fastapi import Request, Response
+from typing import Dict, Any, Iterable, Iterator, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import gzip
+import zlib
+
+# JSON bodies smaller than this are sent uncompressed.
+GZIP_MIN_SIZE = 4 * 1024
+
+# Appended to an ETag when the body is gzip-compressed; the compressed and
+# identity bodies are different representations and need different tags
+GZIP_ETAG_SUFFIX = "-gzip"
+
+def _created_at(meta: Dict[str, Any]) -> Optional[datetime]:
+    """Parse a stored created_at (SQLite CURRENT_TIMESTAMP, UTC)."""
+    try:
+        created_at = datetime.fromisoformat(str(meta["created_at"]))
+    except (TypeError, ValueError):
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at
+
+def scan_validators(meta: Dict[str, Any], variant: str = "") -> Dict[str, str]:
+    """
+    Build ETag and Last-Modified headers for a scan.
+
+    Scans never change after being written, so the ETag is strong. It combines
+    the scan ID with the content hash stored at write time; rows written
+    before content hashes existed fall back to their creation time. The tag
+    is that of the uncompressed body; see gzip_etag().
+
+    Args:
+        meta: Dictionary with id, created_at and content_hash
+        variant: Distinguishes representations of the same scan (e.g. "csv")
+
+    Returns:
+        Dictionary of response headers
+    """
+    version = meta.get("content_hash") or str(meta.get("created_at", "")).replace(" ", "T")
+    tag = f'{meta["id"]}-{version[:16]}'
+    if variant:
+        tag += f"-{variant}"
+
+    headers = {"ETag": f'"{tag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    created_at = _created_at(meta)
+    if created_at:
+        headers["Last-Modified"] = format_datetime(created_at, usegmt=True)
+    return headers
+
+def gzip_etag(etag: str) -> str:
+    """The ETag of the gzip-compressed form of a representation."""
+    return f'{etag[:-1]}{GZIP_ETAG_SUFFIX}"'
+
+def _matching_etag(request: Request, headers: Dict[str, str]) -> Optional[str]:
+    """The ETag, plain or gzip, listed in If-None-Match, if any."""
+    etag = headers["ETag"]
+    candidates = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    # Weak comparison applies to If-None-Match
+    for tag in (etag, gzip_etag(etag)):
+        if tag in candidates:
+            return tag
+    return etag if "*" in candidates else None
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against response validators.
+
+    A client holding either the identity or the gzip representation gets a 304.
+
+    Args:
+        request: The incoming request
+        headers: Validators produced by scan_validators()
+
+    Returns:
+        True if the client's copy is current and a 304 should be sent
+    """
+    if request.headers.get("if-none-match") is not None:
+        return _matching_etag(request, headers) is not None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+def not_modified_response(request: Request, headers: Dict[str, str]) -> Response:
+    """A 304 response carrying the validators, with the ETag of the representation the client holds."""
+    etag = _matching_etag(request, headers)
+    if etag:
+        headers = {**headers, "ETag": etag}
+    return Response(status_code=304, headers=headers)
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether the client's Accept-Encoding allows gzip."""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def json_response(request: Request, body: bytes, headers: Dict[str, str]) -> Response:
+    """
+    Send pre-encoded JSON, gzip-compressed when large and the client accepts it.
+
+    Args:
+        request: The incoming request
+        body: UTF-8 JSON
+        headers: Additional response headers (e.g. validators); an ETag
+            gets the gzip suffix when the body is compressed
+
+    Returns:
+        The response
+    """
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_SIZE and accepts_gzip(request):
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+        if "ETag" in headers:
+            headers["ETag"] = gzip_etag(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a stream of chunks as they are produced."""
+    compressor = zlib.compressobj(5, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
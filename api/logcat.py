@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Dict, Any, Optional
+
+from service.logcat_service import LogcatService
+
+# Create router
+router = APIRouter()
+
+# Most records a single page may return
+MAX_PAGE = 5000
+
+# Dependency to get the shared LogcatService instance
+def get_logcat_service(request: Request) -> LogcatService:
+    """Get the shared LogcatService instance from app.state"""
+    return request.app.state.logcat_service
+
+def _tag_list(tags: Optional[str]) -> Optional[List[str]]:
+    return [tag for tag in tags.split(",") if tag] if tags else None
+
+@router.get("/sessions")
+async def get_logcat_sessions(
+    logcat_service: LogcatService = Depends(get_logcat_service)
+) -> List[Dict[str, Any]]:
+    """Get the state and counters of every logcat capture."""
+    return await logcat_service.sessions()
+
+@router.post("/{device_id}/start")
+async def start_logcat(
+    device_id: str,
+    priority: Optional[str] = None,
+    tags: Optional[str] = None,
+    pattern: Optional[str] = None,
+    spill: bool = False,
+    logcat_service: LogcatService = Depends(get_logcat_service)
+) -> Dict[str, Any]:
+    """
+    Start capturing a device's logcat, or change the filter of a running capture.
+    
+    Only records at or above `priority`, with one of the comma-separated
+    `tags` and whose message matches the regular expression `pattern` are
+    kept. With spill=true lines are also written to a rotating gzip file.
+    """
+    try:
+        return await logcat_service.start(device_id, priority, _tag_list(tags), pattern, spill)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/{device_id}/stop")
+async def stop_logcat(
+    device_id: str,
+    logcat_service: LogcatService = Depends(get_logcat_service)
+) -> Dict[str, Any]:
+    """Stop capturing a device's logcat."""
+    if not await logcat_service.stop(device_id):
+        raise HTTPException(status_code=404, detail=f"Logcat of device {device_id} is not being captured")
+    return {"status": "Logcat capture stopped", "device_id": device_id}
+
+@router.get("/{device_id}")
+async def get_logcat(
+    device_id: str,
+    after: Optional[int] = None,
+    limit: int = 500,
+    priority: Optional[str] = None,
+    tags: Optional[str] = None,
+    pattern: Optional[str] = None,
+    logcat_service: LogcatService = Depends(get_logcat_service)
+) -> Dict[str, Any]:
+    """
+    Get a page of a device's captured logcat records.
+    
+    Without `after` the newest records are returned; pass the returned
+    `next` as `after` to page forward. Records are lists in `fields` order.
+    """
+    if limit < 1 or limit > MAX_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE}")
+    
+    try:
+        page = await logcat_service.query(device_id, after, limit, priority, _tag_list(tags), pattern)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Logcat of device {device_id} is not being captured")
+    return page
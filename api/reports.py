@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
-from fastapi.responses import JSONResponse, FileResponse
-from typing import Dict, Any, List
-import json
-import tempfile
-import os
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from models.scan_result import ReportBatchRequest
 from service.scan_service import ScanService
+from service.report_service import ReportService, REPORT_FORMATS, ArchiveTooLarge
+from api.http_cache import (
+    scan_validators, is_not_modified, not_modified_response,
+    accepts_gzip, gzip_etag, json_response, gzip_chunks
+)
 
 # Create router
 router = APIRouter()
@@ -16,6 +19,10 @@ def get_scan_service(request: Request) -> ScanService:
     """Get the shared ScanService instance from app.state"""
     return request.app.state.scan_service
 
+def get_report_service(request: Request) -> ReportService:
+    """Get the shared ReportService instance from app.state"""
+    return request.app.state.report_service
+
 @router.get("/")
 async def get_all_reports(
     limit: int = 50,
@@ -24,16 +31,114 @@ async def get_all_reports(
     """Get all scan reports with optional limit."""
     return await scan_service.get_all_scans(limit)
 
+@router.get("/export")
+async def export_reports(
+    device_id: Optional[str] = None,
+    scan_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    report_service: ReportService = Depends(get_report_service)
+) -> Response:
+    """
+    Stream selected scans as a gzip-compressed NDJSON archive.
+    
+    since/until are timestamps in the stored format (YYYY-MM-DD HH:MM:SS).
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        report_service.export_scans(device_id, scan_type, since, until),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="scans_{timestamp}.ndjson.gz"'}
+    )
+
+@router.post("/import")
+async def import_reports(
+    request: Request,
+    report_service: ReportService = Depends(get_report_service)
+) -> Dict[str, Any]:
+    """
+    Import a scan archive produced by /reports/export.
+    
+    The request body is read as a stream; gzip and plain NDJSON are accepted.
+    Scans already present (same device_id, created_at and scan_type) are skipped.
+    Archives larger than 1 GiB once decompressed are rejected with 413.
+    """
+    try:
+        result = await report_service.import_scans(request.stream())
+    except ArchiveTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"status": "success", **result}
+
+@router.post("/batch")
+async def get_reports_batch(
+    batch: ReportBatchRequest,
+    report_service: ReportService = Depends(get_report_service)
+) -> Response:
+    """
+    Fetch several reports in one request.
+    
+    Results are streamed as a JSON array in the order of scan_ids; IDs that
+    do not exist appear as {"id": ..., "error": "not_found"}.
+    """
+    return StreamingResponse(
+        report_service.batch_reports(batch.scan_ids, batch.fields),
+        media_type="application/json"
+    )
+
+@router.get("/search/packages")
+async def search_packages(
+    q: str,
+    match: str = "exact",
+    limit: int = 50,
+    offset: int = 0,
+    scan_service: ScanService = Depends(get_scan_service)
+) -> Dict[str, Any]:
+    """
+    Find devices whose latest full scan contains a package.
+    
+    match is one of exact, prefix or wildcard (* and ? patterns).
+    """
+    if match not in ("exact", "prefix", "wildcard"):
+        raise HTTPException(status_code=400, detail=f"Match mode '{match}' not supported")
+    if limit < 1 or limit > 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-500 and offset non-negative")
+    
+    result = await scan_service.search_packages(q, match, limit, offset)
+    return {
+        "query": q,
+        "match": match,
+        "limit": limit,
+        "offset": offset,
+        **result
+    }
+
+@router.get("/cache/stats")
+async def get_report_cache_stats(
+    scan_service: ScanService = Depends(get_scan_service)
+) -> Dict[str, Any]:
+    """Get hit/miss/eviction counters of the report cache."""
+    return scan_service.get_cache_stats()
+
 @router.get("/{scan_id}")
 async def get_report_by_id(
     scan_id: int,
+    request: Request,
     scan_service: ScanService = Depends(get_scan_service)
-) -> Dict[str, Any]:
+) -> Response:
     """Get a specific scan report by ID."""
-    report = await scan_service.get_scan_by_id(scan_id)
+    meta = await scan_service.get_scan_meta(scan_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail=f"Report with ID {scan_id} not found")
+    
+    headers = scan_validators(meta)
+    if is_not_modified(request, headers):
+        return not_modified_response(request, headers)
+    
+    # Stored JSON is passed through without being decoded and re-encoded
+    report = await scan_service.get_scan_json_by_id(scan_id)
     if not report:
         raise HTTPException(status_code=404, detail=f"Report with ID {scan_id} not found")
-    return report
+    return json_response(request, report, headers)
 
 @router.get("/device/{device_id}")
 async def get_reports_by_device(
@@ -46,39 +151,41 @@ async def get_reports_by_device(
 @router.get("/{scan_id}/download")
 async def download_report(
     scan_id: int,
+    request: Request,
     format: str = "json",
-    scan_service: ScanService = Depends(get_scan_service)
+    scan_service: ScanService = Depends(get_scan_service),
+    report_service: ReportService = Depends(get_report_service)
 ) -> Response:
     """
     Download a scan report in the specified format.
     
-    Currently supported formats: json
+    Supported formats: json, ndjson, csv (one row per installed app), html.
+    The report is streamed from the database row without temporary files.
     """
-    report = await scan_service.get_scan_by_id(scan_id)
+    format = format.lower()
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format '{format}' not supported")
+    
+    meta = await scan_service.get_scan_meta(scan_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail=f"Report with ID {scan_id} not found")
+    
+    headers = scan_validators(meta, variant=format)
+    if is_not_modified(request, headers):
+        return not_modified_response(request, headers)
+    
+    report = await report_service.open_report(scan_id, format)
     if not report:
         raise HTTPException(status_code=404, detail=f"Report with ID {scan_id} not found")
     
-    if format.lower() == "json":
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as temp_file:
-            temp_file.write(json.dumps(report, indent=2).encode('utf-8'))
-            temp_path = temp_file.name
-        
-        # Generate filename based on device info and scan date
-        device_model = report.get("model", "unknown")
-        device_id = report.get("device_id", "unknown")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"scan_{device_model}_{device_id}_{timestamp}.json"
-        
-        # Return the file for download
-        return FileResponse(
-            path=temp_path,
-            filename=filename,
-            media_type="application/json",
-            background=tempfile.TemporaryFile  # Clean up the file after sending
-        )
-    else:
-        raise HTTPException(status_code=400, detail=f"Format '{format}' not supported")
+    content = report["content"]
+    headers["Content-Disposition"] = f'attachment; filename="{report["filename"]}"'
+    if accepts_gzip(request):
+        content = gzip_chunks(content)
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = gzip_etag(headers["ETag"])
+    
+    return StreamingResponse(content, media_type=report["media_type"], headers=headers)
 
 @router.delete("/{scan_id}")
 async def delete_report(
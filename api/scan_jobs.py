@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Dict, Any
+
+from service.scan_service import ScanService
+
+# Create router
+router = APIRouter()
+
+# Longest a single request may wait for a job, in seconds
+MAX_WAIT = 60
+
+# Dependency to get shared ScanService
+def get_scan_service(request: Request) -> ScanService:
+    """Get the shared ScanService instance from app.state"""
+    return request.app.state.scan_service
+
+@router.get("/{job_id}")
+async def get_scan_job(
+    job_id: str,
+    wait: float = 0,
+    scan_service: ScanService = Depends(get_scan_service)
+) -> Dict[str, Any]:
+    """
+    Get the state of a scan job.
+    
+    With wait > 0 the request is held open (long-poll) until the scan
+    finishes or the wait expires, whichever comes first; the finished scan
+    is included as "result".
+    """
+    if wait < 0 or wait > MAX_WAIT:
+        raise HTTPException(status_code=400, detail=f"wait must be between 0 and {MAX_WAIT} seconds")
+    
+    job = await scan_service.wait_for_job(job_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Scan job {job_id} not found")
+    
+    return job
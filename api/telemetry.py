@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Dict, Any, Optional
+
+from service.telemetry_service import TelemetryService
+
+# Create router
+router = APIRouter()
+
+# Most points a single range query may return
+MAX_POINTS = 10000
+
+# Dependency to get the shared TelemetryService instance
+def get_telemetry_service(request: Request) -> TelemetryService:
+    """Get the shared TelemetryService instance from app.state"""
+    return request.app.state.telemetry_service
+
+@router.post("/start")
+async def start_telemetry(
+    interval: float = 1.0,
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+) -> Dict[str, Any]:
+    """Start sampling every ready device every `interval` seconds."""
+    if interval < 0.2 or interval > 3600:
+        raise HTTPException(status_code=400, detail="interval must be between 0.2 and 3600 seconds")
+    await telemetry_service.start(interval)
+    return {"status": "Telemetry sampling started", "interval": interval}
+
+@router.post("/stop")
+async def stop_telemetry(
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+) -> Dict[str, Any]:
+    """Stop sampling."""
+    await telemetry_service.stop()
+    return {"status": "Telemetry sampling stopped"}
+
+@router.get("/stats")
+async def get_telemetry_stats(
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+) -> Dict[str, Any]:
+    """Get sampling counters."""
+    return await telemetry_service.stats()
+
+@router.get("/{device_id}")
+async def get_telemetry_series(
+    device_id: str,
+    resolution: str = "raw",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    metrics: Optional[str] = None,
+    limit: int = 3600,
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+) -> Dict[str, Any]:
+    """
+    Get a device's telemetry between two Unix times.
+    
+    resolution is "raw" (in-memory samples) or a stored rollup: "1s", "1m"
+    or "1h". metrics is a comma-separated subset of the sampled metrics.
+    """
+    if limit < 1 or limit > MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_POINTS}")
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    metric_list = [metric for metric in metrics.split(",") if metric] if metrics else None
+    try:
+        return await telemetry_service.get_series(device_id, resolution, start, end, metric_list, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{device_id}/latest")
+async def get_latest_telemetry(
+    device_id: str,
+    telemetry_service: TelemetryService = Depends(get_telemetry_service)
+) -> Dict[str, Any]:
+    """Get a device's most recent telemetry sample."""
+    latest = await telemetry_service.get_latest(device_id)
+    if not latest:
+        raise HTTPException(status_code=404, detail=f"No telemetry for device {device_id}")
+    return latest
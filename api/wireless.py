@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Dict, Any
+
+from models.wireless import WirelessTargetsRequest
+from service.wireless_service import WirelessService
+
+# Create router
+router = APIRouter()
+
+# Dependency to get the shared WirelessService instance
+def get_wireless_service(request: Request) -> WirelessService:
+    """Get the shared WirelessService instance from app.state"""
+    return request.app.state.wireless_service
+
+@router.get("/targets")
+async def get_wireless_targets(
+    wireless_service: WirelessService = Depends(get_wireless_service)
+) -> List[Dict[str, Any]]:
+    """Get every wireless target with its connection state."""
+    return await wireless_service.get_targets()
+
+@router.post("/targets")
+async def add_wireless_targets(
+    targets_request: WirelessTargetsRequest,
+    wait: float = 0,
+    wireless_service: WirelessService = Depends(get_wireless_service)
+) -> List[Dict[str, Any]]:
+    """
+    Add devices reached over Wi-Fi and connect them in parallel.
+    
+    They are kept connected from then on (also across restarts) and show up
+    in /device/connected under their address. With wait > 0 the response
+    waits up to `wait` seconds for the first connection attempts.
+    """
+    if wait < 0 or wait > 60:
+        raise HTTPException(status_code=400, detail="wait must be between 0 and 60 seconds")
+    try:
+        return await wireless_service.add_targets(targets_request.addresses, wait)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/targets/{address}/reconnect")
+async def reconnect_wireless_target(
+    address: str,
+    wireless_service: WirelessService = Depends(get_wireless_service)
+) -> Dict[str, Any]:
+    """Drop and re-establish a target's connection now, skipping any backoff."""
+    try:
+        target = await wireless_service.reconnect(address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if target is None:
+        raise HTTPException(status_code=404, detail=f"Wireless target {address} not found")
+    return target
+
+@router.delete("/targets/{address}")
+async def remove_wireless_target(
+    address: str,
+    wireless_service: WirelessService = Depends(get_wireless_service)
+) -> Dict[str, Any]:
+    """Stop managing a target and disconnect it."""
+    try:
+        removed = await wireless_service.remove_target(address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Wireless target {address} not found")
+    return {"status": "Wireless target removed", "address": address}
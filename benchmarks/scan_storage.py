@@ -0,0 +1,167 @@
+"""
+Compare how full scans are stored: legacy JSON TEXT rows against the
+current format-prefixed, compressed BLOBs with deduplicated app sets.
+
+Fills two temporary databases with the same realistic full-scan payloads
+and reports file size and save/get latency for each:
+
+    python benchmarks/scan_storage.py
+    python benchmarks/scan_storage.py --devices 50 --scans 10 --apps 600
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repositories.db_repository import DBRepository
+
+VENDORS = ["com.android", "com.google.android", "com.miui", "com.xiaomi", "com.transsion",
+           "com.facebook", "com.whatsapp", "org.telegram", "com.spotify", "com.netflix"]
+COMPONENTS = ["app", "apps", "providers", "service", "settings", "camera", "gallery",
+              "contacts", "calendar", "media", "systemui", "inputmethod", "bluetooth",
+              "nfc", "location", "wallpaper", "security", "backup", "updater", "music"]
+
+
+def _package_pool(size: int, rng: random.Random) -> List[str]:
+    """Package names shaped like those reported by `pm list packages`."""
+    pool = set()
+    while len(pool) < size:
+        name = f"{rng.choice(VENDORS)}.{rng.choice(COMPONENTS)}"
+        if rng.random() < 0.6:
+            name += f".{rng.choice(COMPONENTS)}"
+        if rng.random() < 0.3:
+            name += str(rng.randint(1, 99))
+        pool.add(name)
+    return sorted(pool)
+
+
+def _full_scans(devices: int, scans: int, apps: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Build full-scan records as ScanService.full_scan saves them.
+
+    Each device keeps most of its apps between scans; a few are installed
+    or removed each time.
+
+    Returns:
+        Records with device_id, brand, model and scan_data
+    """
+    pool = _package_pool(apps * 3, rng)
+    records = []
+    for index in range(devices):
+        brand = rng.choice(["Xiaomi", "Infinix"])
+        device_id = f"{rng.getrandbits(40):010X}"
+        installed = set(rng.sample(pool, apps))
+        for _ in range(scans):
+            for package in rng.sample(sorted(installed), rng.randint(0, 3)):
+                installed.discard(package)
+            installed.update(rng.sample(pool, rng.randint(0, 3)))
+            scan_data = {
+                "brand": brand,
+                "model": f"{brand} Model {index % 7}",
+                "android_version": str(rng.choice([11, 12, 13, 14])),
+                "security_patch": f"2024-{rng.randint(1, 12):02d}-01",
+                "kernel_version": f"Linux version 5.10.{rng.randint(100, 200)}-android12-9 (build@host) #1 SMP PREEMPT",
+                "baseband_version": f"MPSS.HI.{rng.randint(1, 9)}.{rng.randint(0, 9)}",
+                "bootloader_locked": rng.random() < 0.8,
+                "user_name": "Owner",
+                "storage": {"total": "111G", "used": f"{rng.randint(10, 100)}G", "available": "40G", "use_percentage": "61%"},
+                # Listed in whatever order the device reports them
+                "installed_apps": rng.sample(sorted(installed), len(installed)),
+            }
+            records.append({"device_id": device_id, "brand": brand, "model": scan_data["model"], "scan_data": scan_data})
+    rng.shuffle(records)
+    return records
+
+
+async def _save_legacy(path: str, record: Dict[str, Any]) -> int:
+    """Write a scan the way DBRepository did before compression: one JSON TEXT column."""
+    async with aiosqlite.connect(path) as db:
+        cursor = await db.execute(
+            '''
+            INSERT INTO scans (device_id, brand, model, scan_type, scan_data)
+            VALUES (?, ?, ?, ?, ?)
+            ''',
+            (record["device_id"], record["brand"], record["model"], "full", json.dumps(record["scan_data"]))
+        )
+        await db.commit()
+        return cursor.lastrowid
+
+
+async def _save_current(db_repo: DBRepository, record: Dict[str, Any]) -> int:
+    return await db_repo.save_scan_result(record["device_id"], record["brand"], record["model"],
+                                          "full", record["scan_data"])
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _measure(path: str, records: List[Dict[str, Any]], legacy: bool) -> Dict[str, Any]:
+    """Save every record into a fresh database, then read each back with the cache off."""
+    db_repo = DBRepository(path, cache_max_entries=0)
+    await db_repo.initialize()
+
+    save_times, scan_ids = [], []
+    for record in records:
+        started = time.perf_counter()
+        if legacy:
+            scan_ids.append(await _save_legacy(path, record))
+        else:
+            scan_ids.append(await _save_current(db_repo, record))
+        save_times.append(time.perf_counter() - started)
+
+    get_times = []
+    for scan_id in scan_ids:
+        started = time.perf_counter()
+        scan = await db_repo.get_scan_by_id(scan_id)
+        get_times.append(time.perf_counter() - started)
+        assert scan and len(scan["scan_data"]["installed_apps"]) > 0
+
+    return {
+        "size": os.path.getsize(path),
+        "save": save_times,
+        "get": get_times,
+    }
+
+
+def _report(name: str, result: Dict[str, Any]) -> None:
+    print(f"{name:<12} {result['size'] / 1024 / 1024:>9.2f}"
+          f" {_percentile(result['save'], 0.5) * 1000:>9.2f} {_percentile(result['save'], 0.95) * 1000:>9.2f}"
+          f" {_percentile(result['get'], 0.5) * 1000:>9.2f} {_percentile(result['get'], 0.95) * 1000:>9.2f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=20, help="Devices scanned (default: 20)")
+    parser.add_argument("--scans", type=int, default=10, help="Full scans per device (default: 10)")
+    parser.add_argument("--apps", type=int, default=400, help="Installed apps per device (default: 400)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the payloads (default: 1)")
+    args = parser.parse_args()
+
+    records = _full_scans(args.devices, args.scans, args.apps, random.Random(args.seed))
+    body_size = sum(len(json.dumps(record["scan_data"])) for record in records)
+    print(f"{len(records)} full scans, {args.apps} apps each, {body_size / 1024 / 1024:.2f} MiB of JSON\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = await _measure(os.path.join(directory, "legacy", "scans.db"), records, legacy=True)
+        current = await _measure(os.path.join(directory, "current", "scans.db"), records, legacy=False)
+
+    print(f"{'format':<12} {'size MiB':>9} {'save p50':>9} {'save p95':>9} {'get p50':>9} {'get p95':>9}")
+    print(f"{'':<12} {'':>9} {'ms':>9} {'ms':>9} {'ms':>9} {'ms':>9}")
+    _report("legacy", legacy)
+    _report("compressed", current)
+    print(f"\nFile size: {current['size'] / legacy['size']:.1%} of legacy")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+Coordinator process for multi-worker deployments.
+
+Owns ADB, the device poller, the device registry, Wi-Fi connections, the
+telemetry sampler, logcat captures and artifact pulls, and numbers and
+fans out WebSocket events for every worker. Start it before the workers:
+
+    python coordinator.py
+    COORDINATOR_SOCKET=/tmp/android-assessment.sock uvicorn main:app --workers 4
+"""
+import asyncio
+import os
+
+from repositories.adb_repository import ADBRepository
+from repositories.db_repository import DBRepository
+from repositories.brand.brand_factory import BrandFactory
+from service.artifact_service import ArtifactService
+from service.device_service import DeviceService
+from service.coordinator import CoordinatorServer, CoordinatorEventBus
+from service.logcat_service import LogcatService
+from service.telemetry_service import TelemetryService
+from service.wireless_service import WirelessService
+
+DEFAULT_SOCKET = "/tmp/android-assessment.sock"
+
+async def main():
+    socket_path = os.environ.get("COORDINATOR_SOCKET", DEFAULT_SOCKET)
+    
+    adb_repo = ADBRepository()
+    event_bus = CoordinatorEventBus()
+    device_service = DeviceService(adb_repo, BrandFactory(adb_repo), event_bus=event_bus)
+    db_repo = DBRepository()
+    await db_repo.initialize()
+    telemetry_service = TelemetryService(adb_repo, db_repo, device_service, event_bus=event_bus)
+    logcat_service = LogcatService(adb_repo, event_bus=event_bus)
+    artifact_service = ArtifactService(adb_repo, db_repo, event_bus=event_bus)
+    wireless_service = WirelessService(adb_repo, db_repo, device_service, event_bus=event_bus)
+    server = CoordinatorServer(socket_path, adb_repo, device_service, event_bus,
+                               telemetry_service, logcat_service, artifact_service, wireless_service)
+    
+    print(f"Coordinator listening on {socket_path}")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,6 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import Optional
+import os
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -6,6 +8,11 @@ from api.fast_scan import router as fast_scan_router
 from api.full_scan import router as full_scan_router
 from api.device_connection import router as device_connection_router
 from api.reports import router as reports_router
+from api.scan_jobs import router as scan_jobs_router
+from api.telemetry import router as telemetry_router
+from api.logcat import router as logcat_router
+from api.artifacts import router as artifacts_router
+from api.wireless import router as wireless_router
 
 # Import repositories and services
 from repositories.adb_repository import ADBRepository
@@ -13,6 +20,17 @@ from repositories.db_repository import DBRepository
 from repositories.brand.brand_factory import BrandFactory
 from service.device_service import DeviceService
 from service.scan_service import ScanService
+from service.report_service import ReportService
+from service.connection_manager import ConnectionManager, is_valid_topic
+from service.event_bus import EventBus
+from service.telemetry_service import TelemetryService
+from service.logcat_service import LogcatService
+from service.artifact_service import ArtifactService
+from service.wireless_service import WirelessService
+from service.coordinator_client import (
+    CoordinatorClient, RemoteADBRepository, RemoteArtifactService, RemoteDeviceService, RemoteEventBus,
+    RemoteLogcatService, RemoteTelemetryService, RemoteWirelessService, SharedScanJobRegistry
+)
 
 app = FastAPI(title="Android Assessment Tool API")
 
@@ -29,29 +47,61 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
 manager = ConnectionManager()
 
+# With COORDINATOR_SOCKET set this process is one of several workers: ADB,
+# device state and event numbering live in the coordinator (coordinator.py)
+COORDINATOR_SOCKET = os.environ.get("COORDINATOR_SOCKET")
+coordinator = CoordinatorClient(COORDINATOR_SOCKET) if COORDINATOR_SOCKET else None
+
 # Create singleton instances of repositories and services
-adb_repo = ADBRepository()
 db_repo = DBRepository()
-brand_factory = BrandFactory(adb_repo)
-device_service = DeviceService(adb_repo, brand_factory, websocket_manager=manager)
-scan_service = ScanService(adb_repo, db_repo, brand_factory, websocket_manager=manager)
+if coordinator:
+    event_bus = RemoteEventBus(coordinator, manager)
+    adb_repo = RemoteADBRepository(coordinator)
+    brand_factory = BrandFactory(adb_repo)
+    device_service = RemoteDeviceService(coordinator)
+    job_registry = SharedScanJobRegistry(coordinator)
+    telemetry_service = RemoteTelemetryService(coordinator)
+    logcat_service = RemoteLogcatService(coordinator)
+    artifact_service = RemoteArtifactService(coordinator)
+    wireless_service = RemoteWirelessService(coordinator)
+else:
+    event_bus = EventBus(manager)
+    adb_repo = ADBRepository()
+    brand_factory = BrandFactory(adb_repo)
+    device_service = DeviceService(adb_repo, brand_factory, event_bus=event_bus)
+    job_registry = None
+    telemetry_service = TelemetryService(adb_repo, db_repo, device_service, event_bus=event_bus)
+    logcat_service = LogcatService(adb_repo, event_bus=event_bus)
+    artifact_service = ArtifactService(adb_repo, db_repo, event_bus=event_bus)
+    wireless_service = WirelessService(adb_repo, db_repo, device_service, event_bus=event_bus)
+scan_service = ScanService(adb_repo, db_repo, brand_factory, event_bus=event_bus,
+                           job_registry=job_registry, device_service=device_service,
+                           wireless_service=wireless_service)
+report_service = ReportService(db_repo)
+
+# With PREFETCH_FAST_SCAN=1 a fast scan's probes run as soon as a device is
+# set up, so the scan operators usually start next returns almost at once.
+# Devices are set up in the coordinator, which cannot hand the result to
+# whichever worker the scan lands on, so workers ignore the setting
+if os.environ.get("PREFETCH_FAST_SCAN") == "1":
+    if coordinator:
+        print("Warning: PREFETCH_FAST_SCAN is ignored when running with a coordinator")
+    else:
+        device_service.on_device_onboarded = scan_service.prefetch_fast_scan
+        device_service.on_device_lost = scan_service.drop_prefetch
+
+# Every worker caches scans; one that deletes a scan has the coordinator tell
+# the others. Notifications are lost while disconnected, so reconnecting
+# starts from empty caches
+if coordinator:
+    scan_service.on_scan_deleted = lambda scan_id: coordinator.notify("scans.invalidate", scan_id=scan_id)
+    coordinator.add_invalidate_callback(scan_service.invalidate_scan)
+    coordinator.add_connect_callback(scan_service.clear_caches)
+
+# Device polling is suspended while no WebSocket client is connected
+manager.on_connections_changed = lambda count: device_service.set_listener_count("websocket", count)
 
 # Store singletons in app.state for dependency injection
 app.state.adb_repo = adb_repo
@@ -59,28 +109,79 @@ app.state.db_repo = db_repo
 app.state.brand_factory = brand_factory
 app.state.device_service = device_service
 app.state.scan_service = scan_service
+app.state.report_service = report_service
+app.state.event_bus = event_bus
+app.state.telemetry_service = telemetry_service
+app.state.logcat_service = logcat_service
+app.state.artifact_service = artifact_service
+app.state.wireless_service = wireless_service
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database tables on application startup"""
+    """Initialize database tables and connect wireless devices on application startup"""
     await app.state.db_repo.initialize()
+    if coordinator:
+        await coordinator.start(event_bus)
+    else:
+        await wireless_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop telemetry sampling, logcat captures, artifact pulls and wireless keep-alives, or disconnect from the coordinator"""
+    if coordinator:
+        await coordinator.close()
+    else:
+        await telemetry_service.stop()
+        await logcat_service.stop_all()
+        await artifact_service.stop_all()
+        await wireless_service.stop()
 
 # Include routers
 app.include_router(device_connection_router, prefix="/device", tags=["Device Connection"])
 app.include_router(fast_scan_router, prefix="/scan/fast", tags=["Fast Scan"])
 app.include_router(full_scan_router, prefix="/scan/full", tags=["Full Scan"])
+app.include_router(scan_jobs_router, prefix="/scan/jobs", tags=["Scan Jobs"])
 app.include_router(reports_router, prefix="/reports", tags=["Reports"])
+app.include_router(telemetry_router, prefix="/telemetry", tags=["Telemetry"])
+app.include_router(logcat_router, prefix="/logcat", tags=["Logcat"])
+app.include_router(artifacts_router, prefix="/artifacts", tags=["Artifacts"])
+app.include_router(wireless_router, prefix="/wireless", tags=["Wireless Devices"])
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket,
+                             topics: str = "",
+                             since: Optional[int] = None,
+                             batch: bool = False):
+    """
+    Real-time events. Optional query parameters:
+    topics: comma-separated topics to subscribe to on connect
+    since: last event seq received before a reconnect; missed events are
+        replayed in one "replay" message before live events resume
+    batch: receive events flushed together as one "batch" message
+    """
+    topic_list = [topic for topic in topics.split(",") if topic]
+    if not all(is_valid_topic(topic) for topic in topic_list):
+        await websocket.close(code=1008)
+        return
+    
+    await manager.connect(websocket, topic_list, batch)
+    if since is not None:
+        manager.send(websocket, event_bus.replay(since, topic_list))
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            # Subscription requests; any other frame just keeps the connection alive
+            await manager.handle_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also covers sockets the manager closed itself (e.g. slow consumers)
         manager.disconnect(websocket)
 
+@app.get("/ws/stats", tags=["WebSocket"])
+async def websocket_stats():
+    """Get WebSocket connection and delivery counters."""
+    return {**manager.stats(), "events": event_bus.stats()}
+
 @app.get("/")
 async def root():
     return {"message": "Android Assessment Tool API"}
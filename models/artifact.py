@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class ArtifactRequest(BaseModel):
+    """Model for pulling the same artifact from one or more devices."""
+    device_ids: List[str] = Field(..., min_length=1, max_length=100, description="ADB device identifiers to pull from")
+    kind: str = Field("file", description="What to pull: file, directory (as a tar archive) or bugreport")
+    path: Optional[str] = Field(None, description="Absolute path on the device; required for file and directory")
+    scan_id: Optional[int] = Field(None, description="Scan the artifacts belong to")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "device_ids": ["ABCD1234", "EFGH5678"],
+                "kind": "file",
+                "path": "/sdcard/Download/report.pdf",
+                "scan_id": 12
+            }
+        }
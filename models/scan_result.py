@@ -58,6 +58,7 @@ class ScanResponse(BaseModel):
     status: str = Field(..., description="Status of the scan request")
     device_id: str = Field(..., description="ADB device identifier")
     scan_type: str = Field(..., description="Type of scan (fast/full)")
+    job_id: Optional[str] = Field(None, description="Scan job identifier for /scan/jobs/{job_id}")
     message: str = Field(..., description="Status message")
     
     class Config:
@@ -66,6 +67,7 @@ class ScanResponse(BaseModel):
                 "status": "Scan started",
                 "device_id": "ABCD1234",
                 "scan_type": "full",
+                "job_id": "3f2a9c0e5b7d4e1f8a6c2b9d0e4f7a1c",
                 "message": "Full scan initiated. Progress will be sent via WebSocket."
             }
         }
@@ -122,3 +124,17 @@ class ScanComparison(BaseModel):
                 }
             }
         }
+
+
+class ReportBatchRequest(BaseModel):
+    """Model for fetching several scan reports in one request."""
+    scan_ids: List[int] = Field(..., min_length=1, max_length=500, description="Scan IDs to fetch, in the order results should be returned")
+    fields: Optional[List[str]] = Field(None, description="Fields to include; dotted paths select inside scan_data (e.g. scan_data.storage.total)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "scan_ids": [12, 15, 18],
+                "fields": ["id", "device_id", "created_at", "scan_data.android_version"]
+            }
+        }
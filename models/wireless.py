@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class WirelessTargetsRequest(BaseModel):
+    """Model for adding devices reached over Wi-Fi."""
+    addresses: List[str] = Field(..., min_length=1, max_length=500, description="host:port addresses of the devices' adbd (port defaults to 5555)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "addresses": ["192.168.1.21:5555", "192.168.1.22:5555", "rack3-slot4.lab:5555"]
+            }
+        }
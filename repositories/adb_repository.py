@@ -1,6 +1,6 @@
 import asyncio
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 
 class ADBRepository:
     """Repository for executing ADB commands asynchronously."""
@@ -45,6 +45,29 @@ class ADBRepository:
         
         return stdout.decode('utf-8', errors='replace')
     
+    async def open_stream(self, device_id: str, *args: str) -> asyncio.subprocess.Process:
+        """
+        Start a long-running ADB command whose output is read as it arrives.
+        
+        Args:
+            device_id: The device identifier
+            *args: The ADB command and its arguments (e.g. 'logcat', '-v', 'threadtime'),
+                passed without a shell
+            
+        Returns:
+            The running process; its stdout is a pipe and the caller must terminate it
+        """
+        try:
+            return await asyncio.create_subprocess_exec(
+                self.adb_path, "-s", device_id, *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            raise Exception(
+                "ADB executable not found. Install Android platform-tools and ensure 'adb' is in PATH."
+            )
+    
     async def get_connected_devices(self) -> List[str]:
         """
         Get a list of connected device IDs.
@@ -76,6 +99,36 @@ class ADBRepository:
         
         return device_ids
     
+    async def get_device_states(self) -> Dict[str, str]:
+        """
+        Get every device listed by `adb devices` with its ADB state.
+        
+        Returns:
+            Dictionary of device ID to state (e.g. 'device', 'unauthorized', 'offline')
+        """
+        try:
+            process = await asyncio.create_subprocess_shell(
+                f"{self.adb_path} devices",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise Exception(
+                "ADB executable not found. Install Android platform-tools and ensure 'adb' is in PATH."
+            )
+        
+        stdout, _ = await process.communicate()
+        output = stdout.decode('utf-8')
+        
+        states = {}
+        for line in output.strip().split('\n')[1:]:  # Skip the first line (header)
+            parts = line.split()
+            # Skip daemon status lines such as "* daemon started successfully"
+            if len(parts) >= 2 and not line.startswith('*'):
+                states[parts[0]] = parts[1]
+        
+        return states
+    
     async def authorize_device(self, device_id: str) -> bool:
         """
         Request USB debugging authorization for the device.
@@ -127,23 +180,89 @@ class ADBRepository:
         
         await process.communicate()
         
-    async def wait_for_device(self, timeout: int = 30) -> Optional[str]:
+    async def connect_device(self, address: str, timeout: float = 10.0) -> None:
         """
-        Wait for any device to be connected within the timeout period.
+        Connect to a device's adbd over TCP (`adb connect`).
         
         Args:
+            address: host:port of the device
             timeout: Maximum time to wait in seconds
             
-        Returns:
-            The device ID if one is found, None if timeout
+        Raises:
+            Exception: If the connection could not be established
         """
-        start_time = asyncio.get_event_loop().time()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.adb_path, "connect", address,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT
+            )
+        except FileNotFoundError:
+            raise Exception(
+                "ADB executable not found. Install Android platform-tools and ensure 'adb' is in PATH."
+            )
         
-        while asyncio.get_event_loop().time() - start_time < timeout:
-            devices = await self.get_connected_devices()
-            if devices:
-                return devices[0]
-            
-            await asyncio.sleep(1)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Timed out connecting to {address}")
+        finally:
+            # Also when cancelled, e.g. because the target was removed
+            if process.returncode is None:
+                process.kill()
+                await process.communicate()
+        
+        # adb connect exits with 0 even when it fails; only these mean success
+        output = stdout.decode('utf-8', errors='replace').strip()
+        if not output.startswith(("connected to", "already connected to")):
+            raise Exception(output or f"Cannot connect to {address}")
+    
+    async def disconnect_device(self, address: str) -> None:
+        """
+        Drop the TCP transport of a device connected with connect_device.
+        
+        Args:
+            address: host:port of the device
+        """
+        process = await asyncio.create_subprocess_exec(
+            self.adb_path, "disconnect", address,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        try:
+            await process.wait()
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    
+    async def ping_device(self, device_id: str, timeout: float = 5.0) -> bool:
+        """
+        Check that a device answers a no-op shell command.
+        
+        Unlike `adb devices`, this makes a round trip to the device, so it
+        also detects TCP transports that dropped without adb noticing.
+        
+        Args:
+            device_id: The device identifier
+            timeout: Maximum time to wait for the answer in seconds
             
-        return None
+        Returns:
+            True if the device answered in time
+        """
+        process = await asyncio.create_subprocess_exec(
+            self.adb_path, "-s", device_id, "shell", "true",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        try:
+            return await asyncio.wait_for(process.wait(), timeout) == 0
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            # Also when cancelled
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
@@ -55,17 +55,19 @@ class BrandFactory:
         # Return generic if brand couldn't be detected
         return "generic"
     
-    async def create_brand_implementation(self, device_id: str) -> BaseBrand:
+    async def create_brand_implementation(self, device_id: str, brand: Optional[str] = None) -> BaseBrand:
         """
         Create and return the appropriate brand implementation for the device.
         
         Args:
             device_id: The ADB device ID
+            brand: Brand already returned by detect_brand(), to skip detecting it again
             
         Returns:
             An implementation of BaseBrand appropriate for the device's brand
         """
-        brand = await self.detect_brand(device_id)
+        if brand is None:
+            brand = await self.detect_brand(device_id)
         
         # Create the specific brand implementation if available
         if brand in self.brands:
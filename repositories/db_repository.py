@@ -1,20 +1,352 @@
 import aiosqlite
+import hashlib
 import json
-from typing import Dict, Any, List, Optional
+import lzma
+import zlib
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 import os
 import datetime
 
+from repositories.scan_cache import ScanCache, freeze
+
+# Leading byte of a stored scan_data BLOB identifying how the JSON body is
+# encoded. Rows written before compression was introduced are plain JSON TEXT
+# and carry no marker.
+FORMAT_RAW = 0x00
+FORMAT_ZLIB = 0x01
+FORMAT_LZMA = 0x02
+
+# Bodies smaller than this are stored as-is; compression does not pay off.
+ZLIB_MIN_SIZE = 512
+# Bodies at least this large (full scans with app lists) use LZMA, whose
+# better ratio on repetitive package names outweighs the extra CPU.
+LZMA_MIN_SIZE = 64 * 1024
+# Size of the decompressed pieces produced when streaming stored bodies.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _encode_payload(raw: bytes) -> bytes:
+    """
+    Compress a body for storage, choosing the codec by size.
+
+    Args:
+        raw: The UTF-8 encoded body
+
+    Returns:
+        The body prefixed with its format byte
+    """
+    if len(raw) >= LZMA_MIN_SIZE:
+        compressed = lzma.compress(raw, preset=6)
+        if len(compressed) < len(raw):
+            return bytes([FORMAT_LZMA]) + compressed
+    elif len(raw) >= ZLIB_MIN_SIZE:
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            return bytes([FORMAT_ZLIB]) + compressed
+    return bytes([FORMAT_RAW]) + raw
+
+
+def _decode_payload(stored: Any) -> bytes:
+    """
+    Return the UTF-8 body of a stored value without parsing it.
+
+    Args:
+        stored: The column value, either a format-prefixed BLOB or legacy TEXT
+
+    Returns:
+        The body as bytes
+    """
+    if isinstance(stored, str):
+        return stored.encode('utf-8')
+
+    stored = bytes(stored)
+    marker, body = stored[0], stored[1:]
+    if marker == FORMAT_ZLIB:
+        return zlib.decompress(body)
+    if marker == FORMAT_LZMA:
+        return lzma.decompress(body)
+    if marker == FORMAT_RAW:
+        return body
+    raise ValueError(f"Unknown scan_data format byte: {marker:#04x}")
+
+
+def _pack_app_set(apps: List[str]) -> Tuple[str, List[str], bytes]:
+    """
+    Canonicalize an installed-apps list into a content-addressed set.
+
+    Args:
+        apps: Package names as reported by the device
+
+    Returns:
+        Tuple of (hash, sorted unique packages, encoded body for storage)
+    """
+    packages = sorted(set(apps))
+    body = "\n".join(packages).encode('utf-8')
+    return hashlib.sha256(body).hexdigest(), packages, _encode_payload(body)
+
+
+def _unpack_app_set(stored: Any) -> List[str]:
+    """Decode a stored app set back into its sorted package list."""
+    body = _decode_payload(stored)
+    return body.decode('utf-8').split("\n") if body else []
+
+
+def _merge_rollup_stats(stored: str, stored_samples: int, stats: str, samples: int) -> str:
+    """
+    Combine two partial rollups of the same telemetry bucket.
+
+    Args:
+        stored: Stats JSON already in the database
+        stored_samples: Samples behind the stored stats
+        stats: Stats JSON being written
+        samples: Samples behind the new stats
+
+    Returns:
+        Stats JSON with reading-weighted averages and the overall min and max
+    """
+    merged = json.loads(stored)
+    for metric, (avg, low, high, *count) in json.loads(stats).items():
+        count = count[0] if count else samples
+        if metric not in merged:
+            merged[metric] = [avg, low, high, count]
+            continue
+        # Rows written before readings were counted have one per sample
+        old_avg, old_low, old_high, *old_count = merged[metric]
+        old_count = old_count[0] if old_count else stored_samples
+        total = old_count + count
+        merged[metric] = [round((old_avg * old_count + avg * count) / total, 3),
+                          min(old_low, low), max(old_high, high), total]
+    return json.dumps(merged, separators=(",", ":"))
+
+
+# Scans are always read joined with their app set so installed_apps can be
+# re-attached; callers that do not need the list select NULL instead.
+SCAN_SELECT = '''
+    SELECT scans.*, app_sets.apps AS app_set FROM scans
+    LEFT JOIN app_sets ON app_sets.hash = scans.app_set_hash
+'''
+SCAN_SELECT_NO_APPS = 'SELECT scans.*, NULL AS app_set FROM scans'
+
+
+def _row_to_scan(row: aiosqlite.Row) -> Dict[str, Any]:
+    """Convert a scans table row into a scan record dictionary."""
+    scan_data = json.loads(_decode_payload(row["scan_data"]))
+    if row["app_set"] is not None:
+        scan_data["installed_apps"] = _unpack_app_set(row["app_set"])
+
+    return {
+        "id": row["id"],
+        "device_id": row["device_id"],
+        "brand": row["brand"],
+        "model": row["model"],
+        "scan_type": row["scan_type"],
+        "scan_data": scan_data,
+        "created_at": row["created_at"]
+    }
+
+
+def _glob_escape(text: str) -> str:
+    """Escape GLOB metacharacters so text matches literally."""
+    return "".join(f"[{c}]" if c in "*?[" else c for c in text)
+
+
+def _iter_payload(stored: Any, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Decode a stored value incrementally, yielding bounded chunks.
+    
+    Args:
+        stored: The column value, either a format-prefixed BLOB or legacy TEXT
+        chunk_size: Maximum size of each yielded chunk
+        
+    Yields:
+        Consecutive pieces of the UTF-8 body
+        
+    Raises:
+        zlib.error, lzma.LZMAError: If the compressed body is truncated or corrupt
+    """
+    if isinstance(stored, str):
+        stored = bytes([FORMAT_RAW]) + stored.encode('utf-8')
+    
+    marker, body = stored[0], memoryview(stored)[1:]
+    if marker == FORMAT_RAW:
+        for offset in range(0, len(body), chunk_size):
+            yield bytes(body[offset:offset + chunk_size])
+    elif marker == FORMAT_ZLIB:
+        decompressor = zlib.decompressobj()
+        data = bytes(body)
+        while data:
+            chunk = decompressor.decompress(data, chunk_size)
+            data = decompressor.unconsumed_tail
+            if chunk:
+                yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+        if not decompressor.eof:
+            raise zlib.error("Stored scan_data is truncated")
+    elif marker == FORMAT_LZMA:
+        decompressor = lzma.LZMADecompressor()
+        chunk = decompressor.decompress(bytes(body), chunk_size)
+        while True:
+            if chunk:
+                yield chunk
+            if decompressor.eof:
+                break
+            # All input consumed without reaching the end of the stream:
+            # asking for more output would return nothing forever
+            if decompressor.needs_input:
+                raise lzma.LZMAError("Stored scan_data is truncated")
+            chunk = decompressor.decompress(b'', chunk_size)
+    else:
+        raise ValueError(f"Unknown scan_data format byte: {marker:#04x}")
+
+
+def _iter_app_set(stored: Any) -> Iterator[str]:
+    """Yield the packages of a stored app set without decoding it all at once."""
+    pending = b''
+    for chunk in _iter_payload(stored):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8')
+    if pending:
+        yield pending.decode('utf-8')
+
+
+class StoredScan:
+    """A scans row whose stored bodies are decoded only when, and as far as, needed."""
+    
+    def __init__(self, row: aiosqlite.Row):
+        """
+        Wrap a row selected with SCAN_SELECT.
+        
+        Args:
+            row: The scans table row
+        """
+        self._row = row
+        self.id = row["id"]
+        self.device_id = row["device_id"]
+        self.brand = row["brand"]
+        self.model = row["model"]
+        self.scan_type = row["scan_type"]
+        self.created_at = row["created_at"]
+    
+    def summary(self) -> Dict[str, Any]:
+        """Get the record fields other than scan_data."""
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "brand": self.brand,
+            "model": self.model,
+            "scan_type": self.scan_type,
+            "created_at": self.created_at
+        }
+    
+    def to_dict(self, include_apps: bool = True) -> Dict[str, Any]:
+        """Decode the full scan record into a dictionary."""
+        record = _row_to_scan(self._row)
+        if not include_apps:
+            record["scan_data"].pop("installed_apps", None)
+        return record
+    
+    def scan_data_without_apps(self) -> Dict[str, Any]:
+        """Decode scan_data, leaving out the (potentially large) app list."""
+        scan_data = json.loads(_decode_payload(self._row["scan_data"]))
+        scan_data.pop("installed_apps", None)
+        return scan_data
+    
+    def iter_installed_apps(self) -> Iterator[str]:
+        """Yield installed packages, streaming them from the app set when deduplicated."""
+        if self._row["app_set"] is not None:
+            yield from _iter_app_set(self._row["app_set"])
+            return
+        # Legacy rows keep the list inline in scan_data
+        scan_data = json.loads(_decode_payload(self._row["scan_data"]))
+        apps = scan_data.get("installed_apps")
+        if isinstance(apps, list):
+            yield from apps
+    
+    def iter_json(self) -> Iterator[bytes]:
+        """
+        Stream the JSON encoding of the record without parsing scan_data.
+        
+        The stored body is spliced into the record envelope as-is; only the
+        deduplicated installed_apps list is encoded, a batch at a time.
+        
+        Yields:
+            Consecutive pieces of the record as UTF-8 JSON, with the same keys
+            as to_dict()
+        """
+        head = json.dumps({
+            "id": self.id,
+            "device_id": self.device_id,
+            "brand": self.brand,
+            "model": self.model,
+            "scan_type": self.scan_type
+        }, separators=(',', ':')).encode('utf-8')
+        yield head[:-1] + b',"scan_data":'
+        
+        if self._row["app_set"] is None:
+            yield from _iter_payload(self._row["scan_data"])
+        else:
+            # Hold back the chunk holding the closing brace so installed_apps
+            # can be inserted before it
+            pending = b''
+            content = 0
+            for chunk in _iter_payload(self._row["scan_data"]):
+                content += len(chunk.translate(None, b' \t\r\n'))
+                if chunk.strip():
+                    if pending:
+                        yield pending
+                    pending = chunk
+                else:
+                    pending += chunk
+            pending = pending.rstrip()
+            yield pending[:-1] + (b',' if content > 2 else b'') + b'"installed_apps":['
+            
+            batch = []
+            separator = b''
+            for package in _iter_app_set(self._row["app_set"]):
+                batch.append(json.dumps(package))
+                if len(batch) >= 1024:
+                    yield separator + ','.join(batch).encode('utf-8')
+                    batch, separator = [], b','
+            if batch:
+                yield separator + ','.join(batch).encode('utf-8')
+            yield b']}'
+        
+        yield b',"created_at":' + json.dumps(self.created_at).encode('utf-8') + b'}'
+    
+    def to_json(self) -> bytes:
+        """Encode the record as JSON without parsing scan_data."""
+        return b''.join(self.iter_json())
+
+
+async def _ensure_column(db: aiosqlite.Connection, table: str, column: str, definition: str) -> None:
+    """Add a column to an existing table if an older schema lacks it."""
+    cursor = await db.execute(f'PRAGMA table_info({table})')
+    columns = {row[1] for row in await cursor.fetchall()}
+    if column not in columns:
+        await db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
 class DBRepository:
     """Repository for asynchronous database operations."""
     
-    def __init__(self, db_path: str = "database/scans.db"):
+    def __init__(self,
+                 db_path: str = "database/scans.db",
+                 cache_max_entries: int = 256,
+                 cache_max_bytes: int = 64 * 1024 * 1024):
         """
         Initialize the database repository.
         
         Args:
             db_path: Path to the SQLite database file
+            cache_max_entries: Maximum number of scan records kept in memory
+            cache_max_bytes: Approximate memory cap for cached scan records
         """
         self.db_path = db_path
+        self.scan_cache = ScanCache(cache_max_entries, cache_max_bytes)
         
     async def initialize(self) -> None:
         """Initialize the database and create required tables if they don't exist."""
@@ -22,6 +354,8 @@ class DBRepository:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         async with aiosqlite.connect(self.db_path) as db:
+            # scan_data holds a format-prefixed BLOB (see _encode_payload);
+            # databases created before that keep their TEXT column and rows
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS scans (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -29,11 +363,224 @@ class DBRepository:
                     brand TEXT NOT NULL,
                     model TEXT NOT NULL,
                     scan_type TEXT NOT NULL,
-                    scan_data TEXT NOT NULL,
+                    scan_data BLOB NOT NULL,
+                    app_set_hash TEXT,
+                    content_hash TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            await _ensure_column(db, 'scans', 'app_set_hash', 'TEXT')
+            # SHA-256 of the stored body, used for HTTP validators; NULL on
+            # rows written before it was introduced
+            await _ensure_column(db, 'scans', 'content_hash', 'TEXT')
+            
+            # Installed-app lists are stored once per distinct set, keyed by
+            # the SHA-256 of the sorted, newline-joined package names
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS app_sets (
+                    hash TEXT PRIMARY KEY,
+                    app_count INTEGER NOT NULL,
+                    apps BLOB NOT NULL
+                )
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scans_app_set
+                ON scans (app_set_hash)
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scans_device_type
+                ON scans (device_id, scan_type, created_at)
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scans_created_at
+                ON scans (created_at)
+            ''')
+            
+            # Inverted index: package name -> devices whose latest app set
+            # contains it. package_index_devices records which scan and app
+            # set each device is currently indexed from; searches join it, so
+            # a new scan with an unchanged app set touches one row.
+            # Indexes from before that carried scan_id on every package row
+            # and are rebuilt (see below).
+            cursor = await db.execute('PRAGMA table_info(package_index)')
+            if 'scan_id' in {row[1] for row in await cursor.fetchall()}:
+                await db.execute('DROP TABLE package_index')
+                await db.execute('DROP TABLE package_index_devices')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS package_index (
+                    package TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    PRIMARY KEY (package, device_id)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_package_index_device
+                ON package_index (device_id)
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS package_index_devices (
+                    device_id TEXT PRIMARY KEY,
+                    scan_id INTEGER NOT NULL,
+                    app_set_hash TEXT NOT NULL
+                )
+            ''')
+            
+            # Downsampled device telemetry: one row per device, resolution
+            # (seconds) and bucket start (Unix time); stats holds
+            # {"metric": [avg, min, max]} as JSON
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS telemetry_rollups (
+                    device_id TEXT NOT NULL,
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    stats TEXT NOT NULL,
+                    PRIMARY KEY (device_id, resolution, bucket)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_telemetry_rollups_age
+                ON telemetry_rollups (resolution, bucket)
+            ''')
+
+            # Files and bugreports pulled from devices; the content lives on
+            # disk at local_path, optionally linked to the scan it belongs to
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_id TEXT NOT NULL,
+                    scan_id INTEGER,
+                    kind TEXT NOT NULL,
+                    remote_path TEXT,
+                    local_path TEXT,
+                    size INTEGER,
+                    sha256 TEXT,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_artifacts_device
+                ON artifacts (device_id, id)
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_artifacts_scan
+                ON artifacts (scan_id)
+            ''')
+
+            # Devices reached over Wi-Fi (adb connect host:port) kept connected
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS wireless_targets (
+                    address TEXT PRIMARY KEY,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             await db.commit()
+            
+            cursor = await db.execute('SELECT 1 FROM package_index_devices LIMIT 1')
+            if not await cursor.fetchone():
+                await self._rebuild_package_index(db)
+                await db.commit()
+    
+    async def _rebuild_package_index(self, db: aiosqlite.Connection) -> None:
+        """
+        Populate the package index from each device's newest full scan.
+        
+        Runs once on databases that predate the index, including legacy rows
+        whose app list is still stored inline in scan_data.
+        
+        Args:
+            db: Open connection; the caller commits
+        """
+        cursor = await db.execute(
+            "SELECT DISTINCT device_id FROM scans WHERE scan_type = 'full'"
+        )
+        for (device_id,) in await cursor.fetchall():
+            await self._reindex_device(db, device_id)
+    
+    async def _reindex_device(self, db: aiosqlite.Connection, device_id: str) -> None:
+        """
+        Rebuild a device's package index entries from its newest full scan.
+        
+        Args:
+            db: Open connection; the caller commits
+            device_id: The device identifier
+        """
+        await db.execute('DELETE FROM package_index WHERE device_id = ?', (device_id,))
+        await db.execute('DELETE FROM package_index_devices WHERE device_id = ?', (device_id,))
+        
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f'''
+            {SCAN_SELECT} WHERE scans.device_id = ? AND scans.scan_type = 'full'
+            ORDER BY scans.created_at DESC, scans.id DESC LIMIT 1
+            ''',
+            (device_id,)
+        )
+        row = await cursor.fetchone()
+        db.row_factory = None
+        
+        if row:
+            apps = _row_to_scan(row)["scan_data"].get("installed_apps")
+            if isinstance(apps, list):
+                app_set_hash, packages, _ = _pack_app_set(apps)
+                await self._index_packages(db, device_id, row["id"], app_set_hash, packages)
+    
+    async def _index_packages(self,
+                              db: aiosqlite.Connection,
+                              device_id: str,
+                              scan_id: int,
+                              app_set_hash: str,
+                              packages: List[str]) -> None:
+        """
+        Point the package index for a device at a new scan.
+        
+        Only the packages that changed since the device's previously indexed
+        app set are inserted or deleted; an unchanged set only updates the
+        device's package_index_devices row.
+        
+        Args:
+            db: Open connection; the caller commits
+            device_id: The device identifier
+            scan_id: The scan the packages come from
+            app_set_hash: Hash of the scan's app set
+            packages: Sorted package names of the app set
+        """
+        cursor = await db.execute(
+            'SELECT app_set_hash FROM package_index_devices WHERE device_id = ?',
+            (device_id,)
+        )
+        row = await cursor.fetchone()
+        previous_hash = row[0] if row else None
+        
+        if previous_hash != app_set_hash:
+            previous = set()
+            if previous_hash:
+                cursor = await db.execute(
+                    'SELECT package FROM package_index WHERE device_id = ?',
+                    (device_id,)
+                )
+                previous = {r[0] for r in await cursor.fetchall()}
+            current = set(packages)
+            
+            await db.executemany(
+                'DELETE FROM package_index WHERE package = ? AND device_id = ?',
+                [(package, device_id) for package in previous - current]
+            )
+            await db.executemany(
+                'INSERT INTO package_index (package, device_id) VALUES (?, ?)',
+                [(package, device_id) for package in current - previous]
+            )
+        
+        await db.execute(
+            '''
+            INSERT OR REPLACE INTO package_index_devices (device_id, scan_id, app_set_hash)
+            VALUES (?, ?, ?)
+            ''',
+            (device_id, scan_id, app_set_hash)
+        )
     
     async def save_scan_result(self, 
                               device_id: str, 
@@ -55,30 +602,315 @@ class DBRepository:
             The ID of the inserted record
         """
         async with aiosqlite.connect(self.db_path) as db:
+            scan_id, app_set = await self._insert_scan(db, device_id, brand, model, scan_type, scan_data)
+            if app_set:
+                app_set_hash, packages = app_set
+                await self._index_packages(db, device_id, scan_id, app_set_hash, packages)
+            await db.commit()
+            return scan_id
+    
+    async def _insert_scan(self,
+                           db: aiosqlite.Connection,
+                           device_id: str,
+                           brand: str,
+                           model: str,
+                           scan_type: str,
+                           scan_data: Dict[str, Any],
+                           created_at: Optional[str] = None) -> Tuple[int, Optional[Tuple[str, List[str]]]]:
+        """
+        Encode and insert a scan row, storing its app list as an app set.
+        
+        Args:
+            db: Open connection; the caller commits
+            device_id: The device identifier
+            brand: The device brand
+            model: The device model
+            scan_type: The type of scan (fast/full)
+            scan_data: The scan data as a dictionary
+            created_at: Original timestamp to keep, or None for the current time
+            
+        Returns:
+            Tuple of (scan ID, (app set hash, packages) or None)
+        """
+        app_set = None
+        if isinstance(scan_data.get("installed_apps"), list):
+            app_set = _pack_app_set(scan_data["installed_apps"])
+            scan_data = {k: v for k, v in scan_data.items() if k != "installed_apps"}
+        
+        body = json.dumps(scan_data, separators=(',', ':')).encode('utf-8')
+        content_hash = hashlib.sha256(body)
+        if app_set:
+            content_hash.update(b'\0' + app_set[0].encode('utf-8'))
+        
+        payload = _encode_payload(body)
+        if app_set:
+            app_set_hash, packages, app_payload = app_set
+            await db.execute(
+                'INSERT OR IGNORE INTO app_sets (hash, app_count, apps) VALUES (?, ?, ?)',
+                (app_set_hash, len(packages), app_payload)
+            )
+        
+        cursor = await db.execute(
+            '''
+            INSERT INTO scans (device_id, brand, model, scan_type, scan_data,
+                               app_set_hash, content_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ''',
+            (device_id, brand, model, scan_type, payload,
+             app_set[0] if app_set else None, content_hash.hexdigest(), created_at)
+        )
+        return cursor.lastrowid, (app_set[0], app_set[1]) if app_set else None
+    
+    async def import_scans(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert a batch of exported scan records in a single transaction.
+        
+        Records already present, or repeated within the batch, are skipped;
+        a scan is identified by (device_id, created_at, scan_type).
+        
+        Args:
+            records: Scan records in the shape returned by get_scan_by_id
+            
+        Returns:
+            Dictionary with counts of imported and skipped records
+        """
+        imported = 0
+        skipped = 0
+        seen = set()
+        reindex = set()
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            for record in records:
+                key = (record["device_id"], record["created_at"], record["scan_type"])
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+                
+                cursor = await db.execute(
+                    'SELECT 1 FROM scans WHERE device_id = ? AND scan_type = ? AND created_at = ?',
+                    (record["device_id"], record["scan_type"], record["created_at"])
+                )
+                if await cursor.fetchone():
+                    skipped += 1
+                    continue
+                
+                _, app_set = await self._insert_scan(
+                    db,
+                    record["device_id"],
+                    record.get("brand", "Unknown"),
+                    record.get("model", "Unknown"),
+                    record["scan_type"],
+                    record.get("scan_data") or {},
+                    record["created_at"]
+                )
+                if app_set:
+                    reindex.add(record["device_id"])
+                imported += 1
+            
+            # Imported scans may be older than what is indexed, so rebuild
+            # each touched device from whichever full scan is now newest
+            for device_id in reindex:
+                await self._reindex_device(db, device_id)
+            await db.commit()
+        
+        return {"imported": imported, "skipped": skipped}
+    
+    async def get_scan_by_id(self, scan_id: int, include_apps: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a scan result by its ID.
+        
+        Records are served through an LRU cache. Scans are never modified
+        after being written, so entries only need dropping on delete; they
+        are returned read-only (see scan_cache.FrozenDict).
+        
+        Args:
+            scan_id: The scan ID
+            include_apps: Whether to re-attach the deduplicated installed_apps list
+            
+        Returns:
+            The scan record as a read-only dictionary, or None if not found
+        """
+        cache_key = (scan_id, "apps" if include_apps else "no_apps")
+        cached = self.scan_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        select = SCAN_SELECT if include_apps else SCAN_SELECT_NO_APPS
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'{select} WHERE scans.id = ?',
+                (scan_id,)
+            )
+            row = await cursor.fetchone()
+            
+            if not row:
+                return None
+                
+            scan, size = freeze(_row_to_scan(row))
+            self.scan_cache.put(cache_key, scan, size)
+            return scan
+    
+    async def get_scan_meta(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the validator fields of a scan without reading scan_data.
+        
+        Args:
+            scan_id: The scan ID
+            
+        Returns:
+            Dictionary with id, created_at and content_hash, or None if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                'SELECT id, created_at, content_hash FROM scans WHERE id = ?',
+                (scan_id,)
+            )
+            row = await cursor.fetchone()
+            
+            return dict(row) if row else None
+    
+    async def get_latest_scan_meta(self, device_id: str, scan_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the validator fields of a device's most recent scan of a given type.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            
+        Returns:
+            Dictionary with id, created_at and content_hash, or None if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 '''
-                INSERT INTO scans (device_id, brand, model, scan_type, scan_data)
-                VALUES (?, ?, ?, ?, ?)
+                SELECT id, created_at, content_hash FROM scans
+                WHERE device_id = ? AND scan_type = ?
+                ORDER BY created_at DESC, id DESC LIMIT 1
                 ''',
-                (device_id, brand, model, scan_type, json.dumps(scan_data))
+                (device_id, scan_type)
             )
-            await db.commit()
-            return cursor.lastrowid
+            row = await cursor.fetchone()
+            
+            return dict(row) if row else None
     
-    async def get_scan_by_id(self, scan_id: int) -> Optional[Dict[str, Any]]:
+    async def get_scans_by_ids(self,
+                               scan_ids: List[int],
+                               include_apps: bool = True,
+                               cache: bool = True) -> Dict[int, Dict[str, Any]]:
         """
-        Get a scan result by its ID.
+        Get several scan results, loading cache misses in one query.
+        
+        Args:
+            scan_ids: The scan IDs
+            include_apps: Whether to re-attach the deduplicated installed_apps list
+            cache: Whether to use the scan cache; bulk reads that would only
+                evict frequently used entries pass False
+            
+        Returns:
+            Dictionary mapping each found scan ID to its read-only record
+        """
+        variant = "apps" if include_apps else "no_apps"
+        found = {}
+        missing = []
+        for scan_id in dict.fromkeys(scan_ids):
+            cached = self.scan_cache.get((scan_id, variant)) if cache else None
+            if cached is not None:
+                found[scan_id] = cached
+            else:
+                missing.append(scan_id)
+        
+        select = SCAN_SELECT if include_apps else SCAN_SELECT_NO_APPS
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                cursor = await db.execute(
+                    f"{select} WHERE scans.id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                for row in await cursor.fetchall():
+                    scan, size = freeze(_row_to_scan(row))
+                    if cache:
+                        self.scan_cache.put((row["id"], variant), scan, size)
+                    found[row["id"]] = scan
+        
+        return found
+    
+    async def get_scans_json_by_ids(self, scan_ids: List[int]) -> Dict[int, bytes]:
+        """
+        Get several scan records as JSON bytes in one query, without parsing
+        scan_data.
+        
+        The scan cache is bypassed: bulk reads would only evict the entries
+        single-report requests keep hitting.
+        
+        Args:
+            scan_ids: The scan IDs; callers keep batches small enough for one
+                IN (...) list
+            
+        Returns:
+            Dictionary mapping each found scan ID to its encoded record
+        """
+        unique = list(dict.fromkeys(scan_ids))
+        if not unique:
+            return {}
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"{SCAN_SELECT} WHERE scans.id IN ({', '.join('?' * len(unique))})",
+                unique
+            )
+            return {row["id"]: StoredScan(row).to_json() for row in await cursor.fetchall()}
+    
+    async def get_recent_scans(self, device_id: str, scan_type: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get the most recent scans of a given type for a device, oldest first.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            limit: Maximum number of scans to return
+            
+        Returns:
+            List of scan records in chronological order
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'''
+                {SCAN_SELECT} WHERE scans.device_id = ? AND scans.scan_type = ?
+                ORDER BY scans.created_at DESC, scans.id DESC LIMIT ?
+                ''',
+                (device_id, scan_type, limit)
+            )
+            rows = await cursor.fetchall()
+            
+            return [_row_to_scan(row) for row in reversed(rows)]
+    
+    async def get_scan_json_by_id(self, scan_id: int) -> Optional[bytes]:
+        """
+        Get a scan record already encoded as JSON, without parsing scan_data.
         
         Args:
             scan_id: The scan ID
             
         Returns:
-            The scan record as a dictionary, or None if not found
+            The scan record as UTF-8 JSON bytes, or None if not found
         """
+        cache_key = (scan_id, "json")
+        cached = self.scan_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
-                'SELECT * FROM scans WHERE id = ?',
+                f'{SCAN_SELECT} WHERE scans.id = ?',
                 (scan_id,)
             )
             row = await cursor.fetchone()
@@ -86,15 +918,96 @@ class DBRepository:
             if not row:
                 return None
                 
-            return {
-                "id": row["id"],
-                "device_id": row["device_id"],
-                "brand": row["brand"],
-                "model": row["model"],
-                "scan_type": row["scan_type"],
-                "scan_data": json.loads(row["scan_data"]),
-                "created_at": row["created_at"]
-            }
+            body = StoredScan(row).to_json()
+            self.scan_cache.put(cache_key, body, len(body))
+            return body
+    
+    async def get_stored_scan(self, scan_id: int) -> Optional[StoredScan]:
+        """
+        Get a scan row for streaming, without decoding its bodies.
+        
+        Args:
+            scan_id: The scan ID
+            
+        Returns:
+            The stored scan, or None if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'{SCAN_SELECT} WHERE scans.id = ?',
+                (scan_id,)
+            )
+            row = await cursor.fetchone()
+            
+            return StoredScan(row) if row else None
+    
+    async def iter_stored_scans(self,
+                                device_id: Optional[str] = None,
+                                scan_type: Optional[str] = None,
+                                since: Optional[str] = None,
+                                until: Optional[str] = None) -> AsyncIterator[StoredScan]:
+        """
+        Iterate over matching scans oldest first, reading rows in batches.
+        
+        Args:
+            device_id: Only scans of this device
+            scan_type: Only scans of this type (fast/full)
+            since: Only scans created at or after this timestamp
+            until: Only scans created before this timestamp
+            
+        Yields:
+            Stored scans whose bodies are decoded on demand
+        """
+        conditions = []
+        params = []
+        for condition, value in (('scans.device_id = ?', device_id),
+                                 ('scans.scan_type = ?', scan_type),
+                                 ('scans.created_at >= ?', since),
+                                 ('scans.created_at < ?', until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                f'{SCAN_SELECT} {where} ORDER BY scans.created_at, scans.id',
+                params
+            ) as cursor:
+                async for row in cursor:
+                    yield StoredScan(row)
+    
+    async def get_latest_scan(self, device_id: str, scan_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent scan of a given type for a device.
+        
+        Only the matching row is read, so a single scan_data body is
+        decompressed however many scans the device has.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            
+        Returns:
+            The scan record as a dictionary, or None if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'''
+                {SCAN_SELECT} WHERE scans.device_id = ? AND scans.scan_type = ?
+                ORDER BY scans.created_at DESC, scans.id DESC LIMIT 1
+                ''',
+                (device_id, scan_type)
+            )
+            row = await cursor.fetchone()
+            
+            if not row:
+                return None
+                
+            return _row_to_scan(row)
     
     async def get_scans_by_device_id(self, device_id: str) -> List[Dict[str, Any]]:
         """
@@ -109,24 +1022,12 @@ class DBRepository:
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
-                'SELECT * FROM scans WHERE device_id = ? ORDER BY created_at DESC',
+                f'{SCAN_SELECT} WHERE scans.device_id = ? ORDER BY scans.created_at DESC',
                 (device_id,)
             )
             rows = await cursor.fetchall()
             
-            results = []
-            for row in rows:
-                results.append({
-                    "id": row["id"],
-                    "device_id": row["device_id"],
-                    "brand": row["brand"],
-                    "model": row["model"],
-                    "scan_type": row["scan_type"],
-                    "scan_data": json.loads(row["scan_data"]),
-                    "created_at": row["created_at"]
-                })
-                
-            return results
+            return [_row_to_scan(row) for row in rows]
     
     async def get_all_scans(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -141,24 +1042,115 @@ class DBRepository:
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
-                'SELECT * FROM scans ORDER BY created_at DESC LIMIT ?',
+                f'{SCAN_SELECT} ORDER BY scans.created_at DESC LIMIT ?',
                 (limit,)
             )
             rows = await cursor.fetchall()
             
-            results = []
-            for row in rows:
-                results.append({
-                    "id": row["id"],
+            return [_row_to_scan(row) for row in rows]
+    
+    async def get_app_set_delta(self, scan_id_1: int, scan_id_2: int) -> Optional[Dict[str, List[str]]]:
+        """
+        Compute installed-app changes between two scans from their app set ids.
+        
+        Scans sharing an app set are answered without loading any package
+        list; otherwise only the two app sets are decoded, never scan_data.
+        
+        Args:
+            scan_id_1: The earlier scan ID
+            scan_id_2: The later scan ID
+            
+        Returns:
+            Dictionary with newly_installed and removed package lists, or None
+            if either scan has no deduplicated app set (e.g. legacy rows)
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                'SELECT id, app_set_hash FROM scans WHERE id IN (?, ?)',
+                (scan_id_1, scan_id_2)
+            )
+            hashes = {row[0]: row[1] for row in await cursor.fetchall()}
+            hash_1, hash_2 = hashes.get(scan_id_1), hashes.get(scan_id_2)
+            
+            if not hash_1 or not hash_2:
+                return None
+            if hash_1 == hash_2:
+                return {"newly_installed": [], "removed": []}
+            
+            cursor = await db.execute(
+                'SELECT hash, apps FROM app_sets WHERE hash IN (?, ?)',
+                (hash_1, hash_2)
+            )
+            sets = {row[0]: set(_unpack_app_set(row[1])) for row in await cursor.fetchall()}
+            
+        apps1, apps2 = sets.get(hash_1, set()), sets.get(hash_2, set())
+        return {
+            "newly_installed": sorted(apps2 - apps1),
+            "removed": sorted(apps1 - apps2)
+        }
+    
+    async def search_packages(self,
+                              query: str,
+                              match: str = "exact",
+                              limit: int = 50,
+                              offset: int = 0) -> Dict[str, Any]:
+        """
+        Find devices whose latest full scan contains matching packages.
+        
+        Args:
+            query: Package name, prefix, or GLOB pattern using * and ?
+            match: One of exact, prefix or wildcard
+            limit: Maximum number of results to return
+            offset: Number of results to skip
+            
+        Returns:
+            Dictionary with the total match count and the requested page of
+            package/device/scan matches
+        """
+        if match == "exact":
+            condition, param = 'package_index.package = ?', query
+        elif match == "prefix":
+            condition, param = 'package_index.package GLOB ?', _glob_escape(query) + '*'
+        elif match == "wildcard":
+            condition, param = 'package_index.package GLOB ?', query.replace('[', '[[]')
+        else:
+            raise ValueError(f"Unsupported match mode: {match}")
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'SELECT COUNT(*) FROM package_index WHERE {condition}',
+                (param,)
+            )
+            total = (await cursor.fetchone())[0]
+            
+            cursor = await db.execute(
+                f'''
+                SELECT package_index.package, package_index.device_id,
+                       package_index_devices.scan_id, scans.created_at
+                FROM package_index
+                JOIN package_index_devices ON package_index_devices.device_id = package_index.device_id
+                JOIN scans ON scans.id = package_index_devices.scan_id
+                WHERE {condition}
+                ORDER BY package_index.package, package_index.device_id
+                LIMIT ? OFFSET ?
+                ''',
+                (param, limit, offset)
+            )
+            rows = await cursor.fetchall()
+            
+        return {
+            "total": total,
+            "results": [
+                {
+                    "package": row["package"],
                     "device_id": row["device_id"],
-                    "brand": row["brand"],
-                    "model": row["model"],
-                    "scan_type": row["scan_type"],
-                    "scan_data": json.loads(row["scan_data"]),
-                    "created_at": row["created_at"]
-                })
-                
-            return results
+                    "scan_id": row["scan_id"],
+                    "scanned_at": row["created_at"]
+                }
+                for row in rows
+            ]
+        }
     
     async def delete_scan(self, scan_id: int) -> bool:
         """
@@ -171,10 +1163,281 @@ class DBRepository:
             True if deleted successfully, False if not found
         """
         async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                'SELECT app_set_hash FROM scans WHERE id = ?',
+                (scan_id,)
+            )
+            row = await cursor.fetchone()
+            
             cursor = await db.execute(
                 'DELETE FROM scans WHERE id = ?',
                 (scan_id,)
             )
+            deleted = cursor.rowcount > 0
+            
+            # Drop the app set once no scan references it any more
+            if row and row[0]:
+                await db.execute(
+                    '''
+                    DELETE FROM app_sets WHERE hash = ?
+                    AND NOT EXISTS (SELECT 1 FROM scans WHERE app_set_hash = ?)
+                    ''',
+                    (row[0], row[0])
+                )
+            
+            # Fall back to the device's previous full scan in the package index
+            cursor = await db.execute(
+                'SELECT device_id FROM package_index_devices WHERE scan_id = ?',
+                (scan_id,)
+            )
+            indexed = await cursor.fetchone()
+            if indexed:
+                await self._reindex_device(db, indexed[0])
+
+            # Artifacts outlive the scan they were collected for
+            if deleted:
+                await db.execute(
+                    'UPDATE artifacts SET scan_id = NULL WHERE scan_id = ?',
+                    (scan_id,)
+                )
             await db.commit()
+        
+        # Only once the delete is committed: a read racing it until then would
+        # find the row again and put it back in the cache
+        self.scan_cache.invalidate(scan_id)
+        return deleted
+    
+    async def save_telemetry_rollups(self, rows: List[Tuple[str, int, int, int, str]]) -> None:
+        """
+        Store finished telemetry rollup buckets in one transaction.
+        
+        A bucket written in parts, e.g. because sampling stopped and resumed
+        within it, is merged with what is already stored rather than replaced.
+        
+        Args:
+            rows: (device_id, resolution, bucket, samples, stats JSON) tuples
+        """
+        if not rows:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.create_function("merge_rollup_stats", 4, _merge_rollup_stats, deterministic=True)
+            await db.executemany(
+                '''
+                INSERT INTO telemetry_rollups (device_id, resolution, bucket, samples, stats)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (device_id, resolution, bucket) DO UPDATE SET
+                    samples = samples + excluded.samples,
+                    stats = merge_rollup_stats(stats, samples, excluded.stats, excluded.samples)
+                ''',
+                rows
+            )
+            await db.commit()
+    
+    async def get_telemetry_rollups(self,
+                                    device_id: str,
+                                    resolution: int,
+                                    start: float,
+                                    end: float,
+                                    limit: int) -> List[Tuple[int, int, str]]:
+        """
+        Get a device's telemetry rollup buckets in a time range.
+        
+        Args:
+            device_id: The device identifier
+            resolution: Bucket size in seconds
+            start: Earliest bucket start (Unix time)
+            end: Latest bucket start (Unix time)
+            limit: Maximum number of buckets; the most recent are kept
+            
+        Returns:
+            (bucket, samples, stats JSON) tuples in time order
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                '''
+                SELECT bucket, samples, stats FROM telemetry_rollups
+                WHERE device_id = ? AND resolution = ? AND bucket >= ? AND bucket <= ?
+                ORDER BY bucket DESC LIMIT ?
+                ''',
+                (device_id, resolution, start, end, limit)
+            )
+            rows = await cursor.fetchall()
+        return [tuple(row) for row in reversed(rows)]
+    
+    async def prune_telemetry_rollups(self, cutoffs: Dict[int, float]) -> int:
+        """
+        Delete telemetry rollup buckets older than a cutoff per resolution.
+        
+        Args:
+            cutoffs: Resolution to the oldest bucket start (Unix time) to keep
+            
+        Returns:
+            Number of buckets deleted
+        """
+        deleted = 0
+        async with aiosqlite.connect(self.db_path) as db:
+            for resolution, cutoff in cutoffs.items():
+                cursor = await db.execute(
+                    'DELETE FROM telemetry_rollups WHERE resolution = ? AND bucket < ?',
+                    (resolution, cutoff)
+                )
+                deleted += cursor.rowcount
+            await db.commit()
+        return deleted
+    
+    async def create_artifact(self,
+                              device_id: str,
+                              kind: str,
+                              remote_path: Optional[str] = None,
+                              scan_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Record an artifact that is about to be pulled from a device.
+        
+        Args:
+            device_id: The device identifier
+            kind: What is pulled (file, directory or bugreport)
+            remote_path: Path on the device, if any
+            scan_id: Scan the artifact belongs to, if any
+            
+        Returns:
+            The new artifact record, with status "queued"
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                '''
+                INSERT INTO artifacts (device_id, scan_id, kind, remote_path, status)
+                VALUES (?, ?, ?, ?, 'queued')
+                ''',
+                (device_id, scan_id, kind, remote_path)
+            )
+            await db.commit()
+            artifact_id = cursor.lastrowid
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('SELECT * FROM artifacts WHERE id = ?', (artifact_id,))
+            return dict(await cursor.fetchone())
+    
+    async def update_artifact(self, artifact_id: int, **fields: Any) -> None:
+        """
+        Update columns of an artifact record.
+        
+        Args:
+            artifact_id: The artifact ID
+            **fields: Columns to set (local_path, size, sha256, status, error);
+                finished=True also stamps finished_at
+        """
+        finished = fields.pop("finished", False)
+        columns = [f"{name} = ?" for name in fields]
+        if finished:
+            columns.append("finished_at = CURRENT_TIMESTAMP")
+        if not columns:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                f'UPDATE artifacts SET {", ".join(columns)} WHERE id = ?',
+                (*fields.values(), artifact_id)
+            )
+            await db.commit()
+    
+    async def get_artifact(self, artifact_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get an artifact record by its ID.
+        
+        Args:
+            artifact_id: The artifact ID
+            
+        Returns:
+            The artifact record or None if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('SELECT * FROM artifacts WHERE id = ?', (artifact_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+    
+    async def get_artifacts(self,
+                            device_id: Optional[str] = None,
+                            scan_id: Optional[int] = None,
+                            limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get artifact records, newest first.
+        
+        Args:
+            device_id: Only artifacts pulled from this device
+            scan_id: Only artifacts linked to this scan
+            limit: Maximum number of records
+            
+        Returns:
+            List of artifact records
+        """
+        conditions = []
+        params: List[Any] = []
+        if device_id is not None:
+            conditions.append('device_id = ?')
+            params.append(device_id)
+        if scan_id is not None:
+            conditions.append('scan_id = ?')
+            params.append(scan_id)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f'SELECT * FROM artifacts {where} ORDER BY id DESC LIMIT ?',
+                (*params, limit)
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    async def delete_artifact(self, artifact_id: int) -> bool:
+        """
+        Delete an artifact record by its ID.
+        
+        Args:
+            artifact_id: The artifact ID
+            
+        Returns:
+            True if deleted successfully, False if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute('DELETE FROM artifacts WHERE id = ?', (artifact_id,))
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def get_wireless_targets(self) -> List[str]:
+        """
+        Get the addresses of all wireless ADB targets.
+        
+        Returns:
+            host:port addresses in the order they were added
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute('SELECT address FROM wireless_targets ORDER BY added_at, address')
+            return [row[0] for row in await cursor.fetchall()]
+    
+    async def add_wireless_targets(self, addresses: List[str]) -> None:
+        """
+        Add wireless ADB targets; addresses already present are kept as they are.
+        
+        Args:
+            addresses: host:port addresses
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                'INSERT OR IGNORE INTO wireless_targets (address) VALUES (?)',
+                [(address,) for address in addresses]
+            )
+            await db.commit()
+    
+    async def delete_wireless_target(self, address: str) -> bool:
+        """
+        Delete a wireless ADB target.
+        
+        Args:
+            address: host:port address
             
+        Returns:
+            True if deleted successfully, False if not found
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute('DELETE FROM wireless_targets WHERE address = ?', (address,))
+            await db.commit()
             return cursor.rowcount > 0
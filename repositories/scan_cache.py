@@ -0,0 +1,158 @@
+import sys
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+
+class FrozenDict(dict):
+    """Read-only dict handed out by the cache so callers cannot corrupt shared entries."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached scan records are read-only; copy with thaw() before modifying")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __reduce__(self):
+        # Rebuild through the constructor so copy/deepcopy/pickle never mutate
+        return (type(self), (dict(self),))
+
+
+def freeze(value: Any) -> Tuple[Any, int]:
+    """
+    Recursively convert dicts to FrozenDict and lists to tuples.
+
+    Args:
+        value: A JSON-like structure
+
+    Returns:
+        Tuple of (frozen value, approximate size in bytes)
+    """
+    if isinstance(value, dict):
+        size = sys.getsizeof(value)
+        items = {}
+        for key, item in value.items():
+            items[key], item_size = freeze(item)
+            size += sys.getsizeof(key) + item_size
+        return FrozenDict(items), size
+    if isinstance(value, (list, tuple)):
+        size = sys.getsizeof(value)
+        items = []
+        for item in value:
+            frozen, item_size = freeze(item)
+            items.append(frozen)
+            size += item_size
+        return tuple(items), size
+    return value, sys.getsizeof(value)
+
+
+def thaw(value: Any) -> Any:
+    """Return a mutable deep copy of a frozen value."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ScanCache:
+    """Bounded LRU cache capped by entry count and approximate memory use.
+
+    Keys are tuples whose first element is the scan ID, so every variant
+    cached for a scan can be dropped at once with invalidate().
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached entries
+            max_bytes: Maximum approximate memory held by cached entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """
+        Look up an entry and mark it as most recently used.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Tuple, value: Any, size: int) -> None:
+        """
+        Store an entry, evicting least recently used entries to stay in bounds.
+
+        Args:
+            key: The cache key
+            value: The value to cache; it must not be mutated afterwards
+            size: Approximate memory used by the value in bytes
+        """
+        if size > self.max_bytes:
+            return
+
+        self._discard(key)
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, scan_id: int) -> None:
+        """
+        Drop every entry cached for a scan.
+
+        Args:
+            scan_id: The scan ID
+        """
+        for key in [key for key in self._entries if key[0] == scan_id]:
+            self._discard(key)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and current usage."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+    def _discard(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
@@ -0,0 +1,419 @@
+import asyncio
+import datetime
+import hashlib
+import os
+import posixpath
+import re
+import shlex
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from repositories.adb_repository import ADBRepository
+from repositories.db_repository import DBRepository
+from service.connection_manager import device_topic
+
+# What can be pulled: a single file, a directory (as a tar archive) or a
+# bugreport (as the zip `bugreportz -s` streams)
+KINDS = ("file", "directory", "bugreport")
+
+# Bytes read from the adb pipe at a time, and bytes gathered before they are
+# hashed and written to disk in a worker thread. At most two write batches per
+# transfer are held in memory: one being filled and one being written.
+READ_SIZE = 64 * 1024
+WRITE_SIZE = 1024 * 1024
+
+# Leading bytes kept to check the format of what was received
+HEAD_SIZE = 512
+
+
+def _safe_name(name: str) -> str:
+    """Turn a device ID or device file name into a safe local file name."""
+    return re.sub(r"[^\w.-]", "_", name) or "_"
+
+
+def _write(file, digest, data: bytearray) -> None:
+    """Hash and write one batch; runs in a worker thread."""
+    digest.update(data)
+    file.write(data)
+
+
+class _Transfer:
+    """An artifact that is queued or being pulled."""
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.bytes = 0
+        self.started: Optional[float] = None
+        self.bytes_per_sec = 0.0
+        self.part_path: Optional[str] = None
+        self.done = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.record,
+            "bytes": self.bytes,
+            "bytes_per_sec": round(self.bytes_per_sec),
+            "elapsed": round(time.monotonic() - self.started, 3) if self.started else None
+        }
+
+
+class ArtifactService:
+    """Pulls files, directories and bugreports from devices to disk.
+
+    Each pull is one `adb exec-out` process whose output is streamed to a
+    file in batches, hashed with SHA-256 along the way, so an artifact is
+    never held in memory as a whole. Pulls from different devices run in
+    parallel; the number of pulls running at once is limited overall and
+    per device, further pulls wait in a queue. Artifacts are recorded in
+    the database, optionally linked to a scan, and their progress (bytes
+    and bytes per second) is published on the device's topic.
+    """
+
+    def __init__(self,
+                 adb_repo: ADBRepository,
+                 db_repo: DBRepository,
+                 event_bus = None,
+                 artifact_dir: str = "artifacts",
+                 max_concurrent: int = 4,
+                 max_per_device: int = 1,
+                 progress_interval: float = 0.5):
+        """
+        Initialize the artifact service.
+
+        Args:
+            adb_repo: ADB repository for stat calls and exec-out streams
+            db_repo: Database repository for artifact records
+            event_bus: Event bus for real-time updates
+            artifact_dir: Directory artifacts are stored in, one subdirectory per device
+            max_concurrent: Pulls running at once over all devices
+            max_per_device: Pulls running at once from one device
+            progress_interval: Seconds between progress updates of a pull
+        """
+        self.adb_repo = adb_repo
+        self.db_repo = db_repo
+        self.event_bus = event_bus
+        self.artifact_dir = artifact_dir
+        self.max_per_device = max_per_device
+        self.progress_interval = progress_interval
+        self._limit = asyncio.Semaphore(max_concurrent)
+        self._device_limits: Dict[str, asyncio.Semaphore] = {}
+        self._transfers: Dict[int, _Transfer] = {}
+        self.bytes_pulled = 0
+
+    async def pull(self,
+                   device_ids: List[str],
+                   kind: str,
+                   path: Optional[str] = None,
+                   scan_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Queue a pull of the same artifact from one or more devices.
+
+        Args:
+            device_ids: The devices to pull from
+            kind: file, directory or bugreport
+            path: Absolute path on the device (file and directory only)
+            scan_id: Scan to link the artifacts to
+
+        Returns:
+            The queued artifact records, one per device
+
+        Raises:
+            ValueError: If the kind, path or scan is invalid
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        if kind == "bugreport":
+            path = None
+        elif not path or not path.startswith("/") or any(c in path for c in "\0\n"):
+            raise ValueError(f"An absolute device path is required to pull a {kind}")
+        if scan_id is not None and not await self.db_repo.get_scan_meta(scan_id):
+            raise ValueError(f"Scan {scan_id} not found")
+
+        records = []
+        for device_id in dict.fromkeys(device_ids):
+            record = await self.db_repo.create_artifact(device_id, kind, path, scan_id)
+            transfer = self._transfers[record["id"]] = _Transfer(record)
+            transfer.task = asyncio.create_task(self._run(transfer))
+            records.append(transfer.to_dict())
+        return records
+
+    async def get_artifact(self, artifact_id: int, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Get an artifact, including the progress of a running pull.
+
+        Args:
+            artifact_id: The artifact ID
+            wait: Seconds to wait for a queued or running pull to finish
+
+        Returns:
+            The artifact record or None if not found
+        """
+        transfer = self._transfers.get(artifact_id)
+        if transfer is not None:
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(transfer.done.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            if not transfer.done.is_set():
+                return transfer.to_dict()
+        return self._present(await self.db_repo.get_artifact(artifact_id))
+
+    async def list_artifacts(self,
+                             device_id: Optional[str] = None,
+                             scan_id: Optional[int] = None,
+                             limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get artifacts, newest first.
+
+        Args:
+            device_id: Only artifacts pulled from this device
+            scan_id: Only artifacts linked to this scan
+            limit: Maximum number of artifacts
+
+        Returns:
+            The artifact records
+        """
+        records = await self.db_repo.get_artifacts(device_id, scan_id, limit)
+        return [self._present(record) for record in records]
+
+    async def delete_artifact(self, artifact_id: int) -> bool:
+        """
+        Delete an artifact and its file, cancelling its pull if still running.
+
+        Args:
+            artifact_id: The artifact ID
+
+        Returns:
+            True if the artifact existed
+        """
+        transfer = self._transfers.get(artifact_id)
+        if transfer is not None:
+            await self._cancel(transfer)
+        record = await self.db_repo.get_artifact(artifact_id)
+        if record is None:
+            return False
+        if record["local_path"]:
+            try:
+                await asyncio.to_thread(os.remove, record["local_path"])
+            except FileNotFoundError:
+                pass
+        return await self.db_repo.delete_artifact(artifact_id)
+
+    async def stop_all(self) -> None:
+        """Cancel every queued and running pull."""
+        await asyncio.gather(*(self._cancel(transfer) for transfer in list(self._transfers.values())))
+
+    async def stats(self) -> Dict[str, Any]:
+        """Get the number of queued and running pulls and the current throughput."""
+        running = [transfer for transfer in self._transfers.values() if transfer.record["status"] == "running"]
+        return {
+            "running": len(running),
+            "queued": sum(1 for transfer in self._transfers.values() if transfer.record["status"] == "queued"),
+            "bytes_per_sec": round(sum(transfer.bytes_per_sec for transfer in running)),
+            "bytes_pulled": self.bytes_pulled
+        }
+
+    def _present(self, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Add the progress fields to a stored record."""
+        if record is None:
+            return None
+        transfer = self._transfers.get(record["id"])
+        if transfer is not None and not transfer.done.is_set():
+            return transfer.to_dict()
+        if record["status"] in ("queued", "running"):
+            # Left over from a process that stopped while pulling it
+            record = {**record, "status": "failed", "error": "Interrupted"}
+        return {**record, "bytes": record["size"] or 0, "bytes_per_sec": None, "elapsed": None}
+
+    async def _cancel(self, transfer: _Transfer) -> None:
+        if transfer.task:
+            transfer.task.cancel()
+            try:
+                await transfer.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, transfer: _Transfer) -> None:
+        """Wait for a slot, then pull one artifact and record the outcome."""
+        record = transfer.record
+        device_limit = self._device_limits.get(record["device_id"])
+        if device_limit is None:
+            device_limit = self._device_limits[record["device_id"]] = asyncio.Semaphore(self.max_per_device)
+
+        try:
+            # The device slot is taken first so a busy device does not hold a global slot
+            async with device_limit, self._limit:
+                transfer.started = time.monotonic()
+                record["status"] = "running"
+                await self.db_repo.update_artifact(record["id"], status="running")
+                await self._send_update(transfer)
+
+                local_path, size, sha256 = await self._pull(transfer)
+                elapsed = time.monotonic() - transfer.started
+                transfer.bytes_per_sec = size / elapsed if elapsed > 0 else 0.0
+                record.update(status="completed", local_path=local_path, size=size, sha256=sha256)
+        except asyncio.CancelledError:
+            record.update(status="failed", error="Cancelled")
+            raise
+        except Exception as e:
+            record.update(status="failed", error=str(e))
+        finally:
+            if record["status"] != "completed" and transfer.part_path:
+                try:
+                    os.remove(transfer.part_path)
+                except FileNotFoundError:
+                    pass
+            await self.db_repo.update_artifact(
+                record["id"], status=record["status"], local_path=record["local_path"],
+                size=record["size"], sha256=record["sha256"], error=record["error"], finished=True
+            )
+            record.update(await self.db_repo.get_artifact(record["id"]) or {})
+            transfer.done.set()
+            self._transfers.pop(record["id"], None)
+            await self._send_update(transfer)
+
+    async def _pull(self, transfer: _Transfer) -> Tuple[str, int, str]:
+        """
+        Stream an artifact to its file.
+
+        Returns:
+            The file's path, size and SHA-256 hex digest
+        """
+        record = transfer.record
+        device_id, kind, remote_path = record["device_id"], record["kind"], record["remote_path"]
+
+        expected_size = None
+        if kind == "file":
+            expected_size, file_type = await self._stat(device_id, remote_path)
+            if file_type != "regular file":
+                raise Exception(f"{remote_path} is a {file_type}, not a regular file")
+            command = f"cat {shlex.quote(remote_path)}"
+            name = posixpath.basename(remote_path)
+        elif kind == "directory":
+            _, file_type = await self._stat(device_id, remote_path)
+            if file_type != "directory":
+                raise Exception(f"{remote_path} is a {file_type}, not a directory")
+            parent, name = posixpath.split(remote_path.rstrip("/"))
+            command = f"tar -cf - -C {shlex.quote(parent or '/')} {shlex.quote(name or '.')}"
+            name = f"{name or 'root'}.tar"
+        else:
+            command = "bugreportz -s"
+            name = f"bugreport-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+
+        directory = os.path.join(self.artifact_dir, _safe_name(device_id))
+        local_path = os.path.join(directory, f"{record['id']}-{_safe_name(name)}")
+        transfer.part_path = local_path + ".part"
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+
+        size, sha256, head = await self._stream(transfer, command)
+
+        if kind == "file" and size != expected_size:
+            raise Exception(f"Received {size} of {expected_size} bytes of {remote_path}")
+        if kind == "directory" and head[257:262] != b"ustar":
+            raise Exception(f"tar failed: {self._describe(head)}")
+        if kind == "bugreport" and not head.startswith(b"PK"):
+            # bugreportz reports failures as "FAIL:<reason>" instead of a zip
+            raise Exception(f"bugreportz failed: {self._describe(head)}")
+
+        await asyncio.to_thread(os.replace, transfer.part_path, local_path)
+        transfer.part_path = None
+        return local_path, size, sha256
+
+    async def _stat(self, device_id: str, remote_path: str) -> Tuple[int, str]:
+        """Get the size and type ("regular file", "directory", ...) of a device path."""
+        # Quoted twice: once for the local shell, once for the device's
+        command = shlex.quote(f"stat -c '%s %F' {shlex.quote(remote_path)}")
+        try:
+            output = await self.adb_repo.execute_command(device_id, command)
+            size, file_type = output.strip().split(" ", 1)
+            return int(size), file_type
+        except ValueError:
+            raise Exception(f"Cannot stat {remote_path}: {output.strip()}")
+        except Exception as e:
+            raise Exception(f"Cannot stat {remote_path}: {str(e).strip()}")
+
+    async def _stream(self, transfer: _Transfer, command: str) -> Tuple[int, str, bytes]:
+        """
+        Run a command with `adb exec-out` and write its output to the transfer's part file.
+
+        Batches are hashed and written in a worker thread while the next
+        batch is read from the pipe.
+
+        Returns:
+            The number of bytes received, their SHA-256 hex digest and the leading bytes
+        """
+        device_id = transfer.record["device_id"]
+        digest = hashlib.sha256()
+        head = b""
+        process = None
+        writing: Optional[asyncio.Future] = None
+        file = await asyncio.to_thread(open, transfer.part_path, "wb")
+        try:
+            process = await self.adb_repo.open_stream(device_id, "exec-out", command)
+            buffer = bytearray()
+            last_time, last_bytes = transfer.started, 0
+            while True:
+                chunk = await process.stdout.read(READ_SIZE)
+                if chunk:
+                    buffer += chunk
+                    transfer.bytes += len(chunk)
+                    self.bytes_pulled += len(chunk)
+                    if len(head) < HEAD_SIZE:
+                        head += chunk[:HEAD_SIZE - len(head)]
+
+                if buffer and (len(buffer) >= WRITE_SIZE or not chunk):
+                    if writing:
+                        await writing
+                    writing = asyncio.ensure_future(asyncio.to_thread(_write, file, digest, buffer))
+                    buffer = bytearray()
+
+                now = time.monotonic()
+                if now - last_time >= self.progress_interval:
+                    transfer.bytes_per_sec = (transfer.bytes - last_bytes) / (now - last_time)
+                    last_time, last_bytes = now, transfer.bytes
+                    await self._send_update(transfer, progress=True)
+
+                if not chunk:
+                    break
+            if writing:
+                await writing
+        finally:
+            if process:
+                if process.returncode is None:
+                    process.kill()
+                # The exit is only reported once the rest of stdout has been read
+                await process.communicate()
+            if writing and not writing.done():
+                # The file must not be closed under a batch still being written
+                await asyncio.wait([writing])
+            await asyncio.to_thread(file.close)
+        return transfer.bytes, digest.hexdigest(), head
+
+    @staticmethod
+    def _describe(head: bytes) -> str:
+        text = head.decode("utf-8", errors="replace").strip()
+        return text[:200] or "no output"
+
+    async def _send_update(self, transfer: _Transfer, progress: bool = False) -> None:
+        """Publish an artifact's status or progress on its device's topic."""
+        if self.event_bus:
+            record = transfer.record
+            await self.event_bus.publish(
+                {
+                    "type": "artifact_update",
+                    "artifact_id": record["id"],
+                    "device_id": record["device_id"],
+                    "scan_id": record["scan_id"],
+                    "kind": record["kind"],
+                    "status": record["status"],
+                    "bytes": transfer.bytes,
+                    "bytes_per_sec": round(transfer.bytes_per_sec),
+                    "error": record["error"],
+                    "timestamp": datetime.datetime.now().isoformat()
+                },
+                topics=[device_topic(record["device_id"])],
+                # Each progress update supersedes the previous one of the same pull
+                coalesce_key=("artifact_update", record["id"]) if progress else None
+            )
@@ -0,0 +1,357 @@
+import asyncio
+import json
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+# Close code sent to clients evicted for not keeping up (1013: try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Topics a client may subscribe to: "devices" (all device events),
+# "device:<serial>", "job:<job_id>", "telemetry:<serial>" and "logcat:<serial>"
+TOPIC_DEVICES = "devices"
+TOPIC_PREFIXES = ("device:", "job:", "telemetry:", "logcat:")
+# High-volume topics only delivered to clients subscribed to them, never to
+# clients that receive everything, and not kept for replay; clients catch up
+# through the REST queries instead
+SUBSCRIBER_ONLY_PREFIXES = ("telemetry:", "logcat:")
+
+
+def device_topic(device_id: str) -> str:
+    """Topic for messages about one device."""
+    return f"device:{device_id}"
+
+
+def job_topic(job_id: str) -> str:
+    """Topic for messages about one scan job."""
+    return f"job:{job_id}"
+
+
+def telemetry_topic(device_id: str) -> str:
+    """Topic for telemetry samples of one device."""
+    return f"telemetry:{device_id}"
+
+
+def logcat_topic(device_id: str) -> str:
+    """Topic for logcat records of one device."""
+    return f"logcat:{device_id}"
+
+
+def is_subscriber_only(topics: Optional[Iterable[str]]) -> bool:
+    """Whether a message published to these topics goes to their subscribers only."""
+    return bool(topics) and all(topic.startswith(SUBSCRIBER_ONLY_PREFIXES) for topic in topics)
+
+
+def is_valid_topic(topic: Any) -> bool:
+    """Whether a client-supplied topic name is one the server publishes."""
+    if not isinstance(topic, str):
+        return False
+    if topic == TOPIC_DEVICES:
+        return True
+    return any(topic.startswith(prefix) and len(topic) > len(prefix) for prefix in TOPIC_PREFIXES)
+
+
+class _Client:
+    """A connected WebSocket with its outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, batch: bool = False):
+        self.websocket = websocket
+        self.batch = batch  # Accepts {"type": "batch"} frames
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+
+
+class ConnectionManager:
+    """Fans messages out to WebSocket clients without letting one client stall the rest.
+
+    Each client has a bounded outbound queue drained by its own writer task.
+    broadcast() only enqueues, so it never waits on a socket; a client whose
+    queue is full is too slow to keep up and is disconnected.
+
+    Clients may subscribe to topics; a subscribed client only receives
+    messages published to one of its topics (and messages without topics).
+    Clients that never subscribe receive everything except subscriber-only
+    topics (telemetry, logcat).
+
+    Clients that opt into batching receive the events of one flush as a
+    single {"type": "batch", "events": [...]} frame; the frame is encoded
+    once per distinct set of events and shared by the clients receiving it.
+    """
+
+    def __init__(self, queue_size: int = 256, close_timeout: float = 5.0):
+        """
+        Initialize the connection manager.
+
+        Args:
+            queue_size: Maximum messages buffered per client before eviction
+            close_timeout: Seconds to wait for a socket to close cleanly
+        """
+        self.queue_size = queue_size
+        self.close_timeout = close_timeout
+        self._clients: Dict[WebSocket, _Client] = {}
+        self._subscribers: Dict[str, Set[_Client]] = {}  # topic -> subscribed clients
+        self._unfiltered: Set[_Client] = set()  # clients with no subscriptions
+        self._closing = set()  # Strong references to pending close tasks
+        self.total_connections = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.send_errors = 0
+        self.slow_consumers_evicted = 0
+        self.frames_batched = 0
+        # Called with the number of connected clients whenever it changes
+        self.on_connections_changed: Optional[Callable[[int], None]] = None
+
+    @property
+    def active_connections(self) -> list:
+        """The currently connected sockets."""
+        return list(self._clients)
+
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = (), batch: bool = False) -> None:
+        """
+        Accept a socket and start its writer task.
+
+        Args:
+            websocket: The incoming WebSocket
+            topics: Topics to subscribe the client to from the start
+            batch: Whether the client accepts batch frames
+        """
+        await websocket.accept()
+        client = _Client(websocket, self.queue_size, batch)
+        client.writer = asyncio.create_task(self._write(client))
+        self._clients[websocket] = client
+        self._unfiltered.add(client)
+        self.total_connections += 1
+        self.subscribe(websocket, topics)
+        self._connections_changed()
+
+    def send(self, websocket: WebSocket, message: str) -> None:
+        """
+        Queue a message for one client.
+
+        Args:
+            websocket: The client's WebSocket
+            message: The text frame to send
+        """
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._enqueue(client, message)
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        """
+        Forget a socket and stop its writer. Safe to call more than once.
+
+        Args:
+            websocket: The WebSocket to remove
+        """
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        self._unfiltered.discard(client)
+        self._unsubscribe(client, list(client.topics))
+        self.messages_dropped += client.queue.qsize()
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        self._connections_changed()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """
+        Add topic subscriptions for a client.
+
+        Args:
+            websocket: The client's WebSocket
+            topics: Topic names (see is_valid_topic)
+
+        Returns:
+            The client's subscriptions after the change
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return []
+        for topic in topics:
+            client.topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(client)
+        if client.topics:
+            self._unfiltered.discard(client)
+        return sorted(client.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """
+        Remove topic subscriptions for a client. A client left with no
+        subscriptions receives everything again.
+
+        Args:
+            websocket: The client's WebSocket
+            topics: Topic names
+
+        Returns:
+            The client's subscriptions after the change
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return []
+        self._unsubscribe(client, topics)
+        if not client.topics:
+            self._unfiltered.add(client)
+        return sorted(client.topics)
+
+    async def handle_message(self, websocket: WebSocket, text: str) -> None:
+        """
+        Handle a control message sent by a client.
+
+        Supported messages are {"action": "subscribe", "topics": [...]} and
+        {"action": "unsubscribe", "topics": [...]}; the reply lists the
+        client's current subscriptions.
+
+        Args:
+            websocket: The client's WebSocket
+            text: The received text frame
+        """
+        try:
+            request = json.loads(text)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            # Anything else is treated as a keep-alive
+            return
+
+        action = request.get("action")
+        topics = request.get("topics", [])
+        if isinstance(topics, str):
+            topics = [topics]
+
+        if action not in ("subscribe", "unsubscribe"):
+            reply = {"type": "error", "message": f"Unknown action: {action}"}
+        elif not isinstance(topics, list) or not all(is_valid_topic(topic) for topic in topics):
+            reply = {
+                "type": "error",
+                "message": "topics must be a list of 'devices', 'device:<serial>', 'job:<job_id>', "
+                           "'telemetry:<serial>' or 'logcat:<serial>'"
+            }
+        elif action == "subscribe":
+            reply = {"type": "subscribed", "topics": self.subscribe(websocket, topics)}
+        else:
+            reply = {"type": "subscribed", "topics": self.unsubscribe(websocket, topics)}
+
+        self.send(websocket, json.dumps(reply))
+
+    async def broadcast(self, message: str, topics: Optional[Iterable[str]] = None) -> None:
+        """
+        Queue a message for interested clients without waiting on any socket.
+
+        Args:
+            message: The text frame to send
+            topics: Topics the message belongs to; None sends it to every client
+        """
+        for client in self._recipients(topics):
+            self._enqueue(client, message)
+
+    async def broadcast_batch(self, events: List[Tuple[str, Optional[List[str]]]]) -> None:
+        """
+        Queue a batch of already encoded events.
+
+        Batching clients get the events they are subscribed to in one frame;
+        other clients get them one frame per event.
+
+        Args:
+            events: (message, topics) pairs in delivery order
+        """
+        if len(events) == 1:
+            await self.broadcast(*events[0])
+            return
+
+        per_client: Dict[_Client, List[int]] = {}
+        for index, (_, topics) in enumerate(events):
+            for client in self._recipients(topics):
+                per_client.setdefault(client, []).append(index)
+
+        frames: Dict[Tuple[int, ...], str] = {}
+        for client, indices in per_client.items():
+            if not client.batch or len(indices) == 1:
+                for index in indices:
+                    self._enqueue(client, events[index][0])
+                continue
+
+            key = tuple(indices)
+            frame = frames.get(key)
+            if frame is None:
+                # Events are spliced in already encoded
+                frame = frames[key] = '{"type": "batch", "events": [' + ", ".join(events[index][0] for index in indices) + "]}"
+            self.frames_batched += len(indices) - 1
+            self._enqueue(client, frame)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get connection and delivery counters."""
+        return {
+            "active_connections": len(self._clients),
+            "subscribed_topics": len(self._subscribers),
+            "total_connections": self.total_connections,
+            "queue_size": self.queue_size,
+            "queued_messages": sum(client.queue.qsize() for client in self._clients.values()),
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "send_errors": self.send_errors,
+            "slow_consumers_evicted": self.slow_consumers_evicted,
+            "frames_saved_by_batching": self.frames_batched
+        }
+
+    def _connections_changed(self) -> None:
+        if self.on_connections_changed:
+            self.on_connections_changed(len(self._clients))
+
+    def _recipients(self, topics: Optional[Iterable[str]]) -> Iterable[_Client]:
+        """Clients that should receive a message published to the given topics."""
+        if topics is None:
+            return list(self._clients.values())
+        recipients = set() if is_subscriber_only(topics) else set(self._unfiltered)
+        for topic in topics:
+            recipients.update(self._subscribers.get(topic, ()))
+        return recipients
+
+    def _unsubscribe(self, client: _Client, topics: Iterable[str]) -> None:
+        for topic in topics:
+            client.topics.discard(topic)
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def _enqueue(self, client: _Client, message: str) -> bool:
+        """Queue a message for one client, evicting the client if its queue is full."""
+        try:
+            client.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.slow_consumers_evicted += 1
+            self.messages_dropped += 1
+            self._evict(client, SLOW_CONSUMER_CLOSE_CODE)
+            return False
+
+    def _evict(self, client: _Client, code: int) -> None:
+        """Disconnect a client and close its socket in the background."""
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.close_timeout)
+        except Exception:
+            # The socket is already gone or wedged; it has been forgotten either way
+            pass
+
+    async def _write(self, client: _Client) -> None:
+        """Writer task: drain the client's queue onto its socket."""
+        while True:
+            message = await client.queue.get()
+            try:
+                await client.websocket.send_text(message)
+            except Exception:
+                # Dead socket: drop it so broadcasts stop queuing for it
+                self.send_errors += 1
+                self.messages_dropped += 1
+                self.disconnect(client.websocket)
+                return
+            self.messages_sent += 1
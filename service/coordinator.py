@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from repositories.adb_repository import ADBRepository
+from service.artifact_service import ArtifactService
+from service.device_service import DeviceService
+from service.event_bus import EventBus
+from service.logcat_service import LogcatService
+from service.telemetry_service import TelemetryService
+from service.wireless_service import WirelessService
+
+# Largest IPC message (one JSON line), e.g. a package list returned by adb
+IPC_LINE_LIMIT = 16 * 1024 * 1024
+
+# Bytes a worker may leave unread before it is disconnected as a slow consumer
+SUBSCRIBER_BUFFER_LIMIT = 2 * IPC_LINE_LIMIT
+
+
+class CoordinatorEventBus(EventBus):
+    """Event bus of the coordinator: numbers every worker's events and fans them out to all workers."""
+
+    def __init__(self, max_subscriber_buffer: int = SUBSCRIBER_BUFFER_LIMIT, **kwargs):
+        """
+        Initialize the event bus.
+
+        Args:
+            max_subscriber_buffer: Bytes buffered for a worker that is not
+                reading before it is disconnected
+            **kwargs: EventBus settings
+        """
+        super().__init__(connection_manager=None, **kwargs)
+        self.max_subscriber_buffer = max_subscriber_buffer
+        self.subscribers: Set[asyncio.StreamWriter] = set()
+
+    async def _deliver(self, batch: List[Tuple[int, str, Optional[List[str]]]]) -> None:
+        self.broadcast({"events": batch})
+
+    def broadcast(self, message: Dict[str, Any]) -> None:
+        """Send a message to every subscribed worker."""
+        line = json.dumps(message).encode() + b"\n"
+        for writer in list(self.subscribers):
+            if writer.is_closing():
+                self.subscribers.discard(writer)
+                continue
+            # Writes are buffered; workers drain them on their own schedule, but a
+            # stalled worker must not grow the buffer without bound. Closing the
+            # connection makes it reconnect and subscribe again
+            if writer.transport.get_write_buffer_size() + len(line) > self.max_subscriber_buffer:
+                self.subscribers.discard(writer)
+                writer.close()
+                print("Disconnected a worker that stopped reading events")
+                continue
+            writer.write(line)
+
+
+class JobDirectory:
+    """Latest state of every worker's scan jobs, so any worker can answer a long-poll."""
+
+    def __init__(self, max_jobs: int = 1000, finished_ttl: float = 3600.0):
+        """
+        Initialize the directory.
+
+        Args:
+            max_jobs: Number of jobs retained; the oldest are forgotten first
+            finished_ttl: Seconds a finished job is kept after it finished
+        """
+        self.max_jobs = max_jobs
+        self.finished_ttl = finished_ttl
+        self._jobs: "OrderedDict[str, Tuple[Dict[str, Any], asyncio.Event]]" = OrderedDict()
+        self._finished: Dict[str, float] = {}  # Job ID -> time.monotonic() it finished
+
+    async def update(self, job: Dict[str, Any]) -> None:
+        """Record a job's state as reported by the worker running it."""
+        self._expire()
+        entry = self._jobs.get(job["job_id"])
+        if entry is None:
+            entry = self._jobs[job["job_id"]] = (job, asyncio.Event())
+            while len(self._jobs) > self.max_jobs:
+                self._finished.pop(self._jobs.popitem(last=False)[0], None)
+        else:
+            entry = self._jobs[job["job_id"]] = (job, entry[1])
+        if job["finished_at"]:
+            self._finished.setdefault(job["job_id"], time.monotonic())
+            entry[1].set()
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait for a job to finish, up to a timeout; None if unknown."""
+        self._expire()
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(entry[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._jobs.get(job_id, entry)[0]
+
+    def _expire(self) -> None:
+        """Forget the jobs that finished more than finished_ttl seconds ago."""
+        now = time.monotonic()
+        for job_id in [job_id for job_id, finished in self._finished.items()
+                       if now - finished > self.finished_ttl]:
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+
+class CoordinatorServer:
+    """Owns ADB and device state for a multi-worker deployment.
+
+    HTTP/WebSocket workers connect over a Unix socket and exchange
+    newline-delimited JSON. Requests are {"id", "method", "params"} and get
+    {"id", "result"} or {"id", "error"} back; a connection that calls
+    events.subscribe additionally receives {"events": [[seq, event, topics], ...]}
+    for every event published by any worker or by the device poller, and
+    {"invalidate_scan": scan_id} whenever a worker deletes a scan.
+    Requests sent with a null id get no response.
+    """
+
+    def __init__(self,
+                 socket_path: str,
+                 adb_repo: ADBRepository,
+                 device_service: DeviceService,
+                 event_bus: CoordinatorEventBus,
+                 telemetry_service: Optional[TelemetryService] = None,
+                 logcat_service: Optional[LogcatService] = None,
+                 artifact_service: Optional[ArtifactService] = None,
+                 wireless_service: Optional[WirelessService] = None):
+        """
+        Initialize the coordinator.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+            adb_repo: The only ADB repository in the deployment
+            device_service: The only device poller and registry in the deployment
+            event_bus: Bus numbering and fanning out events for all workers
+            telemetry_service: The only telemetry sampler in the deployment
+            logcat_service: The only logcat capture in the deployment
+            artifact_service: The only artifact puller in the deployment
+            wireless_service: The only manager of Wi-Fi connections in the deployment
+        """
+        self.socket_path = socket_path
+        self.adb_repo = adb_repo
+        self.device_service = device_service
+        self.event_bus = event_bus
+        self.telemetry_service = telemetry_service
+        self.logcat_service = logcat_service
+        self.artifact_service = artifact_service
+        self.wireless_service = wireless_service
+        self.jobs = JobDirectory()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._methods = {
+            "adb.execute_command": adb_repo.execute_command,
+            "adb.get_connected_devices": adb_repo.get_connected_devices,
+            "adb.get_device_states": adb_repo.get_device_states,
+            "adb.is_device_connected": adb_repo.is_device_connected,
+            "adb.authorize_device": adb_repo.authorize_device,
+            "adb.start_adb_server": adb_repo.start_adb_server,
+            "adb.connect_device": adb_repo.connect_device,
+            "adb.disconnect_device": adb_repo.disconnect_device,
+            "adb.ping_device": adb_repo.ping_device,
+            "devices.get_connected_devices": device_service.get_connected_devices,
+            "devices.get_device_info": device_service.get_device_info,
+            "devices.set_scanning": device_service.set_scanning,
+            "devices.start_device_polling": device_service.start_device_polling,
+            "devices.stop_device_polling": device_service.stop_device_polling,
+            "devices.wait_for_device": device_service.wait_for_device,
+            "events.publish": self._publish,
+            "scans.invalidate": self._invalidate_scan,
+            "jobs.update": self.jobs.update,
+            "jobs.wait": self.jobs.wait,
+        }
+        if telemetry_service:
+            self._methods.update({
+                "telemetry.start": telemetry_service.start,
+                "telemetry.stop": telemetry_service.stop,
+                "telemetry.get_series": telemetry_service.get_series,
+                "telemetry.get_latest": telemetry_service.get_latest,
+                "telemetry.stats": telemetry_service.stats,
+            })
+        if logcat_service:
+            self._methods.update({
+                "logcat.start": logcat_service.start,
+                "logcat.stop": logcat_service.stop,
+                "logcat.query": logcat_service.query,
+                "logcat.sessions": logcat_service.sessions,
+            })
+        if artifact_service:
+            self._methods.update({
+                "artifacts.pull": artifact_service.pull,
+                "artifacts.get_artifact": artifact_service.get_artifact,
+                "artifacts.list_artifacts": artifact_service.list_artifacts,
+                "artifacts.delete_artifact": artifact_service.delete_artifact,
+                "artifacts.stats": artifact_service.stats,
+            })
+        if wireless_service:
+            self._methods.update({
+                "wireless.add_targets": wireless_service.add_targets,
+                "wireless.remove_target": wireless_service.remove_target,
+                "wireless.reconnect": wireless_service.reconnect,
+                "wireless.get_targets": wireless_service.get_targets,
+                "wireless.ensure_connected": wireless_service.ensure_connected,
+            })
+
+    async def start(self) -> None:
+        """Start listening, replacing a stale socket file left by a previous run, and connect wireless targets."""
+        if self.wireless_service:
+            await self.wireless_service.start()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=self.socket_path, limit=IPC_LINE_LIMIT
+        )
+
+    async def serve_forever(self) -> None:
+        """Start the server and run until cancelled."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Stop listening, the device poller, telemetry sampling, logcat captures, artifact pulls and wireless keep-alives."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.device_service.stop_device_polling()
+        if self.telemetry_service:
+            await self.telemetry_service.stop()
+        if self.logcat_service:
+            await self.logcat_service.stop_all()
+        if self.artifact_service:
+            await self.artifact_service.stop_all()
+        if self.wireless_service:
+            await self.wireless_service.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _publish(self,
+                       event: Dict[str, Any],
+                       topics: Optional[List[str]] = None,
+                       coalesce_key: Any = None) -> None:
+        # JSON turns a worker's coalesce key tuple into a list; keys must be hashable
+        if isinstance(coalesce_key, list):
+            coalesce_key = tuple(coalesce_key)
+        await self.event_bus.publish(event, topics, coalesce_key)
+
+    async def _invalidate_scan(self, scan_id: int) -> None:
+        # Each worker caches scan records and diffs; all of them must drop a deleted scan
+        self.event_bus.broadcast({"invalidate_scan": scan_id})
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one worker connection; each request runs concurrently."""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._handle_request(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.event_bus.subscribers.discard(writer)
+            self.device_service.set_listener_count(f"worker-{id(writer)}", 0)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _handle_request(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        """Run one RPC request and write its response."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            method = request.get("method")
+            params = request.get("params") or {}
+
+            if method == "events.subscribe":
+                self.event_bus.subscribers.add(writer)
+                response = {"id": request_id, "result": {"last_seq": self.event_bus.last_seq}}
+            elif method == "devices.set_listener_count":
+                # Counted per worker connection so a worker that dies stops counting
+                self.device_service.set_listener_count(f"worker-{id(writer)}", params.get("count", 0))
+                response = {"id": request_id, "result": None}
+            elif method in self._methods:
+                response = {"id": request_id, "result": await self._methods[method](**params)}
+            else:
+                response = {"id": request_id, "error": f"Unknown method: {method}"}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+
+        if request_id is not None and not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
@@ -0,0 +1,495 @@
+import asyncio
+import itertools
+import json
+from typing import Dict, Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+from repositories.adb_repository import ADBRepository
+from service.coordinator import IPC_LINE_LIMIT
+from service.event_bus import EventBus
+from service.scan_jobs import ScanJob, ScanJobRegistry
+
+
+class CoordinatorClient:
+    """A worker's connection to the coordinator process.
+
+    Requests are multiplexed over one Unix socket and matched to responses
+    by ID. Events pushed by the coordinator are handed to the worker's
+    RemoteEventBus, and scan deletions to the invalidate callbacks. The connection is re-established if the coordinator
+    restarts.
+    """
+
+    def __init__(self, socket_path: str, reconnect_delay: float = 1.0):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Path of the coordinator's Unix socket
+            reconnect_delay: Seconds between reconnection attempts
+        """
+        self.socket_path = socket_path
+        self.reconnect_delay = reconnect_delay
+        self.event_bus: Optional["RemoteEventBus"] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+        self._connect_callbacks: List[Callable[[], None]] = []
+        self._invalidate_callbacks: List[Callable[[int], None]] = []
+
+    def add_connect_callback(self, callback: Callable[[], None]) -> None:
+        """Call callback() after every (re)connection, e.g. to restore state held by the coordinator."""
+        self._connect_callbacks.append(callback)
+
+    def add_invalidate_callback(self, callback: Callable[[int], None]) -> None:
+        """Call callback(scan_id) whenever any worker deletes a scan, e.g. to drop it from local caches."""
+        self._invalidate_callbacks.append(callback)
+
+    async def start(self, event_bus: Optional["RemoteEventBus"] = None, timeout: float = 10.0) -> None:
+        """
+        Connect to the coordinator and subscribe to its events.
+
+        Args:
+            event_bus: Bus receiving the coordinator's events
+            timeout: Seconds to wait for the first connection
+        """
+        self.event_bus = event_bus
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def close(self) -> None:
+        """Disconnect and stop reconnecting."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._writer:
+            self._writer.close()
+
+    async def call(self, method: str, **params) -> Any:
+        """
+        Call a coordinator method.
+
+        Args:
+            method: Method name, e.g. "adb.execute_command"
+            **params: Keyword arguments for the method
+
+        Returns:
+            The method's result
+        """
+        await self._connected.wait()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(json.dumps({"id": request_id, "method": method, "params": params}).encode() + b"\n")
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    def notify(self, method: str, **params) -> None:
+        """
+        Send a request without waiting for its result. Dropped while disconnected.
+
+        The request is written before this returns, so it reaches the
+        coordinator ahead of anything this worker sends afterwards.
+
+        Args:
+            method: Method name
+            **params: Keyword arguments for the method
+        """
+        if self._connected.is_set():
+            self._writer.write(json.dumps({"id": None, "method": method, "params": params}).encode() + b"\n")
+
+    async def _run(self) -> None:
+        """Keep a connection open, reconnecting when it drops."""
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=IPC_LINE_LIMIT)
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            request_id = next(self._ids)
+            self._pending[request_id] = asyncio.get_running_loop().create_future()
+            self._writer.write(json.dumps({"id": request_id, "method": "events.subscribe"}).encode() + b"\n")
+            self._connected.set()
+            for callback in self._connect_callbacks:
+                callback()
+            try:
+                await self._read(reader)
+            except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                pass
+            finally:
+                self._connected.clear()
+                self._writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(Exception("Lost connection to coordinator"))
+                self._pending.clear()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        """Dispatch responses and pushed events until the connection closes."""
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+
+            if "events" in message:
+                if self.event_bus:
+                    await self.event_bus.ingest(message["events"])
+                continue
+
+            if "invalidate_scan" in message:
+                for callback in self._invalidate_callbacks:
+                    callback(message["invalidate_scan"])
+                continue
+
+            future = self._pending.get(message.get("id"))
+            if future is None or future.done():
+                continue
+            if "error" in message:
+                future.set_exception(Exception(message["error"]))
+            else:
+                future.set_result(message.get("result"))
+
+
+class RemoteADBRepository(ADBRepository):
+    """ADBRepository that runs every command in the coordinator process."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the repository.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        super().__init__()
+        self.client = client
+
+    async def execute_command(self, device_id: str, command: str) -> str:
+        return await self.client.call("adb.execute_command", device_id=device_id, command=command)
+
+    async def get_connected_devices(self) -> List[str]:
+        return await self.client.call("adb.get_connected_devices")
+
+    async def get_device_states(self) -> Dict[str, str]:
+        return await self.client.call("adb.get_device_states")
+
+    async def authorize_device(self, device_id: str) -> bool:
+        return await self.client.call("adb.authorize_device", device_id=device_id)
+
+    async def is_device_connected(self, device_id: str) -> bool:
+        return await self.client.call("adb.is_device_connected", device_id=device_id)
+
+    async def start_adb_server(self) -> None:
+        await self.client.call("adb.start_adb_server")
+
+    async def connect_device(self, address: str, timeout: float = 10.0) -> None:
+        await self.client.call("adb.connect_device", address=address, timeout=timeout)
+
+    async def disconnect_device(self, address: str) -> None:
+        await self.client.call("adb.disconnect_device", address=address)
+
+    async def ping_device(self, device_id: str, timeout: float = 5.0) -> bool:
+        return await self.client.call("adb.ping_device", device_id=device_id, timeout=timeout)
+
+    async def open_stream(self, device_id: str, *args: str) -> asyncio.subprocess.Process:
+        # Its only callers, LogcatService and ArtifactService, run in the coordinator;
+        # workers use RemoteLogcatService and RemoteArtifactService instead, since a
+        # process's output cannot be piped over RPC
+        raise Exception(f"Cannot stream from {device_id} in a worker; ADB streams are only opened by the coordinator")
+
+
+class RemoteDeviceService:
+    """Worker-side stand-in for DeviceService; the registry and poller live in the coordinator."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the service.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        self.client = client
+        self._listener_count = 0
+        client.add_connect_callback(self._send_listener_count)
+
+    def set_listener_count(self, source: str, count: int) -> None:
+        # The coordinator counts each worker as one source
+        self._listener_count = count
+        self._send_listener_count()
+
+    def _send_listener_count(self) -> None:
+        self.client.notify("devices.set_listener_count", count=self._listener_count)
+
+    async def start_device_polling(self) -> None:
+        await self.client.call("devices.start_device_polling")
+
+    async def stop_device_polling(self) -> None:
+        await self.client.call("devices.stop_device_polling")
+
+    async def get_connected_devices(self, include_lost: bool = False) -> List[Dict[str, Any]]:
+        return await self.client.call("devices.get_connected_devices", include_lost=include_lost)
+
+    async def get_device_info(self, device_id: str) -> Optional[Dict[str, Any]]:
+        return await self.client.call("devices.get_device_info", device_id=device_id)
+
+    async def set_scanning(self, device_id: str, scanning: bool) -> None:
+        await self.client.call("devices.set_scanning", device_id=device_id, scanning=scanning)
+
+    async def wait_for_device(self,
+                              timeout: int = 30,
+                              device_id: Optional[str] = None,
+                              brand: Optional[str] = None,
+                              new_only: bool = False) -> Optional[str]:
+        return await self.client.call("devices.wait_for_device", timeout=timeout,
+                                      device_id=device_id, brand=brand, new_only=new_only)
+
+
+class RemoteTelemetryService:
+    """Worker-side stand-in for TelemetryService; sampling runs in the coordinator."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the service.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        self.client = client
+
+    async def start(self, interval: Optional[float] = None) -> None:
+        await self.client.call("telemetry.start", interval=interval)
+
+    async def stop(self) -> None:
+        await self.client.call("telemetry.stop")
+
+    async def get_series(self,
+                         device_id: str,
+                         resolution: str = "raw",
+                         start: Optional[float] = None,
+                         end: Optional[float] = None,
+                         metrics: Optional[List[str]] = None,
+                         limit: int = 3600) -> Dict[str, Any]:
+        try:
+            return await self.client.call("telemetry.get_series", device_id=device_id, resolution=resolution,
+                                          start=start, end=end, metrics=metrics, limit=limit)
+        except Exception as e:
+            # Validation errors arrive as plain RPC errors
+            if str(e).startswith(("resolution must", "Unknown metrics")):
+                raise ValueError(str(e))
+            raise
+
+    async def get_latest(self, device_id: str) -> Optional[Dict[str, Any]]:
+        return await self.client.call("telemetry.get_latest", device_id=device_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self.client.call("telemetry.stats")
+
+
+class RemoteLogcatService:
+    """Worker-side stand-in for LogcatService; captures run in the coordinator."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the service.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        self.client = client
+
+    async def _call(self, method: str, **params) -> Any:
+        try:
+            return await self.client.call(method, **params)
+        except Exception as e:
+            # Filter validation errors arrive as plain RPC errors
+            if str(e).startswith(("priority must", "Invalid pattern")):
+                raise ValueError(str(e))
+            raise
+
+    async def start(self,
+                    device_id: str,
+                    priority: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    pattern: Optional[str] = None,
+                    spill: bool = False) -> Dict[str, Any]:
+        return await self._call("logcat.start", device_id=device_id, priority=priority,
+                                tags=tags, pattern=pattern, spill=spill)
+
+    async def stop(self, device_id: str) -> bool:
+        return await self._call("logcat.stop", device_id=device_id)
+
+    async def sessions(self) -> List[Dict[str, Any]]:
+        return await self._call("logcat.sessions")
+
+    async def query(self,
+                    device_id: str,
+                    after: Optional[int] = None,
+                    limit: int = 500,
+                    priority: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    pattern: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await self._call("logcat.query", device_id=device_id, after=after, limit=limit,
+                                priority=priority, tags=tags, pattern=pattern)
+
+
+class RemoteArtifactService:
+    """Worker-side stand-in for ArtifactService; pulls run in the coordinator."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the service.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        self.client = client
+
+    async def pull(self,
+                   device_ids: List[str],
+                   kind: str,
+                   path: Optional[str] = None,
+                   scan_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        try:
+            return await self.client.call("artifacts.pull", device_ids=device_ids, kind=kind,
+                                          path=path, scan_id=scan_id)
+        except Exception as e:
+            # Validation errors arrive as plain RPC errors
+            if str(e).startswith(("kind must", "An absolute device path", "Scan ")):
+                raise ValueError(str(e))
+            raise
+
+    async def get_artifact(self, artifact_id: int, wait: float = 0) -> Optional[Dict[str, Any]]:
+        return await self.client.call("artifacts.get_artifact", artifact_id=artifact_id, wait=wait)
+
+    async def list_artifacts(self,
+                             device_id: Optional[str] = None,
+                             scan_id: Optional[int] = None,
+                             limit: int = 100) -> List[Dict[str, Any]]:
+        return await self.client.call("artifacts.list_artifacts", device_id=device_id,
+                                      scan_id=scan_id, limit=limit)
+
+    async def delete_artifact(self, artifact_id: int) -> bool:
+        return await self.client.call("artifacts.delete_artifact", artifact_id=artifact_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self.client.call("artifacts.stats")
+
+
+class RemoteWirelessService:
+    """Worker-side stand-in for WirelessService; connections are kept in the coordinator."""
+
+    def __init__(self, client: CoordinatorClient):
+        """
+        Initialize the service.
+
+        Args:
+            client: Connection to the coordinator
+        """
+        self.client = client
+
+    async def _call(self, method: str, **params) -> Any:
+        try:
+            return await self.client.call(method, **params)
+        except Exception as e:
+            # Address validation errors arrive as plain RPC errors
+            if str(e).startswith("Invalid address"):
+                raise ValueError(str(e))
+            raise
+
+    async def add_targets(self, addresses: List[str], wait: float = 0) -> List[Dict[str, Any]]:
+        return await self._call("wireless.add_targets", addresses=addresses, wait=wait)
+
+    async def remove_target(self, address: str) -> bool:
+        return await self._call("wireless.remove_target", address=address)
+
+    async def reconnect(self, address: str) -> Optional[Dict[str, Any]]:
+        return await self._call("wireless.reconnect", address=address)
+
+    async def get_targets(self) -> List[Dict[str, Any]]:
+        return await self._call("wireless.get_targets")
+
+    async def ensure_connected(self, device_id: str, timeout: Optional[float] = None) -> bool:
+        return await self._call("wireless.ensure_connected", device_id=device_id, timeout=timeout)
+
+
+class SharedScanJobRegistry(ScanJobRegistry):
+    """Scan job registry whose jobs can be looked up from any worker.
+
+    Jobs run in the worker that created them; their state is mirrored to the
+    coordinator so a long-poll that lands on another worker is answered there.
+    """
+
+    def __init__(self, client: CoordinatorClient, **kwargs):
+        """
+        Initialize the registry.
+
+        Args:
+            client: Connection to the coordinator
+            **kwargs: Settings passed to ScanJobRegistry
+        """
+        super().__init__(**kwargs)
+        self.client = client
+
+    def create(self, device_id: str, scan_type: str) -> ScanJob:
+        job = super().create(device_id, scan_type)
+        self.client.notify("jobs.update", job=job.to_dict())
+        job.add_done_callback(lambda done: self.client.notify("jobs.update", job=done.to_dict()))
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        if self.get(job_id) is not None:
+            return await super().wait(job_id, timeout)
+        return await self.client.call("jobs.wait", job_id=job_id, timeout=timeout)
+
+
+class RemoteEventBus(EventBus):
+    """Worker-side event bus.
+
+    Events are published to the coordinator, which numbers them in one
+    global sequence and pushes them back to every worker. Each worker keeps
+    its own replay buffers of the pushed events and delivers them to its
+    WebSocket clients, so clients see the whole deployment's events
+    whichever worker they are connected to.
+    """
+
+    def __init__(self, client: CoordinatorClient, connection_manager=None, **kwargs):
+        """
+        Initialize the bus.
+
+        Args:
+            client: Connection to the coordinator
+            connection_manager: ConnectionManager of this worker
+            **kwargs: Buffer settings passed to EventBus
+        """
+        super().__init__(connection_manager, **kwargs)
+        self.client = client
+
+    async def publish(self,
+                      event: Dict[str, Any],
+                      topics: Optional[Iterable[str]] = None,
+                      coalesce_key: Optional[Hashable] = None) -> None:
+        # Coalescing happens in the coordinator; JSON turns the key tuple into a list
+        await self.client.call(
+            "events.publish",
+            event=event,
+            topics=list(topics) if topics is not None else None,
+            coalesce_key=list(coalesce_key) if isinstance(coalesce_key, tuple) else coalesce_key
+        )
+
+    async def ingest(self, batch: List[Tuple[int, str, Optional[List[str]]]]) -> None:
+        """
+        Record and deliver a batch pushed by the coordinator.
+
+        Args:
+            batch: (seq, encoded event, topics) triples in sequence order
+        """
+        for seq, encoded, topics in batch:
+            self._record(seq, encoded, topics)
+            self.last_seq = max(self.last_seq, seq)
+        self.batches_sent += 1
+        await self._deliver(batch)
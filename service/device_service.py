@@ -1,51 +1,223 @@
 import asyncio
 import json
+from enum import Enum
 from typing import Dict, Any, List, Optional, Callable
 import datetime
+import time
 
 from repositories.adb_repository import ADBRepository
 from repositories.brand.brand_factory import BrandFactory
+from service.connection_manager import TOPIC_DEVICES, device_topic
+
+class DeviceState(str, Enum):
+    """Lifecycle states of a device tracked by DeviceService."""
+    DISCOVERED = "discovered"      # Listed by adb, not yet set up
+    UNAUTHORIZED = "unauthorized"  # Waiting for USB debugging approval on the device
+    AUTHORIZING = "authorizing"    # Being set up (brand detection, device info)
+    FAILED = "failed"              # Set-up failed; retried once its backoff expires
+    READY = "ready"                # Set up and available for scans
+    SCANNING = "scanning"          # A scan is running
+    LOST = "lost"                  # Gone from adb for longer than the debounce window
+
+# Allowed transitions; anything else indicates a bug
+TRANSITIONS = {
+    DeviceState.DISCOVERED: {DeviceState.AUTHORIZING, DeviceState.UNAUTHORIZED, DeviceState.LOST},
+    DeviceState.UNAUTHORIZED: {DeviceState.AUTHORIZING, DeviceState.LOST},
+    DeviceState.AUTHORIZING: {DeviceState.READY, DeviceState.UNAUTHORIZED, DeviceState.FAILED, DeviceState.LOST},
+    DeviceState.FAILED: {DeviceState.AUTHORIZING, DeviceState.UNAUTHORIZED, DeviceState.LOST},
+    DeviceState.READY: {DeviceState.SCANNING, DeviceState.UNAUTHORIZED, DeviceState.LOST},
+    DeviceState.SCANNING: {DeviceState.READY, DeviceState.UNAUTHORIZED, DeviceState.LOST},
+    DeviceState.LOST: {DeviceState.DISCOVERED, DeviceState.AUTHORIZING, DeviceState.UNAUTHORIZED, DeviceState.READY},
+}
+
+# Legacy "status" values reported alongside the state
+STATUS_BY_STATE = {
+    DeviceState.DISCOVERED: "discovered",
+    DeviceState.UNAUTHORIZED: "pending_authorization",
+    DeviceState.AUTHORIZING: "authorizing",
+    DeviceState.FAILED: "error",
+    DeviceState.READY: "connected",
+    DeviceState.SCANNING: "connected",
+    DeviceState.LOST: "disconnected",
+}
+
+class DeviceRecord:
+    """A tracked device: its lifecycle state, when it entered each state and its info."""
+    
+    def __init__(self, device_id: str):
+        """
+        Create a record in the discovered state.
+        
+        Args:
+            device_id: The device identifier
+        """
+        self.device_id = device_id
+        self.state = DeviceState.DISCOVERED
+        self.state_changed_at = time.monotonic()
+        self.state_timestamps = {DeviceState.DISCOVERED.value: datetime.datetime.now().isoformat()}
+        self.info: Dict[str, Any] = {"device_id": device_id}  # Filled in once set up
+        self.missing_since: Optional[float] = None  # time.monotonic() when adb stopped listing it
+        self.ready_at: Optional[float] = None  # time.monotonic() when it last became ready
+        self.active_scans = 0
+        self.onboarding_failures = 0  # Consecutive failed set-ups
+        self.retry_at: Optional[float] = None  # time.monotonic() when a failed set-up is retried
+    
+    @property
+    def onboarded(self) -> bool:
+        """Whether brand and model have already been detected."""
+        return "brand" in self.info
+    
+    def transition(self, state: DeviceState) -> bool:
+        """
+        Move to a new state, recording when it happened.
+        
+        Args:
+            state: The new state
+        
+        Returns:
+            True if the state changed, False if already in it
+        """
+        if state == self.state:
+            return False
+        if state not in TRANSITIONS[self.state]:
+            raise ValueError(f"Invalid device state transition {self.state.value} -> {state.value}")
+        if state == DeviceState.READY and self.state != DeviceState.SCANNING:
+            self.ready_at = time.monotonic()
+        self.state = state
+        self.state_changed_at = time.monotonic()
+        self.state_timestamps[state.value] = datetime.datetime.now().isoformat()
+        return True
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the device info with its state."""
+        return {
+            **self.info,
+            "state": self.state.value,
+            "status": STATUS_BY_STATE[self.state],
+            "state_since": self.state_timestamps[self.state.value],
+            "state_timestamps": dict(self.state_timestamps)
+        }
 
 class DeviceService:
     """Service for managing device connections and detection."""
     
-    def __init__(self, 
-                 adb_repo: ADBRepository, 
+    def __init__(self,
+                 adb_repo: ADBRepository,
                  brand_factory: BrandFactory,
-                 websocket_manager = None,
-                 polling_interval: int = 5):
+                 event_bus = None,
+                 polling_interval: int = 5,
+                 min_polling_interval: float = 0.5,
+                 max_polling_interval: float = 30.0,
+                 max_concurrent_onboarding: int = 8,
+                 onboarding_retry_delay: float = 2.0,
+                 max_onboarding_retry_delay: float = 300.0,
+                 lost_debounce: float = 3.0,
+                 lost_retention: float = 300.0):
         """
         Initialize the device service.
         
         Args:
             adb_repo: ADB repository for executing commands
             brand_factory: Factory for creating brand-specific implementations
-            websocket_manager: Websocket manager for real-time updates
-            polling_interval: Interval (in seconds) for polling connected devices
+            event_bus: Event bus for real-time updates
+            polling_interval: Initial interval (in seconds) for polling connected devices
+            min_polling_interval: Interval used right after a device change
+            max_polling_interval: Longest interval reached by backing off while
+                nothing changes
+            max_concurrent_onboarding: Maximum newly connected devices set up at once
+            onboarding_retry_delay: Seconds before a device whose set-up failed
+                is set up again; doubles with every further failure
+            max_onboarding_retry_delay: Longest wait between set-up attempts
+            lost_debounce: Seconds a device must stay missing or offline before
+                it is considered lost; shorter flickers (e.g. USB re-enumeration)
+                are ignored
+            lost_retention: Seconds a lost device is remembered; if it returns
+                within this window it is not set up again
         """
         self.adb_repo = adb_repo
         self.brand_factory = brand_factory
-        self.websocket_manager = websocket_manager
+        self.event_bus = event_bus
         self.polling_interval = polling_interval
-        self.connected_devices = {}  # Store connected devices with metadata
+        self.current_polling_interval = polling_interval  # Wait before the next poll, as adapted by the poller
+        self.min_polling_interval = min_polling_interval
+        self.max_polling_interval = max_polling_interval
+        self.onboarding_retry_delay = onboarding_retry_delay
+        self.max_onboarding_retry_delay = max_onboarding_retry_delay
+        self.lost_debounce = lost_debounce
+        self.lost_retention = lost_retention
+        self.devices: Dict[str, DeviceRecord] = {}  # Tracked devices by ID
         self._polling_task = None
+        self._onboarding: Dict[str, asyncio.Task] = {}  # Devices being set up, by ID
+        self._onboarding_limit = asyncio.Semaphore(max_concurrent_onboarding)
+        self._background_tasks = set()  # Strong references to fire-and-forget tasks
+        # Polling only runs while someone is listening: WebSocket clients
+        # (counted per source via set_listener_count) or wait_for_device callers
+        self._listeners: Dict[str, int] = {}
+        self._waiters = 0
+        self._demand = asyncio.Event()
+        self._refresh_task: Optional[asyncio.Task] = None  # In-flight adb poll shared by callers
+        self._last_poll: Optional[float] = None
+        self._devices_changed = asyncio.Condition()
+        # Called with (device_id, brand implementation) when a newly connected
+        # device has been set up, e.g. to prefetch its fast scan
+        self.on_device_onboarded: Optional[Callable[[str, Any], None]] = None
+        # Called with device_id when a device is given up as lost, e.g. to
+        # drop what was gathered from it before it went away
+        self.on_device_lost: Optional[Callable[[str], None]] = None
     
     async def _send_device_update(self, device_data: Dict[str, Any]) -> None:
         """
-        Send a device update via websocket.
+        Publish a device update to websocket clients.
         
         Args:
             device_data: The device data to send
         """
-        if self.websocket_manager:
-            await self.websocket_manager.broadcast(
-                json.dumps({
+        if self.event_bus:
+            await self.event_bus.publish(
+                {
                     "type": "device_update",
+                    "device_id": device_data.get("device_id"),
                     "data": device_data,
                     "timestamp": datetime.datetime.now().isoformat()
-                })
+                },
+                topics=[TOPIC_DEVICES, device_topic(device_data.get("device_id"))]
             )
     
+    async def _transition(self, record: DeviceRecord, state: DeviceState, **extra) -> None:
+        """
+        Change a device's state and announce it.
+        
+        Args:
+            record: The device record
+            state: The new state
+            **extra: Additional fields for the update message
+        """
+        if record.transition(state):
+            await self._send_device_update({**record.to_dict(), **extra})
+            async with self._devices_changed:
+                self._devices_changed.notify_all()
+    
+    def set_listener_count(self, source: str, count: int) -> None:
+        """
+        Report how many real-time clients a source (e.g. a WebSocket manager) has.
+        
+        Args:
+            source: Identifies the reporting source
+            count: Its current number of clients
+        """
+        if count > 0:
+            self._listeners[source] = count
+        else:
+            self._listeners.pop(source, None)
+        self._update_demand()
+    
+    def _update_demand(self) -> None:
+        """Suspend or resume the poller depending on whether anyone is listening."""
+        if self._listeners or self._waiters:
+            self._demand.set()
+        else:
+            self._demand.clear()
+    
     async def start_device_polling(self) -> None:
         """Start polling for connected devices."""
         # Start ADB server if not already running
@@ -54,7 +226,7 @@ class DeviceService:
         # Cancel existing polling task if it exists
         if self._polling_task and not self._polling_task.done():
             self._polling_task.cancel()
-            
+        
         # Create a new polling task
         self._polling_task = asyncio.create_task(self._poll_devices())
     
@@ -63,28 +235,33 @@ class DeviceService:
         if self._polling_task and not self._polling_task.done():
             self._polling_task.cancel()
             self._polling_task = None
+        for task in list(self._onboarding.values()):
+            task.cancel()
     
     async def _poll_devices(self) -> None:
-        """Poll for connected devices and update status."""
+        """
+        Poll for connected devices and update status.
+        
+        The interval drops to min_polling_interval after any change and
+        doubles on every quiet poll up to max_polling_interval. While nobody
+        is listening the loop is suspended and runs no adb commands at all.
+        """
+        interval = self.polling_interval
         try:
             while True:
-                # Get list of connected devices
-                devices = await self.adb_repo.get_connected_devices()
-                
-                # Track new and disconnected devices
-                current_ids = set(devices)
-                previous_ids = set(self.connected_devices.keys())
+                if not self._demand.is_set():
+                    await self._demand.wait()
+                    # Someone started listening: give them fresh results quickly
+                    interval = self.min_polling_interval
                 
-                # Handle new devices
-                for device_id in current_ids - previous_ids:
-                    await self._handle_new_device(device_id)
-                
-                # Handle disconnected devices
-                for device_id in previous_ids - current_ids:
-                    await self._handle_disconnected_device(device_id)
+                if await self.refresh():
+                    interval = self.min_polling_interval
+                else:
+                    interval = min(interval * 2, self.max_polling_interval)
                 
                 # Wait for next polling interval
-                await asyncio.sleep(self.polling_interval)
+                self.current_polling_interval = interval
+                await asyncio.sleep(interval)
         except asyncio.CancelledError:
             # Task was cancelled, exit gracefully
             pass
@@ -94,86 +271,248 @@ class DeviceService:
             await asyncio.sleep(5)
             await self.start_device_polling()
     
-    async def _handle_new_device(self, device_id: str) -> None:
+    async def refresh(self) -> bool:
         """
-        Handle a newly connected device.
+        Poll adb once. Concurrent callers share a single in-flight poll.
+        
+        Returns:
+            True if anything changed or is still settling
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._poll_once())
+            self._refresh_task.add_done_callback(self._clear_refresh_task)
+        return await asyncio.shield(self._refresh_task)
+    
+    def _clear_refresh_task(self, task: asyncio.Task) -> None:
+        if self._refresh_task is task:
+            self._refresh_task = None
+    
+    async def _poll_once(self) -> bool:
+        changed = await self._apply_device_states(await self.adb_repo.get_device_states())
+        self._last_poll = time.monotonic()
+        async with self._devices_changed:
+            self._devices_changed.notify_all()
+        return changed
+    
+    async def _refresh_if_stale(self) -> None:
+        """Poll on behalf of a REST caller if polling is on but suspended for lack of listeners."""
+        if self._polling_task is None or self._demand.is_set():
+            return
+        if self._last_poll is None or time.monotonic() - self._last_poll >= self.max_polling_interval:
+            await self.refresh()
+    
+    async def _apply_device_states(self, adb_states: Dict[str, str]) -> bool:
+        """
+        Advance every device's state machine from one `adb devices` listing.
         
         Args:
-            device_id: The device identifier
+            adb_states: Device ID to ADB state, as returned by get_device_states()
+            
+        Returns:
+            True if any device changed or is still settling (missing but
+            within the debounce window, or being set up for the first time)
         """
-        try:
-            # Attempt to authorize the device if needed
-            authorized = await self.adb_repo.authorize_device(device_id)
+        now = time.monotonic()
+        before = {device_id: record.state for device_id, record in self.devices.items()}
+        
+        for device_id, adb_state in adb_states.items():
+            if adb_state not in ("device", "unauthorized"):
+                # offline, recovery, ... : treated as missing below
+                continue
             
-            if not authorized:
-                # Send notification to approve USB debugging on the device
-                await self._send_device_update({
-                    "device_id": device_id,
-                    "status": "pending_authorization",
-                    "message": "Please approve USB debugging on your device"
-                })
-                return
+            record = self.devices.get(device_id)
+            if record is None:
+                record = self.devices[device_id] = DeviceRecord(device_id)
+            record.missing_since = None
             
+            if adb_state == "unauthorized":
+                if record.state != DeviceState.UNAUTHORIZED:
+                    self._cancel_onboarding(device_id)
+                    await self._transition(record, DeviceState.UNAUTHORIZED,
+                                           message="Please approve USB debugging on your device")
+                    # Trigger the approval prompt once, not on every poll
+                    task = asyncio.create_task(self._request_authorization(device_id))
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+            elif record.state == DeviceState.LOST and record.onboarded:
+                # Back within the retention window: no need to set it up again
+                await self._transition(record, DeviceState.READY)
+            elif record.state == DeviceState.FAILED:
+                # Retried once its backoff expires, not on every poll
+                if device_id not in self._onboarding and now >= record.retry_at:
+                    self._start_onboarding(record)
+            elif record.state in (DeviceState.DISCOVERED, DeviceState.UNAUTHORIZED,
+                                  DeviceState.AUTHORIZING, DeviceState.LOST):
+                if device_id not in self._onboarding:
+                    self._start_onboarding(record)
+        
+        for device_id, record in list(self.devices.items()):
+            if adb_states.get(device_id) in ("device", "unauthorized"):
+                continue
+            
+            if record.state == DeviceState.LOST:
+                if now - record.state_changed_at >= self.lost_retention:
+                    del self.devices[device_id]
+            elif record.missing_since is None:
+                record.missing_since = now
+            elif now - record.missing_since >= self.lost_debounce:
+                self._cancel_onboarding(device_id)
+                await self._transition(record, DeviceState.LOST,
+                                       disconnected_at=datetime.datetime.now().isoformat())
+                if self.on_device_lost:
+                    try:
+                        self.on_device_lost(device_id)
+                    except Exception as e:
+                        print(f"Error in device lost callback for {device_id}: {str(e)}")
+        
+        after = {device_id: record.state for device_id, record in self.devices.items()}
+        # A device whose set-up keeps failing is retried on its own backoff
+        # and must not hold the poller at its fastest rate meanwhile
+        settling = any(
+            device_id in self.devices and not self.devices[device_id].onboarding_failures
+            for device_id in self._onboarding
+        ) or any(record.missing_since is not None for record in self.devices.values())
+        return before != after or settling
+    
+    async def _request_authorization(self, device_id: str) -> None:
+        """Ask the device to show the USB debugging approval prompt."""
+        try:
+            await self.adb_repo.authorize_device(device_id)
+        except Exception as e:
+            print(f"Error requesting authorization for device {device_id}: {str(e)}")
+    
+    def _start_onboarding(self, record: DeviceRecord) -> None:
+        """
+        Set up a newly connected device in its own task.
+        
+        Args:
+            record: The device record
+        """
+        device_id = record.device_id
+        task = asyncio.create_task(self._onboard_device(record, time.monotonic()))
+        self._onboarding[device_id] = task
+        task.add_done_callback(lambda _: self._onboarding.pop(device_id, None))
+    
+    def _cancel_onboarding(self, device_id: str) -> None:
+        """Abandon set-up of a device, e.g. because it was unplugged."""
+        task = self._onboarding.pop(device_id, None)
+        if task:
+            task.cancel()
+    
+    async def _onboard_device(self, record: DeviceRecord, discovered_at: float) -> None:
+        """
+        Run _handle_new_device under the concurrency limit.
+        
+        Args:
+            record: The device record
+            discovered_at: time.monotonic() when the poller first saw the device
+        """
+        try:
+            async with self._onboarding_limit:
+                await self._handle_new_device(record, discovered_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # One failing device must not affect the others or the poll loop
+            print(f"Error setting up device {record.device_id}: {str(e)}")
+    
+    async def _handle_new_device(self, record: DeviceRecord, discovered_at: Optional[float] = None) -> None:
+        """
+        Set up a device that adb lists as authorized.
+        
+        Args:
+            record: The device record
+            discovered_at: time.monotonic() when the device was first seen
+        """
+        device_id = record.device_id
+        await self._transition(record, DeviceState.AUTHORIZING)
+        
+        try:
             # Detect brand
             brand = await self.brand_factory.detect_brand(device_id)
             
-            # Create brand implementation
-            brand_impl = await self.brand_factory.create_brand_implementation(device_id)
+            # Create brand implementation, reusing the detected brand
+            brand_impl = await self.brand_factory.create_brand_implementation(device_id, brand)
             
             # Get basic device info
-            model = await brand_impl.get_device_model(device_id)
-            android_version = await brand_impl.get_android_version(device_id)
+            model, android_version = await asyncio.gather(
+                brand_impl.get_device_model(device_id),
+                brand_impl.get_android_version(device_id)
+            )
             
             # Store device information
-            device_info = {
+            record.info.update({
                 "device_id": device_id,
                 "brand": brand,
                 "model": model,
                 "android_version": android_version,
-                "status": "connected",
                 "connected_at": datetime.datetime.now().isoformat()
-            }
-            
-            self.connected_devices[device_id] = device_info
+            })
+            if discovered_at is not None:
+                # Seconds from first appearing in `adb devices` to ready
+                record.info["time_to_ready"] = round(time.monotonic() - discovered_at, 3)
             
             # Send notification about new device
-            await self._send_device_update(device_info)
-            
+            record.onboarding_failures = 0
+            record.retry_at = None
+            await self._transition(record, DeviceState.READY)
+        
         except Exception as e:
-            # Send error notification
+            # Retried by the poller after a delay that grows with every failure
+            record.onboarding_failures += 1
+            delay = min(self.onboarding_retry_delay * 2 ** (record.onboarding_failures - 1),
+                        self.max_onboarding_retry_delay)
+            record.retry_at = time.monotonic() + delay
+            record.transition(DeviceState.FAILED)
             await self._send_device_update({
                 "device_id": device_id,
                 "status": "error",
-                "message": f"Error detecting device: {str(e)}"
+                "state": record.state.value,
+                "message": f"Error detecting device: {str(e)}",
+                "retry_in": delay
             })
+            return
+        
+        # Outside the try: a failing callback must not undo a successful set-up
+        if self.on_device_onboarded:
+            try:
+                self.on_device_onboarded(device_id, brand_impl)
+            except Exception as e:
+                print(f"Error in device onboarded callback for {device_id}: {str(e)}")
     
-    async def _handle_disconnected_device(self, device_id: str) -> None:
+    async def set_scanning(self, device_id: str, scanning: bool) -> None:
         """
-        Handle a disconnected device.
+        Record that a scan started or finished on a device.
         
         Args:
             device_id: The device identifier
+            scanning: True when a scan starts, False when it ends
         """
-        # Get device info before removing
-        device_info = self.connected_devices.get(device_id, {"device_id": device_id})
+        record = self.devices.get(device_id)
+        if record is None:
+            return
+        record.active_scans = max(0, record.active_scans + (1 if scanning else -1))
         
-        # Remove from connected devices
-        if device_id in self.connected_devices:
-            del self.connected_devices[device_id]
-        
-        # Send notification about disconnected device
-        device_info["status"] = "disconnected"
-        device_info["disconnected_at"] = datetime.datetime.now().isoformat()
-        await self._send_device_update(device_info)
+        if record.active_scans and record.state == DeviceState.READY:
+            await self._transition(record, DeviceState.SCANNING)
+        elif not record.active_scans and record.state == DeviceState.SCANNING:
+            await self._transition(record, DeviceState.READY)
     
-    async def get_connected_devices(self) -> List[Dict[str, Any]]:
+    async def get_connected_devices(self, include_lost: bool = False) -> List[Dict[str, Any]]:
         """
-        Get a list of currently connected devices.
+        Get a list of tracked devices with their lifecycle state.
+        
+        Args:
+            include_lost: Whether to include recently lost devices
         
         Returns:
-            List of connected device information
+            List of device information
         """
-        return list(self.connected_devices.values())
+        await self._refresh_if_stale()
+        return [
+            record.to_dict() for record in self.devices.values()
+            if include_lost or record.state != DeviceState.LOST
+        ]
     
     async def get_device_info(self, device_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -181,20 +520,86 @@ class DeviceService:
         
         Args:
             device_id: The device identifier
-            
+        
         Returns:
             Device information or None if not connected
         """
-        return self.connected_devices.get(device_id)
+        await self._refresh_if_stale()
+        record = self.devices.get(device_id)
+        if record is None or record.state not in (DeviceState.READY, DeviceState.SCANNING):
+            return None
+        return record.to_dict()
     
-    async def wait_for_device(self, timeout: int = 30) -> Optional[str]:
+    async def wait_for_device(self,
+                              timeout: int = 30,
+                              device_id: Optional[str] = None,
+                              brand: Optional[str] = None,
+                              new_only: bool = False) -> Optional[str]:
         """
-        Wait for any device to be connected within the timeout period.
+        Wait for a matching device to be ready within the timeout period.
+        
+        Returns at once if a matching device is already ready. Otherwise the
+        caller sleeps on the device registry and is woken by state changes;
+        all waiters share the device poller instead of running adb themselves.
         
         Args:
             timeout: Maximum time to wait in seconds
+            device_id: Only match this device
+            brand: Only match devices of this brand (e.g. 'xiaomi')
+            new_only: Only match devices that become ready after the call
             
         Returns:
             The device ID if one is found, None if timeout
         """
-        return await self.adb_repo.wait_for_device(timeout)
+        started = time.monotonic() if new_only else None
+        
+        def match() -> Optional[str]:
+            return self._find_ready_device(device_id, brand, started)
+        
+        found = match()
+        if found:
+            return found
+        
+        self._waiters += 1
+        self._update_demand()
+        try:
+            if self._polling_task is None:
+                await self.start_device_polling()
+            async with self._devices_changed:
+                await asyncio.wait_for(self._devices_changed.wait_for(match), timeout)
+            return match()
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._waiters -= 1
+            self._update_demand()
+    
+    def _find_ready_device(self,
+                           device_id: Optional[str] = None,
+                           brand: Optional[str] = None,
+                           ready_after: Optional[float] = None) -> Optional[str]:
+        """
+        Find a ready device matching the filters.
+        
+        Args:
+            device_id: Only match this device
+            brand: Only match devices of this brand
+            ready_after: Only match devices that became ready after this time.monotonic() value
+            
+        Returns:
+            The first matching device ID, or None
+        """
+        if device_id:
+            records = [self.devices[device_id]] if device_id in self.devices else []
+        else:
+            records = list(self.devices.values())
+        
+        for record in records:
+            if record.state not in (DeviceState.READY, DeviceState.SCANNING):
+                continue
+            if brand and str(record.info.get("brand", "")).lower() != brand.lower():
+                continue
+            if ready_after is not None and (record.ready_at is None or record.ready_at <= ready_after):
+                continue
+            return record.device_id
+        return None
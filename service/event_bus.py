@@ -0,0 +1,228 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from typing import Dict, Any, Hashable, Iterable, List, Optional, Tuple
+
+from service.connection_manager import is_subscriber_only
+
+# Buffer holding every event, used to replay to clients without subscriptions
+ALL_EVENTS = "*"
+
+
+class _TopicBuffer:
+    """Ring buffer of (seq, encoded event) for one topic."""
+
+    def __init__(self, size: int):
+        self.events: "deque[Tuple[int, str]]" = deque(maxlen=size)
+        self.evicted_seq = 0  # Highest sequence number pushed out of the buffer
+
+    def append(self, seq: int, encoded: str) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.evicted_seq = self.events[0][0]
+        self.events.append((seq, encoded))
+
+    def since(self, seq: int) -> List[Tuple[int, str]]:
+        # Events are in sequence order, so scan back from the newest
+        newer = []
+        for event in reversed(self.events):
+            if event[0] <= seq:
+                break
+            newer.append(event)
+        newer.reverse()
+        return newer
+
+
+class EventBus:
+    """In-process event bus between the services and WebSocket clients.
+
+    Every published event gets a monotonically increasing sequence number
+    ("seq"), is JSON-encoded once, kept in a bounded ring buffer per topic and
+    forwarded to the connection manager. A reconnecting client passes the
+    last seq it saw and gets everything it missed replayed from the buffers.
+
+    Progress events can be published with a coalesce key. They are held for
+    up to flush_interval, a newer event with the same key replaces the
+    pending one, and the survivors go out together as one batch. Any other
+    event flushes the pending ones first, so ordering is preserved.
+    """
+
+    def __init__(self,
+                 connection_manager=None,
+                 buffer_size: int = 1000,
+                 max_topics: int = 1024,
+                 flush_interval: float = 0.05,
+                 max_batch: int = 100):
+        """
+        Initialize the event bus.
+
+        Args:
+            connection_manager: ConnectionManager that delivers events to clients
+            buffer_size: Events retained per topic for replay
+            max_topics: Topic buffers retained; the least recently published
+                topics are dropped first
+            flush_interval: Longest time in seconds a coalescable event is held
+            max_batch: Pending coalescable events that trigger an early flush
+        """
+        self.connection_manager = connection_manager
+        self.buffer_size = buffer_size
+        self.max_topics = max_topics
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.last_seq = 0
+        self._buffers: "OrderedDict[str, _TopicBuffer]" = OrderedDict()
+        self._dropped_topic_seq = 0  # Newest event lost along with a dropped topic buffer
+        self._pending: "OrderedDict[Hashable, Tuple[Dict[str, Any], Optional[List[str]]]]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.events_coalesced = 0
+        self.batches_sent = 0
+
+    async def publish(self,
+                      event: Dict[str, Any],
+                      topics: Optional[Iterable[str]] = None,
+                      coalesce_key: Optional[Hashable] = None) -> None:
+        """
+        Publish an event to subscribers of its topics.
+
+        Args:
+            event: The event payload; "seq" is added to it
+            topics: Topics the event belongs to; None delivers it to every client
+            coalesce_key: Identifies a stream of progress events in which each
+                event supersedes the previous one (e.g. the status of one scan
+                job); such events are batched and may be dropped if superseded
+        """
+        topics = list(topics) if topics is not None else None
+
+        if coalesce_key is None:
+            await self._dispatch(self._take_pending() + [(event, topics)])
+            return
+
+        if self._pending.pop(coalesce_key, None) is not None:
+            self.events_coalesced += 1
+        self._pending[coalesce_key] = (event, topics)
+
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Send pending coalescable events now."""
+        await self._dispatch(self._take_pending())
+
+    def replay(self, since: int, topics: Optional[Iterable[str]] = None) -> str:
+        """
+        Build a single frame holding every buffered event newer than a sequence number.
+
+        Args:
+            since: The last sequence number the client received
+            topics: The client's topics; None or empty replays every event
+
+        Returns:
+            JSON text of a "replay" message. "complete" is false when some
+            missed events were no longer buffered and the client should
+            refresh its state through the REST endpoints instead.
+            Subscriber-only topics (telemetry, logcat) are never replayed.
+        """
+        topics = list(topics or []) or [ALL_EVENTS]
+
+        events: Dict[int, str] = {}
+        complete = since <= self.last_seq
+        for topic in topics:
+            if is_subscriber_only([topic]):
+                continue
+            buffer = self._buffers.get(topic)
+            if buffer is None:
+                if topic != ALL_EVENTS and since < self._dropped_topic_seq:
+                    complete = False
+                continue
+            if since < buffer.evicted_seq:
+                complete = False
+            for seq, encoded in buffer.since(since):
+                events[seq] = encoded
+
+        # Events are spliced in already encoded instead of being re-serialized
+        header = json.dumps({
+            "type": "replay",
+            "since": since,
+            "last_seq": self.last_seq,
+            "complete": complete
+        })
+        return header[:-1] + ', "events": [' + ", ".join(events[seq] for seq in sorted(events)) + "]}"
+
+    def stats(self) -> Dict[str, Any]:
+        """Get sequence and buffer counters."""
+        all_events = self._buffers.get(ALL_EVENTS)
+        return {
+            "last_seq": self.last_seq,
+            "pending_events": len(self._pending),
+            "events_coalesced": self.events_coalesced,
+            "batches_sent": self.batches_sent,
+            "topics_buffered": len(self._buffers),
+            "buffer_size": self.buffer_size,
+            "oldest_replayable_seq": all_events.events[0][0] if all_events and all_events.events else None
+        }
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    def _take_pending(self) -> List[Tuple[Dict[str, Any], Optional[List[str]]]]:
+        """Remove and return pending events, cancelling the flush timer."""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        pending = list(self._pending.values())
+        self._pending.clear()
+        return pending
+
+    async def _dispatch(self, events: List[Tuple[Dict[str, Any], Optional[List[str]]]]) -> None:
+        """Number, encode and buffer events, then deliver them as one batch."""
+        if not events:
+            return
+
+        batch = []
+        for event, topics in events:
+            self.last_seq += 1
+            encoded = json.dumps({"seq": self.last_seq, **event})
+            self._record(self.last_seq, encoded, topics)
+            batch.append((self.last_seq, encoded, topics))
+
+        self.batches_sent += 1
+        await self._deliver(batch)
+
+    def _record(self, seq: int, encoded: str, topics: Optional[List[str]]) -> None:
+        """Keep an encoded event in the replay buffers of its topics."""
+        if is_subscriber_only(topics):
+            # High-volume streams are not replayed; they would crowd out everything else
+            return
+        for topic in [ALL_EVENTS] + (topics or []):
+            self._buffer(topic).append(seq, encoded)
+
+    async def _deliver(self, batch: List[Tuple[int, str, Optional[List[str]]]]) -> None:
+        """
+        Hand a numbered batch to the connection manager.
+
+        Args:
+            batch: (seq, encoded event, topics) triples in sequence order
+        """
+        if self.connection_manager:
+            await self.connection_manager.broadcast_batch([(encoded, topics) for _, encoded, topics in batch])
+
+    def _buffer(self, topic: str) -> _TopicBuffer:
+        """Get or create the ring buffer for a topic, dropping stale topics over the limit."""
+        buffer = self._buffers.get(topic)
+        if buffer is None:
+            buffer = self._buffers[topic] = _TopicBuffer(self.buffer_size)
+            while len(self._buffers) > self.max_topics:
+                dropped_topic, dropped = self._buffers.popitem(last=False)
+                if dropped_topic == ALL_EVENTS:
+                    # Keep the catch-all buffer; it is always in use
+                    self._buffers[ALL_EVENTS] = dropped
+                    continue
+                if dropped.events:
+                    self._dropped_topic_seq = max(self._dropped_topic_seq, dropped.events[-1][0])
+        else:
+            self._buffers.move_to_end(topic)
+        return buffer
@@ -0,0 +1,483 @@
+import asyncio
+import gzip
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from repositories.adb_repository import ADBRepository
+from service.connection_manager import logcat_topic
+
+# Logcat priorities from least to most severe
+PRIORITIES = "VDIWEF"
+
+# Field order of a record as returned by the API and sent over WebSocket
+FIELDS = ("seq", "time", "pid", "tid", "priority", "tag", "message")
+
+# One line of `logcat -v threadtime`: "10-19 12:34:56.789  1234  1250 I Tag: message"
+LINE_PATTERN = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEF])\s+(.*?)\s*: (.*)$")
+
+# Rough memory held by a record beyond its message text (tuple, numbers and
+# time string; tags are shared), for the per-device memory budget
+RECORD_OVERHEAD = 300
+
+# Bytes read from the logcat pipe at a time, and the longest line kept
+READ_SIZE = 64 * 1024
+MAX_LINE = 16 * 1024
+
+Record = Tuple[int, str, int, int, str, str, str]
+
+
+class LogcatFilter:
+    """Minimum priority, tag and message pattern a record must match."""
+
+    def __init__(self,
+                 priority: Optional[str] = None,
+                 tags: Optional[List[str]] = None,
+                 pattern: Optional[str] = None):
+        """
+        Create a filter; every criterion is optional.
+
+        Args:
+            priority: Minimum priority (one of V, D, I, W, E, F)
+            tags: Tags to keep; others are dropped
+            pattern: Regular expression searched for in the message
+
+        Raises:
+            ValueError: If the priority or pattern is invalid
+        """
+        if priority is not None:
+            priority = priority.upper()
+            if len(priority) != 1 or priority not in PRIORITIES:
+                raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        try:
+            self.regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {str(e)}")
+        self.priority = priority
+        self.min_level = PRIORITIES.index(priority) if priority else 0
+        self.tags = frozenset(tags) if tags else None
+        self.pattern = pattern
+
+    def matches(self, priority: str, tag: str, message: str) -> bool:
+        if PRIORITIES.index(priority) < self.min_level:
+            return False
+        if self.tags is not None and tag not in self.tags:
+            return False
+        return self.regex is None or self.regex.search(message) is not None
+
+    def filterspecs(self) -> List[str]:
+        """logcat filterspecs applying the priority on the device, before lines reach us."""
+        return [f"*:{self.priority}"] if self.priority else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "tags": sorted(self.tags) if self.tags is not None else None,
+            "pattern": self.pattern
+        }
+
+
+class _SpillFile:
+    """Gzip file receiving every captured line, rotated by uncompressed size.
+
+    Compression and file I/O run in order on the file's own writer thread,
+    so the event loop only hands batches over.
+    """
+
+    def __init__(self, path: str, max_bytes: int, files: int):
+        self.path = path  # e.g. logs/logcat/SERIAL.log.gz; rotated to SERIAL.log.1.gz, ...
+        self.max_bytes = max_bytes
+        self.files = files
+        self.written = 0
+        self._file = None  # Opened by the writer thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="logcat-spill")
+        self._writing: Optional[asyncio.Future] = None
+
+    async def write(self, data: bytes) -> None:
+        """
+        Hand a batch to the writer thread.
+
+        Waits only for the previous batch, so writing one overlaps reading
+        the next while a slow disk still holds the capture back.
+        """
+        writing, self._writing = self._writing, None
+        if writing:
+            await writing
+        self._writing = asyncio.get_running_loop().run_in_executor(self._executor, self._write, data)
+
+    async def close(self) -> None:
+        """Finish the pending batch, close the file and stop the writer thread."""
+        try:
+            if self._writing:
+                await self._writing
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+        except Exception as e:
+            print(f"Error writing {self.path}: {str(e)}")
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = gzip.open(self.path, "ab")
+        self._file.write(data)
+        self.written += len(data)
+        if self.written >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        base = self.path[:-len(".gz")]
+        for index in range(self.files - 1, 0, -1):
+            older = f"{base}.{index}.gz"
+            if os.path.exists(older):
+                if index + 1 >= self.files:
+                    os.unlink(older)
+                else:
+                    os.replace(older, f"{base}.{index + 1}.gz")
+        if self.files > 1:
+            os.replace(self.path, f"{base}.1.gz")
+        else:
+            os.unlink(self.path)
+        self._file = gzip.open(self.path, "ab")
+        self.written = 0
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class _Session:
+    """Logcat capture of one device: its stream, filter and ring buffer."""
+
+    def __init__(self, device_id: str, capture_filter: LogcatFilter, spill: Optional[_SpillFile]):
+        self.device_id = device_id
+        self.filter = capture_filter
+        self.spill = spill
+        self.records: "deque[Record]" = deque()
+        self.bytes = 0  # Approximate memory held by records
+        self.seq = 0  # Sequence number of the newest record
+        self.last_time: Optional[str] = None  # Logcat time of the newest line read, to resume from
+        self.last_lines: Set[str] = set()  # Lines read with that time
+        # Those lines again while a restarted logcat replays them (-T includes last_time)
+        self.replayed: Set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.streaming = False
+        self.lines_read = 0
+        self.lines_filtered = 0
+        self.records_evicted = 0
+        self.restarts = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "device_id": self.device_id,
+            "streaming": self.streaming,
+            "filter": self.filter.to_dict(),
+            "spill": self.spill.path if self.spill else None,
+            "records": len(self.records),
+            "memory_bytes": self.bytes,
+            "first_seq": self.records[0][0] if self.records else None,
+            "last_seq": self.seq,
+            "lines_read": self.lines_read,
+            "lines_filtered": self.lines_filtered,
+            "records_evicted": self.records_evicted,
+            "restarts": self.restarts
+        }
+
+
+class LogcatService:
+    """Captures logcat from devices into bounded in-memory ring buffers.
+
+    Each captured device has one long-running `adb logcat` process. Its
+    output is read in chunks and parsed into compact records. Records that
+    fail the capture filter are dropped; the minimum priority is already
+    applied on the device. Each device's buffer is bounded by record count
+    and approximate memory, the oldest records being evicted first. Lines
+    can additionally be written to a rotating gzip file. New records are
+    published on the device's logcat topic, one event per chunk read.
+    """
+
+    def __init__(self,
+                 adb_repo: ADBRepository,
+                 event_bus = None,
+                 max_records: int = 10000,
+                 max_bytes: int = 4 * 1024 * 1024,
+                 backlog: int = 1000,
+                 spill_dir: str = "logs/logcat",
+                 spill_max_bytes: int = 32 * 1024 * 1024,
+                 spill_files: int = 5,
+                 max_retry_delay: float = 30.0):
+        """
+        Initialize the logcat service.
+
+        Args:
+            adb_repo: ADB repository for starting logcat processes
+            event_bus: Event bus for real-time updates
+            max_records: Records kept in memory per device
+            max_bytes: Approximate memory cap per device
+            backlog: Lines already in the device's log read when capture starts
+            spill_dir: Directory of the spill files
+            spill_max_bytes: Uncompressed bytes written to a spill file before it is rotated
+            spill_files: Spill files kept per device, including the current one
+            max_retry_delay: Longest wait in seconds before restarting a logcat that exited
+        """
+        self.adb_repo = adb_repo
+        self.event_bus = event_bus
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.backlog = backlog
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_files = spill_files
+        self.max_retry_delay = max_retry_delay
+        self._sessions: Dict[str, _Session] = {}
+
+    async def start(self,
+                    device_id: str,
+                    priority: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    pattern: Optional[str] = None,
+                    spill: bool = False) -> Dict[str, Any]:
+        """
+        Start capturing a device's logcat, or change the filter of a running capture.
+
+        Args:
+            device_id: The device identifier
+            priority: Minimum priority to keep (V, D, I, W, E, F)
+            tags: Tags to keep
+            pattern: Regular expression the message must contain
+            spill: Also write captured lines to a rotating gzip file
+
+        Returns:
+            The capture's state
+
+        Raises:
+            ValueError: If the filter is invalid
+        """
+        capture_filter = LogcatFilter(priority, tags, pattern)
+        session = self._sessions.get(device_id)
+        if session is None:
+            session = self._sessions[device_id] = _Session(device_id, capture_filter, None)
+        else:
+            # Restarted below so a changed priority is applied on the device
+            await self._cancel(session)
+            session.filter = capture_filter
+
+        if spill and session.spill is None:
+            safe_name = re.sub(r"[^\w.-]", "_", device_id)
+            session.spill = _SpillFile(os.path.join(self.spill_dir, f"{safe_name}.log.gz"),
+                                       self.spill_max_bytes, self.spill_files)
+        elif not spill and session.spill is not None:
+            await session.spill.close()
+            session.spill = None
+
+        session.task = asyncio.create_task(self._run(session))
+        return session.to_dict()
+
+    async def stop(self, device_id: str) -> bool:
+        """
+        Stop capturing a device's logcat and drop its records.
+
+        Args:
+            device_id: The device identifier
+
+        Returns:
+            True if the device was being captured
+        """
+        session = self._sessions.pop(device_id, None)
+        if session is None:
+            return False
+        await self._cancel(session)
+        if session.spill:
+            await session.spill.close()
+        return True
+
+    async def stop_all(self) -> None:
+        """Stop every capture."""
+        await asyncio.gather(*(self.stop(device_id) for device_id in list(self._sessions)))
+
+    async def sessions(self) -> List[Dict[str, Any]]:
+        """Get the state of every capture."""
+        return [session.to_dict() for session in self._sessions.values()]
+
+    async def query(self,
+                    device_id: str,
+                    after: Optional[int] = None,
+                    limit: int = 500,
+                    priority: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    pattern: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a page of a device's buffered records.
+
+        Args:
+            device_id: The device identifier
+            after: Return records with a higher seq; None returns the newest records
+            limit: Maximum number of records
+            priority: Minimum priority
+            tags: Tags to keep
+            pattern: Regular expression the message must contain
+
+        Returns:
+            The records (as lists in FIELDS order) and the cursor of the next
+            page, or None if the device is not being captured
+
+        Raises:
+            ValueError: If the filter is invalid
+        """
+        session = self._sessions.get(device_id)
+        if session is None:
+            return None
+        query_filter = LogcatFilter(priority, tags, pattern)
+
+        records: List[Record] = []
+        if after is None:
+            # Newest matching records, returned oldest first
+            for record in reversed(session.records):
+                if query_filter.matches(record[4], record[5], record[6]):
+                    records.append(record)
+                    if len(records) == limit:
+                        break
+            records.reverse()
+        else:
+            # seq is contiguous in the buffer, so the page starts at a computed
+            # offset; islice skips to it in one pass where indexing a deque
+            # walks from its nearest end on every access
+            first_seq = session.records[0][0] if session.records else session.seq + 1
+            for record in islice(session.records, max(0, after + 1 - first_seq), None):
+                if query_filter.matches(record[4], record[5], record[6]):
+                    records.append(record)
+                    if len(records) == limit:
+                        break
+
+        return {
+            "device_id": device_id,
+            "fields": FIELDS,
+            "records": records,
+            # Pass as `after` to get the next page; records evicted in between are skipped
+            "next": records[-1][0] if records else max(after or 0, session.seq),
+            "first_seq": session.records[0][0] if session.records else None,
+            "last_seq": session.seq
+        }
+
+    async def _cancel(self, session: _Session) -> None:
+        if session.task:
+            session.task.cancel()
+            try:
+                await session.task
+            except asyncio.CancelledError:
+                pass
+            session.task = None
+
+    async def _run(self, session: _Session) -> None:
+        """Keep a logcat process running for a session, restarting it with backoff when it exits."""
+        delay = 1.0
+        while True:
+            args = ["logcat", "-v", "threadtime"]
+            if session.last_time:
+                # Resume from the last line read instead of re-reading the log;
+                # lines with that time are sent again and skipped in _ingest
+                args += ["-T", session.last_time]
+                session.replayed = set(session.last_lines)
+            else:
+                args += ["-T", str(self.backlog)]
+            args += session.filter.filterspecs()
+
+            process = None
+            try:
+                process = await self.adb_repo.open_stream(session.device_id, *args)
+                session.streaming = True
+                if await self._read(session, process.stdout):
+                    delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reading logcat of device {session.device_id}: {str(e)}")
+            finally:
+                session.streaming = False
+                if process:
+                    if process.returncode is None:
+                        process.kill()
+                    # The exit is only reported once the rest of stdout has been read
+                    await process.communicate()
+
+            # The device went away or logcat exited; try again later
+            session.restarts += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _read(self, session: _Session, stream: asyncio.StreamReader) -> bool:
+        """
+        Parse a logcat stream until it ends.
+
+        Returns:
+            True if any line was read
+        """
+        read_any = False
+        remainder = b""
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                return read_any
+            read_any = True
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            if len(remainder) > MAX_LINE:
+                remainder = b""
+
+            records, spilled = self._ingest(session, lines)
+            if spilled:
+                await session.spill.write(spilled)
+            if records and self.event_bus:
+                await self.event_bus.publish(
+                    {"type": "logcat", "device_id": session.device_id, "records": records},
+                    topics=[logcat_topic(session.device_id)]
+                )
+
+    def _ingest(self, session: _Session, lines: List[bytes]) -> Tuple[List[Record], bytes]:
+        """Parse, filter and buffer complete lines; returns the new records and the raw lines to spill."""
+        records = []
+        spilled = []
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r")
+            match = LINE_PATTERN.match(line)
+            if match is None:
+                # "--------- beginning of main" and similar
+                continue
+            time, pid, tid, priority, tag, message = match.groups()
+            if session.replayed:
+                if time != session.last_time:
+                    session.replayed.clear()
+                elif line in session.replayed:
+                    # Read before logcat was restarted
+                    session.replayed.discard(line)
+                    continue
+            if time != session.last_time:
+                session.last_time = time
+                session.last_lines = set()
+            session.last_lines.add(line)
+
+            session.lines_read += 1
+            if not session.filter.matches(priority, tag, message):
+                session.lines_filtered += 1
+                continue
+
+            session.seq += 1
+            # Tags repeat constantly; share one string object per tag
+            record = (session.seq, time, int(pid), int(tid), priority, sys.intern(tag), message)
+            records.append(record)
+            session.records.append(record)
+            session.bytes += RECORD_OVERHEAD + len(message)
+            if session.spill:
+                spilled.append(raw)
+
+        while session.records and (len(session.records) > self.max_records or session.bytes > self.max_bytes):
+            evicted = session.records.popleft()
+            session.bytes -= RECORD_OVERHEAD + len(evicted[6])
+            session.records_evicted += 1
+
+        return records, b"\n".join(spilled) + b"\n" if spilled else b""
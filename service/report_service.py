@@ -0,0 +1,337 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from repositories.db_repository import DBRepository, StoredScan
+
+# Rendered output is buffered up to this size before being sent.
+CHUNK_SIZE = 64 * 1024
+
+# Download format -> (media type, file extension)
+REPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "html": ("text/html", "html"),
+}
+
+CSV_COLUMNS = ["scan_id", "device_id", "brand", "model", "scan_type", "created_at", "package"]
+
+# Number of archive records written per import transaction.
+IMPORT_BATCH_SIZE = 500
+
+# Largest archive accepted by import_scans, in bytes once decompressed; a
+# small gzip body can otherwise expand without limit.
+MAX_IMPORT_SIZE = 1024 * 1024 * 1024
+
+# Scans loaded per query by batch_reports; bounds the memory a batch holds
+REPORT_BATCH_CHUNK = 50
+
+# wbits selecting a gzip container for zlib (de)compression objects.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class ArchiveTooLarge(ValueError):
+    """Raised by import_scans when an archive expands past max_import_size."""
+
+
+def _inflate(decompressor: Any, data: bytes) -> Iterator[bytes]:
+    """Decompress data in pieces of at most CHUNK_SIZE bytes, however much it expands."""
+    while data:
+        piece = decompressor.decompress(data, CHUNK_SIZE)
+        data = decompressor.unconsumed_tail
+        if piece:
+            yield piece
+
+
+def _project(record: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Keep only the given (possibly dotted) field paths of a record."""
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        path = field.split(".")
+        value: Any = record
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+    return projected
+
+
+def _buffered(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Group many small text pieces into chunks of about CHUNK_SIZE bytes."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+class ReportService:
+    """Service for streaming stored scan reports in downloadable formats."""
+    
+    def __init__(self,
+                 db_repo: DBRepository,
+                 template_dir: str = "static/report_templates",
+                 max_import_size: int = MAX_IMPORT_SIZE):
+        """
+        Initialize the report service.
+        
+        Args:
+            db_repo: Database repository holding the scans
+            template_dir: Directory containing the Jinja2 report templates
+            max_import_size: Largest archive accepted by import_scans, in
+                bytes after decompression
+        """
+        self.db_repo = db_repo
+        self.max_import_size = max_import_size
+        # Compiled templates are cached by the environment; they never change
+        # while the server runs, so skip the per-render freshness check
+        self.templates = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False
+        )
+    
+    async def open_report(self, scan_id: int, format: str) -> Optional[Dict[str, Any]]:
+        """
+        Prepare a streamed download of a scan report.
+        
+        Args:
+            scan_id: The scan ID
+            format: One of the REPORT_FORMATS keys
+            
+        Returns:
+            Dictionary with the content iterator, media_type and filename, or
+            None if the scan does not exist
+        """
+        media_type, extension = REPORT_FORMATS[format]
+        scan = await self.db_repo.get_stored_scan(scan_id)
+        if not scan:
+            return None
+        
+        renderers = {
+            "json": scan.iter_json,
+            "ndjson": lambda: self._iter_ndjson(scan),
+            "csv": lambda: self._iter_csv(scan),
+            "html": lambda: self._iter_html(scan),
+        }
+        
+        # Generate filename based on device info and scan date
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return {
+            "content": renderers[format](),
+            "media_type": media_type,
+            "filename": f"scan_{scan.model}_{scan.device_id}_{timestamp}.{extension}"
+        }
+    
+    def _iter_ndjson(self, scan: StoredScan) -> Iterator[bytes]:
+        """One line for the scan itself, then one line per installed app."""
+        header = {"type": "scan", **scan.summary(), "scan_data": scan.scan_data_without_apps()}
+        yield (json.dumps(header) + "\n").encode('utf-8')
+        yield from _buffered(
+            json.dumps({"type": "app", "package": package}) + "\n"
+            for package in scan.iter_installed_apps()
+        )
+    
+    def _iter_csv(self, scan: StoredScan) -> Iterator[bytes]:
+        """One CSV row per installed app, prefixed with the scan columns."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        prefix = [scan.id, scan.device_id, scan.brand, scan.model, scan.scan_type, scan.created_at]
+        
+        def rows() -> Iterator[str]:
+            writer.writerow(CSV_COLUMNS)
+            for package in scan.iter_installed_apps():
+                writer.writerow(prefix + [package])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        
+        return _buffered(rows())
+    
+    def _iter_html(self, scan: StoredScan) -> Iterator[bytes]:
+        """Render the report template incrementally."""
+        template = self.templates.get_template("report.html")
+        return _buffered(template.generate(
+            scan=scan.summary(),
+            scan_data=scan.scan_data_without_apps(),
+            installed_apps=scan.iter_installed_apps()
+        ))
+    
+    async def export_scans(self,
+                           device_id: Optional[str] = None,
+                           scan_type: Optional[str] = None,
+                           since: Optional[str] = None,
+                           until: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Stream matching scans as a gzip-compressed NDJSON archive.
+        
+        Each line is a full scan record. Rows are read from the database in
+        batches and compressed as they are encoded, so memory use does not
+        grow with the size of the export.
+        
+        Args:
+            device_id: Only scans of this device
+            scan_type: Only scans of this type (fast/full)
+            since: Only scans created at or after this timestamp
+            until: Only scans created before this timestamp
+            
+        Yields:
+            Chunks of the gzip stream
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+        pending = []
+        size = 0
+        async for scan in self.db_repo.iter_stored_scans(device_id, scan_type, since, until):
+            for piece in scan.iter_json():
+                compressed = compressor.compress(piece)
+                pending.append(compressed)
+                size += len(compressed)
+            pending.append(compressor.compress(b'\n'))
+            if size >= CHUNK_SIZE:
+                yield b''.join(pending)
+                pending, size = [], 0
+        pending.append(compressor.flush())
+        yield b''.join(pending)
+    
+    async def import_scans(self, stream: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Ingest an NDJSON scan archive, gzip-compressed or plain.
+        
+        Records are written in batches of IMPORT_BATCH_SIZE, one transaction
+        per batch, and deduplicated by (device_id, created_at, scan_type).
+        A gzip body is inflated a bounded piece at a time.
+        
+        Args:
+            stream: The archive body as received
+            
+        Returns:
+            Dictionary with imported, skipped and invalid record counts
+            
+        Raises:
+            ArchiveTooLarge: If the archive exceeds max_import_size once
+                decompressed; batches written before that are kept
+        """
+        totals = {"imported": 0, "skipped": 0, "invalid": 0}
+        decompressor = None
+        head = b''
+        size = 0
+        pending = b''
+        batch: List[Dict[str, Any]] = []
+        
+        async def flush() -> None:
+            result = await self.db_repo.import_scans(batch)
+            totals["imported"] += result["imported"]
+            totals["skipped"] += result["skipped"]
+            batch.clear()
+        
+        async for chunk in stream:
+            if decompressor is None:
+                # Sniff the gzip magic number once its two bytes have arrived,
+                # however the body happens to be split into chunks
+                head += chunk
+                if len(head) < 2:
+                    continue
+                chunk, head = head, b''
+                gzipped = chunk[:2] == b'\x1f\x8b'
+                decompressor = zlib.decompressobj(GZIP_WBITS) if gzipped else False
+            
+            for piece in _inflate(decompressor, chunk) if decompressor else [chunk]:
+                size += len(piece)
+                if size > self.max_import_size:
+                    raise ArchiveTooLarge(f"Archive exceeds {self.max_import_size} bytes")
+                lines = (pending + piece).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    record = self._parse_archive_line(line, totals)
+                    if record:
+                        batch.append(record)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await flush()
+        
+        if decompressor:
+            pending += decompressor.flush()
+        elif decompressor is None:
+            # Bodies shorter than the magic number
+            pending = head
+        record = self._parse_archive_line(pending, totals)
+        if record:
+            batch.append(record)
+        if batch:
+            await flush()
+        return totals
+    
+    def _parse_archive_line(self, line: bytes, totals: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Parse one archive line, counting it as invalid if it is not a scan record."""
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            totals["invalid"] += 1
+            return None
+        if not isinstance(record, dict) or not all(
+            isinstance(record.get(key), str) for key in ("device_id", "scan_type", "created_at")
+        ):
+            totals["invalid"] += 1
+            return None
+        return record
+    
+    async def batch_reports(self, scan_ids: List[int], fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        """
+        Stream several scan reports as a JSON array in request order.
+        
+        Scans are loaded REPORT_BATCH_CHUNK at a time with one query per
+        chunk, and each chunk is sent before the next is loaded, so memory
+        stays bounded however large the batch. The scan cache is bypassed.
+        Without a projection the stored JSON is passed through unparsed; IDs
+        that do not exist produce an error entry instead of failing the batch.
+        
+        Args:
+            scan_ids: The scan IDs, in the order results should be returned
+            fields: Optional field paths to include; dotted paths select
+                inside scan_data
+            
+        Yields:
+            Chunks of the JSON array
+        """
+        yield b'['
+        for start in range(0, len(scan_ids), REPORT_BATCH_CHUNK):
+            chunk = scan_ids[start:start + REPORT_BATCH_CHUNK]
+            if fields:
+                records = await self.db_repo.get_scans_by_ids(
+                    chunk, include_apps=any(f.startswith("scan_data") for f in fields), cache=False
+                )
+                encoded = {
+                    scan_id: json.dumps(_project(record, fields)).encode('utf-8')
+                    for scan_id, record in records.items()
+                }
+            else:
+                encoded = await self.db_repo.get_scans_json_by_ids(chunk)
+            
+            parts = []
+            for index, scan_id in enumerate(chunk, start):
+                if index:
+                    parts.append(b',')
+                body = encoded.get(scan_id)
+                if body is None:
+                    body = json.dumps({"id": scan_id, "error": "not_found"}).encode('utf-8')
+                parts.append(body)
+            yield b''.join(parts)
+        yield b']'
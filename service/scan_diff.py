@@ -0,0 +1,91 @@
+import json
+from typing import Dict, Any, Hashable, List, Optional, Tuple
+
+# Labels used for the added/removed halves of a list diff, per key. Keys not
+# listed here use DEFAULT_LIST_LABELS.
+LIST_LABELS = {
+    "installed_apps": ("newly_installed", "removed"),
+}
+DEFAULT_LIST_LABELS = ("added", "removed")
+
+
+def _item_key(item: Any) -> Hashable:
+    """Hashable identity of a list item, so unhashable items get set semantics too."""
+    if isinstance(item, (dict, list, tuple)):
+        return json.dumps(item, sort_keys=True, default=str)
+    return item
+
+
+def _diff_lists(old: List[Any], new: List[Any], labels: Tuple[str, str]) -> Optional[Dict[str, List[Any]]]:
+    """Set difference of two lists, keeping each side's original order."""
+    old_keys = {_item_key(item) for item in old}
+    new_keys = {_item_key(item) for item in new}
+
+    added, seen = [], set()
+    for item in new:
+        key = _item_key(item)
+        if key not in old_keys and key not in seen:
+            added.append(item)
+            seen.add(key)
+
+    removed, seen = [], set()
+    for item in old:
+        key = _item_key(item)
+        if key not in new_keys and key not in seen:
+            removed.append(item)
+            seen.add(key)
+
+    if not added and not removed:
+        return None
+    return {labels[0]: added, labels[1]: removed}
+
+
+def diff_values(old: Any, new: Any, key: Optional[str] = None) -> Optional[Any]:
+    """
+    Recursively diff two scan_data values.
+
+    Dicts are compared key by key, lists with set semantics and everything
+    else by value. A key present on only one side is reported with None for
+    the missing side.
+
+    Args:
+        old: Value from the earlier scan
+        new: Value from the later scan
+        key: Name of the field holding the values, used to label list diffs
+
+    Returns:
+        The differences, or None if the values are equal
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        differences = {}
+        for field in list(old) + [field for field in new if field not in old]:
+            if field not in new:
+                differences[field] = {"scan1": old[field], "scan2": None}
+            elif field not in old:
+                differences[field] = {"scan1": None, "scan2": new[field]}
+            else:
+                field_diff = diff_values(old[field], new[field], field)
+                if field_diff is not None:
+                    differences[field] = field_diff
+        return differences or None
+
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        return _diff_lists(old, new, LIST_LABELS.get(key, DEFAULT_LIST_LABELS))
+
+    if old != new:
+        return {"scan1": old, "scan2": new}
+    return None
+
+
+def diff_scan_data(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Diff the scan_data of two scans.
+
+    Args:
+        old: scan_data of the earlier scan
+        new: scan_data of the later scan
+
+    Returns:
+        Dictionary of differences, empty if the scans match
+    """
+    return diff_values(old, new) or {}
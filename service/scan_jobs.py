@@ -0,0 +1,185 @@
+import asyncio
+import datetime
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+
+class ScanJob:
+    """A scan running in the background, awaitable until it finishes.
+
+    A completed job keeps only the ID of the saved scan and a small summary;
+    the scan itself is read back from the database when asked for.
+    """
+
+    def __init__(self, device_id: str, scan_type: str):
+        """
+        Create a pending job. Must be called from within the event loop.
+
+        Args:
+            device_id: The device being scanned
+            scan_type: The type of scan (fast/full)
+        """
+        self.id = uuid.uuid4().hex
+        self.device_id = device_id
+        self.scan_type = scan_type
+        self.status = "pending"
+        self.created_at = datetime.datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.finished_monotonic: Optional[float] = None
+        self.scan_id: Optional[int] = None
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._done = asyncio.get_running_loop().create_future()
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has completed or failed."""
+        return self._done.done()
+
+    def start(self) -> None:
+        """Mark the job as running."""
+        self.status = "running"
+
+    def complete(self, result: Dict[str, Any]) -> None:
+        """Record the saved scan's ID and summary and wake every waiter."""
+        self.status = "completed"
+        self.scan_id = result.get("scan_id")
+        self.summary = {
+            "brand": result.get("brand"),
+            "model": result.get("model"),
+            "android_version": result.get("android_version"),
+        }
+        if isinstance(result.get("installed_apps"), list):
+            self.summary["app_count"] = len(result["installed_apps"])
+        self._finish()
+
+    def fail(self, error: str) -> None:
+        """Record the failure and wake every waiter."""
+        self.status = "failed"
+        self.error = error
+        self._finish()
+
+    def add_done_callback(self, callback: Callable[["ScanJob"], None]) -> None:
+        """Call callback(job) once the job has completed or failed."""
+        self._done.add_done_callback(lambda _: callback(self))
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Wait for the job to finish without polling.
+
+        Args:
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if the job finished within the timeout
+        """
+        if not self.done and timeout > 0:
+            try:
+                # shield: a waiter giving up must not cancel the shared future
+                await asyncio.wait_for(asyncio.shield(self._done), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.done
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the job state, including the scan ID and summary once completed."""
+        return {
+            "job_id": self.id,
+            "device_id": self.device_id,
+            "scan_type": self.scan_type,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "scan_id": self.scan_id,
+            "summary": self.summary,
+            "error": self.error
+        }
+
+    def _finish(self) -> None:
+        self.finished_at = datetime.datetime.now().isoformat()
+        self.finished_monotonic = time.monotonic()
+        if not self._done.done():
+            self._done.set_result(None)
+
+
+class ScanJobRegistry:
+    """Keeps recent scan jobs so clients can look them up by ID."""
+
+    def __init__(self, max_jobs: int = 1000, finished_ttl: float = 3600.0):
+        """
+        Initialize the registry.
+
+        Args:
+            max_jobs: Number of jobs retained; the oldest finished jobs are
+                forgotten first
+            finished_ttl: Seconds a finished job is kept after it finished
+        """
+        self.max_jobs = max_jobs
+        self.finished_ttl = finished_ttl
+        self._jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+
+    def create(self, device_id: str, scan_type: str) -> ScanJob:
+        """
+        Register a new pending job.
+
+        Args:
+            device_id: The device being scanned
+            scan_type: The type of scan (fast/full)
+
+        Returns:
+            The new job
+        """
+        self._expire()
+        job = ScanJob(device_id, scan_type)
+        self._jobs[job.id] = job
+
+        if len(self._jobs) > self.max_jobs:
+            for job_id in [job_id for job_id, old in self._jobs.items() if old.done]:
+                del self._jobs[job_id]
+                if len(self._jobs) <= self.max_jobs:
+                    break
+        return job
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: The job ID
+
+        Returns:
+            The job, or None if unknown or already forgotten
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and self._expired(job, time.monotonic()):
+            del self._jobs[job_id]
+            return None
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a job to finish, up to a timeout.
+
+        Args:
+            job_id: The job ID
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            The job state (finished or not), or None if unknown
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        await job.wait(timeout)
+        return job.to_dict()
+
+    def _expired(self, job: ScanJob, now: float) -> bool:
+        return job.done and now - job.finished_monotonic > self.finished_ttl
+
+    def _expire(self) -> None:
+        """Forget the jobs that finished more than finished_ttl seconds ago."""
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items() if self._expired(job, now)]:
+            del self._jobs[job_id]
@@ -8,6 +8,10 @@ from repositories.adb_repository import ADBRepository
 from repositories.db_repository import DBRepository
 from repositories.brand.brand_factory import BrandFactory
 from repositories.brand.base_brand import BaseBrand
+from repositories.scan_cache import ScanCache, freeze
+from service.scan_diff import diff_scan_data
+from service.scan_jobs import ScanJob, ScanJobRegistry
+from service.connection_manager import device_topic, job_topic
 
 class ScanService:
     """Service for performing device scans and managing scan results."""
@@ -16,7 +20,12 @@ class ScanService:
                  adb_repo: ADBRepository, 
                  db_repo: DBRepository,
                  brand_factory: BrandFactory,
-                 websocket_manager = None):
+                 event_bus = None,
+                 job_registry: Optional[ScanJobRegistry] = None,
+                 device_service = None,
+                 wireless_service = None,
+                 prefetch_ttl: float = 120.0,
+                 max_concurrent_prefetch: int = 2):
         """
         Initialize the scan service.
         
@@ -24,56 +33,262 @@ class ScanService:
             adb_repo: ADB repository for executing commands
             db_repo: Database repository for storing results
             brand_factory: Factory for creating brand-specific implementations
-            websocket_manager: Websocket manager for real-time updates
+            event_bus: Event bus for real-time updates
+            job_registry: Registry tracking scan jobs (default: in-process)
+            device_service: Device service told when scans start and end
+            wireless_service: Wireless service that re-establishes a Wi-Fi
+                device's dropped transport before it is scanned
+            prefetch_ttl: Seconds a prefetched fast scan stays usable
+            max_concurrent_prefetch: Maximum fast scans prefetched at once
         """
         self.adb_repo = adb_repo
         self.db_repo = db_repo
         self.brand_factory = brand_factory
-        self.websocket_manager = websocket_manager
+        self.event_bus = event_bus
+        self.device_service = device_service
+        self.wireless_service = wireless_service
+        # Scans never change once written, so diffs are cached by ID pair
+        self._diff_cache = ScanCache(max_entries=512, max_bytes=16 * 1024 * 1024)
+        self.jobs = job_registry or ScanJobRegistry()
+        self._job_tasks = set()  # Strong references to running job tasks
+        # Fast scan probes run speculatively when a device connects, by device ID
+        self.prefetch_ttl = prefetch_ttl
+        self._prefetched: Dict[str, asyncio.Task] = {}
+        self._prefetch_limit = asyncio.Semaphore(max_concurrent_prefetch)
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        # Called with a deleted scan's ID, e.g. to tell other workers to drop it from their caches
+        self.on_scan_deleted: Optional[Callable[[int], None]] = None
     
-    async def _send_status_update(self, message: str) -> None:
+    async def _send_status_update(self,
+                                  message: str,
+                                  device_id: Optional[str] = None,
+                                  job_id: Optional[str] = None) -> None:
         """
-        Send a status update via websocket.
+        Publish a status update to websocket clients.
         
         Args:
             message: The status message
+            device_id: The device the update is about
+            job_id: The scan job the update belongs to
         """
-        if self.websocket_manager:
-            await self.websocket_manager.broadcast(
-                json.dumps({
+        if self.event_bus:
+            await self.event_bus.publish(
+                {
                     "type": "status_update",
                     "message": message,
+                    "device_id": device_id,
+                    "job_id": job_id,
                     "timestamp": datetime.datetime.now().isoformat()
-                })
+                },
+                topics=self._topics(device_id, job_id),
+                # Each progress message supersedes the previous one for the same scan
+                coalesce_key=("status_update", job_id or device_id)
             )
     
-    async def fast_scan(self, device_id: str) -> Dict[str, Any]:
+    async def _send_job_update(self, job: ScanJob) -> None:
+        """
+        Publish a scan job state change to websocket clients.
+        
+        Args:
+            job: The scan job
+        """
+        if self.event_bus:
+            await self.event_bus.publish(
+                {
+                    "type": "job_update",
+                    "job_id": job.id,
+                    "device_id": job.device_id,
+                    "scan_type": job.scan_type,
+                    "status": job.status,
+                    "error": job.error,
+                    "timestamp": datetime.datetime.now().isoformat()
+                },
+                topics=self._topics(job.device_id, job.id)
+            )
+    
+    @staticmethod
+    def _topics(device_id: Optional[str], job_id: Optional[str]) -> List[str]:
+        """WebSocket topics for a message about a device and/or job."""
+        topics = []
+        if device_id:
+            topics.append(device_topic(device_id))
+        if job_id:
+            topics.append(job_topic(job_id))
+        return topics
+    
+    async def _ensure_transport(self, device_id: str) -> None:
+        """
+        Reconnect a Wi-Fi device whose TCP session dropped, so the scan does not hang on it.
+        
+        Args:
+            device_id: The device identifier
+        """
+        if self.wireless_service and not await self.wireless_service.ensure_connected(device_id):
+            raise Exception(f"Wireless device {device_id} is not reachable")
+    
+    def start_scan_job(self, device_id: str, scan_type: str) -> ScanJob:
+        """
+        Start a scan in the background and return a job to track it.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            
+        Returns:
+            The pending scan job
+        """
+        job = self.jobs.create(device_id, scan_type)
+        task = asyncio.create_task(self._run_scan_job(job))
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+        return job
+    
+    async def _run_scan_job(self, job: ScanJob) -> None:
+        """
+        Run the scan behind a job and record its outcome.
+        
+        Args:
+            job: The job to run
+        """
+        job.start()
+        await self._send_job_update(job)
+        if self.device_service:
+            await self.device_service.set_scanning(job.device_id, True)
+        scan = self.fast_scan if job.scan_type == "fast" else self.full_scan
+        try:
+            job.complete(await scan(job.device_id, job_id=job.id))
+        except Exception as e:
+            job.fail(str(e))
+            await self._send_status_update(f"{job.scan_type.capitalize()} scan failed: {str(e)}",
+                                           job.device_id, job.id)
+        finally:
+            if self.device_service:
+                await self.device_service.set_scanning(job.device_id, False)
+        await self._send_job_update(job)
+    
+    async def wait_for_job(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a scan job to finish, up to a timeout.
+        
+        Args:
+            job_id: The job ID
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            The job state (finished or not), or None if unknown. A completed
+            job's scan is read back from the database as "result".
+        """
+        job = await self.jobs.wait(job_id, timeout)
+        if job and job["status"] == "completed" and job.get("scan_id") is not None:
+            scan = await self.db_repo.get_scan_by_id(job["scan_id"])
+            # None once the scan has been deleted
+            job["result"] = scan and {
+                **scan["scan_data"],
+                "scan_id": scan["id"],
+                "scan_type": scan["scan_type"],
+                "timestamp": scan["created_at"]
+            }
+        return job
+    
+    def prefetch_fast_scan(self, device_id: str, brand_impl: Optional[BaseBrand] = None) -> None:
+        """
+        Run the fast scan probes in the background so a fast scan requested
+        soon afterwards can reuse them. Nothing is saved unless that scan is
+        requested.
+        
+        Args:
+            device_id: The device identifier
+            brand_impl: The device's brand implementation, if already created
+        """
+        task = self._prefetched.get(device_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._prefetch_device_info(device_id, brand_impl))
+        # A failed prefetch is only a miss; retrieve the exception so it is not logged
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._prefetched[device_id] = task
+    
+    def drop_prefetch(self, device_id: str) -> None:
+        """
+        Discard a device's prefetched fast scan info, e.g. because it was
+        unplugged and may come back changed.
+        
+        Args:
+            device_id: The device identifier
+        """
+        task = self._prefetched.pop(device_id, None)
+        if task is not None:
+            task.cancel()
+    
+    async def _prefetch_device_info(self, device_id: str, brand_impl: Optional[BaseBrand]):
+        """Gather the fast scan's device info; returns (time.monotonic() when gathered, info)."""
+        # Limited so prefetching never competes with requested scans for adb
+        async with self._prefetch_limit:
+            if brand_impl is None:
+                brand_impl = await self.brand_factory.create_brand_implementation(device_id)
+            device_info = await brand_impl.get_device_info(device_id)
+            return time.monotonic(), device_info
+    
+    async def _take_prefetched_device_info(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim a device's prefetched fast scan info, waiting for it if still running.
+        
+        Args:
+            device_id: The device identifier
+            
+        Returns:
+            The device info, or None if there is no usable prefetch
+        """
+        task = self._prefetched.pop(device_id, None)
+        if task is None:
+            self.prefetch_misses += 1
+            return None
+        try:
+            fetched_at, device_info = await task
+        except Exception:
+            self.prefetch_misses += 1
+            return None
+        if time.monotonic() - fetched_at > self.prefetch_ttl:
+            self.prefetch_misses += 1
+            return None
+        self.prefetch_hits += 1
+        return device_info
+    
+    async def fast_scan(self, device_id: str, job_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Perform a fast scan of the device.
         
         Args:
             device_id: The device identifier
+            job_id: The scan job this scan runs under, if any
             
         Returns:
             Scan results as a dictionary
         """
         # Send status update
-        await self._send_status_update(f"Starting fast scan for device {device_id}")
+        await self._send_status_update(f"Starting fast scan for device {device_id}", device_id, job_id)
         
         # Ensure device is connected
+        await self._ensure_transport(device_id)
         if not await self.adb_repo.is_device_connected(device_id):
             raise Exception(f"Device {device_id} is not connected")
         
-        # Detect and create brand implementation
-        await self._send_status_update("Detecting device brand")
-        brand_impl = await self.brand_factory.create_brand_implementation(device_id)
-        
-        # Get basic device information
-        await self._send_status_update("Gathering basic device information")
-        device_info = await brand_impl.get_device_info(device_id)
+        # Reuse the probes run when the device connected, if any
+        device_info = await self._take_prefetched_device_info(device_id)
+        if device_info is None:
+            # Detect and create brand implementation
+            await self._send_status_update("Detecting device brand", device_id, job_id)
+            brand_impl = await self.brand_factory.create_brand_implementation(device_id)
+            
+            # Get basic device information
+            await self._send_status_update("Gathering basic device information", device_id, job_id)
+            device_info = await brand_impl.get_device_info(device_id)
+        else:
+            await self._send_status_update("Using device information gathered on connect", device_id, job_id)
         
         # Save scan results to database
-        await self._send_status_update("Saving scan results")
+        await self._send_status_update("Saving scan results", device_id, job_id)
         scan_id = await self.db_repo.save_scan_result(
             device_id=device_id,
             brand=device_info.get("brand", "Unknown"),
@@ -87,36 +302,38 @@ class ScanService:
         device_info["scan_type"] = "fast"
         device_info["timestamp"] = datetime.datetime.now().isoformat()
         
-        await self._send_status_update("Fast scan completed successfully")
+        await self._send_status_update("Fast scan completed successfully", device_id, job_id)
         return device_info
     
-    async def full_scan(self, device_id: str) -> Dict[str, Any]:
+    async def full_scan(self, device_id: str, job_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Perform a full scan of the device with detailed information.
         
         Args:
             device_id: The device identifier
+            job_id: The scan job this scan runs under, if any
             
         Returns:
             Scan results as a dictionary
         """
         # Send status update
-        await self._send_status_update(f"Starting full scan for device {device_id}")
+        await self._send_status_update(f"Starting full scan for device {device_id}", device_id, job_id)
         
         # Ensure device is connected
+        await self._ensure_transport(device_id)
         if not await self.adb_repo.is_device_connected(device_id):
             raise Exception(f"Device {device_id} is not connected")
         
         # Detect and create brand implementation
-        await self._send_status_update("Detecting device brand")
+        await self._send_status_update("Detecting device brand", device_id, job_id)
         brand_impl = await self.brand_factory.create_brand_implementation(device_id)
         
         # Get basic device information
-        await self._send_status_update("Gathering device information")
+        await self._send_status_update("Gathering device information", device_id, job_id)
         device_info = await brand_impl.get_device_info(device_id)
         
         # Get additional information for full scan
-        await self._send_status_update("Gathering installed applications")
+        await self._send_status_update("Gathering installed applications", device_id, job_id)
         installed_apps = await brand_impl.get_installed_apps(device_id)
         
         # Add additional information to results
@@ -126,7 +343,7 @@ class ScanService:
         # For example, system settings, network configuration, etc.
         
         # Save scan results to database
-        await self._send_status_update("Saving scan results")
+        await self._send_status_update("Saving scan results", device_id, job_id)
         scan_id = await self.db_repo.save_scan_result(
             device_id=device_id,
             brand=device_info.get("brand", "Unknown"),
@@ -140,20 +357,71 @@ class ScanService:
         device_info["scan_type"] = "full"
         device_info["timestamp"] = datetime.datetime.now().isoformat()
         
-        await self._send_status_update("Full scan completed successfully")
+        await self._send_status_update("Full scan completed successfully", device_id, job_id)
         return device_info
     
-    async def get_scan_by_id(self, scan_id: int) -> Optional[Dict[str, Any]]:
+    async def get_scan_by_id(self, scan_id: int, include_apps: bool = True) -> Optional[Dict[str, Any]]:
         """
         Get a scan result by its ID.
         
         Args:
             scan_id: The scan ID
+            include_apps: Whether to include the installed_apps list
             
         Returns:
             The scan record or None if not found
         """
-        return await self.db_repo.get_scan_by_id(scan_id)
+        return await self.db_repo.get_scan_by_id(scan_id, include_apps)
+    
+    async def get_scan_json_by_id(self, scan_id: int) -> Optional[bytes]:
+        """
+        Get a scan record as JSON bytes, without decoding scan_data.
+        
+        Args:
+            scan_id: The scan ID
+            
+        Returns:
+            The encoded scan record or None if not found
+        """
+        return await self.db_repo.get_scan_json_by_id(scan_id)
+    
+    async def get_latest_scan(self, device_id: str, scan_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent scan of a given type for a device.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            
+        Returns:
+            The scan record or None if not found
+        """
+        return await self.db_repo.get_latest_scan(device_id, scan_type)
+    
+    async def get_scan_meta(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the id, created_at and content_hash of a scan without its data.
+        
+        Args:
+            scan_id: The scan ID
+            
+        Returns:
+            The scan's validator fields or None if not found
+        """
+        return await self.db_repo.get_scan_meta(scan_id)
+    
+    async def get_latest_scan_meta(self, device_id: str, scan_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the id, created_at and content_hash of a device's latest scan.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            
+        Returns:
+            The scan's validator fields or None if not found
+        """
+        return await self.db_repo.get_latest_scan_meta(device_id, scan_type)
     
     async def get_scans_by_device_id(self, device_id: str) -> List[Dict[str, Any]]:
         """
@@ -179,6 +447,143 @@ class ScanService:
         """
         return await self.db_repo.get_all_scans(limit)
     
+    async def compare_scans(self, device_id: str, scan_id_1: int, scan_id_2: int) -> Optional[Dict[str, Any]]:
+        """
+        Compare two scans of a device field by field.
+        
+        Installed apps are diffed through their app set ids where possible,
+        so the package lists are only decoded when the sets differ.
+        
+        Args:
+            device_id: The device both scans must belong to
+            scan_id_1: The earlier scan ID
+            scan_id_2: The later scan ID
+            
+        Returns:
+            The comparison, or None if either scan does not exist
+            
+        Raises:
+            ValueError: If either scan belongs to another device
+        """
+        comparison = self._diff_cache.get((scan_id_1, scan_id_2))
+        if comparison is None:
+            apps_delta = await self.db_repo.get_app_set_delta(scan_id_1, scan_id_2)
+            # Legacy rows carry installed_apps inline and are diffed generically
+            scans = await self.db_repo.get_scans_by_ids(
+                [scan_id_1, scan_id_2], include_apps=apps_delta is None
+            )
+            scan1, scan2 = scans.get(scan_id_1), scans.get(scan_id_2)
+            if not scan1 or not scan2:
+                return None
+            if scan1["device_id"] != scan2["device_id"]:
+                raise ValueError("Both scans must be for the specified device")
+            
+            differences = diff_scan_data(scan1["scan_data"], scan2["scan_data"])
+            if apps_delta and (apps_delta["newly_installed"] or apps_delta["removed"]):
+                differences["installed_apps"] = apps_delta
+            
+            comparison, size = freeze({
+                "device_id": scan1["device_id"],
+                "scan1": {
+                    "id": scan_id_1,
+                    "timestamp": scan1["created_at"]
+                },
+                "scan2": {
+                    "id": scan_id_2,
+                    "timestamp": scan2["created_at"]
+                },
+                "differences": differences
+            })
+            self._diff_cache.put((scan_id_1, scan_id_2), comparison, size)
+        
+        if comparison["device_id"] != device_id:
+            raise ValueError("Both scans must be for the specified device")
+        return comparison
+    
+    async def get_scan_timeline(self, device_id: str, scan_type: str = "full", limit: int = 10) -> Dict[str, Any]:
+        """
+        Get the chain of differences across a device's most recent scans.
+        
+        The scans are loaded with a single query and each consecutive pair is
+        diffed in one pass; pair results share the comparison cache.
+        
+        Args:
+            device_id: The device identifier
+            scan_type: The type of scan (fast/full)
+            limit: Number of most recent scans to include
+            
+        Returns:
+            Dictionary with the scans in chronological order and the
+            differences between each consecutive pair
+        """
+        scans = await self.db_repo.get_recent_scans(device_id, scan_type, limit)
+        
+        changes = []
+        for previous, current in zip(scans, scans[1:]):
+            key = (previous["id"], current["id"])
+            differences = self._diff_cache.get(key)
+            if differences is not None:
+                differences = differences["differences"]
+            else:
+                differences = diff_scan_data(previous["scan_data"], current["scan_data"])
+                comparison, size = freeze({
+                    "device_id": device_id,
+                    "scan1": {"id": previous["id"], "timestamp": previous["created_at"]},
+                    "scan2": {"id": current["id"], "timestamp": current["created_at"]},
+                    "differences": differences
+                })
+                self._diff_cache.put(key, comparison, size)
+            
+            changes.append({
+                "from_scan": previous["id"],
+                "to_scan": current["id"],
+                "timestamp": current["created_at"],
+                "differences": differences
+            })
+        
+        return {
+            "device_id": device_id,
+            "scan_type": scan_type,
+            "scans": [{"id": scan["id"], "timestamp": scan["created_at"]} for scan in scans],
+            "changes": changes
+        }
+    
+    async def search_packages(self,
+                              query: str,
+                              match: str = "exact",
+                              limit: int = 50,
+                              offset: int = 0) -> Dict[str, Any]:
+        """
+        Find devices whose latest full scan contains matching packages.
+        
+        Args:
+            query: Package name, prefix, or pattern using * and ?
+            match: One of exact, prefix or wildcard
+            limit: Maximum number of results to return
+            offset: Number of results to skip
+            
+        Returns:
+            Dictionary with the total match count and a page of results
+        """
+        return await self.db_repo.search_packages(query, match, limit, offset)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss/eviction counters of the scan report cache and of fast
+        scan prefetching.
+        
+        Returns:
+            Dictionary of cache statistics
+        """
+        return {
+            **self.db_repo.scan_cache.stats(),
+            "fast_scan_prefetch": {
+                "hits": self.prefetch_hits,
+                "misses": self.prefetch_misses,
+                "pending": sum(1 for task in self._prefetched.values() if not task.done())
+            }
+        }
+    
     async def delete_scan(self, scan_id: int) -> bool:
         """
         Delete a scan result by its ID.
@@ -189,4 +594,25 @@ class ScanService:
         Returns:
             True if deleted successfully, False if not found
         """
-        return await self.db_repo.delete_scan(scan_id)
+        deleted = await self.db_repo.delete_scan(scan_id)
+        if deleted:
+            self.invalidate_scan(scan_id)
+            if self.on_scan_deleted:
+                self.on_scan_deleted(scan_id)
+        return deleted
+    
+    def invalidate_scan(self, scan_id: int) -> None:
+        """
+        Drop a deleted scan from the scan report and diff caches.
+        
+        Args:
+            scan_id: The scan ID
+        """
+        self.db_repo.scan_cache.invalidate(scan_id)
+        # Diffs are keyed by ID pair and may involve the scan on either side
+        self._diff_cache.clear()
+    
+    def clear_caches(self) -> None:
+        """Drop every cached scan report and diff."""
+        self.db_repo.scan_cache.clear()
+        self._diff_cache.clear()
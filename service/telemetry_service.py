@@ -0,0 +1,529 @@
+import asyncio
+import json
+import math
+import shlex
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+
+from repositories.adb_repository import ADBRepository
+from repositories.db_repository import DBRepository
+from service.connection_manager import telemetry_topic
+from service.device_service import DeviceState
+
+# Metrics recorded per sample, in storage order
+METRICS = (
+    "battery_level",       # percent
+    "battery_temp_c",
+    "battery_voltage_mv",
+    "cpu_percent",         # all cores, since the previous sample
+    "mem_used_percent",
+    "mem_available_mb",
+    "thermal_max_c",       # hottest thermal zone
+)
+
+# Rollup resolutions in seconds, by name
+RESOLUTIONS = {"1s": 1, "1m": 60, "1h": 3600}
+
+# Seconds each rollup resolution is kept in the database
+DEFAULT_RETENTION = {1: 3600, 60: 7 * 24 * 3600, 3600: 90 * 24 * 3600}
+
+# Everything sampled in one shell call; sections are separated by "@@" marker lines.
+# Thermal zones that cannot be read are skipped, and the trailing `true` keeps
+# the exit status zero when some are.
+SAMPLE_SCRIPT = (
+    "dumpsys battery; "
+    "echo @@meminfo; cat /proc/meminfo; "
+    "echo @@stat; head -n 1 /proc/stat; "
+    "echo @@thermal; cat /sys/class/thermal/thermal_zone*/temp 2>/dev/null; "
+    "true"
+)
+
+NAN = float("nan")
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_sample(output: str) -> Tuple[Dict[str, Optional[float]], Optional[Tuple[float, float]]]:
+    """
+    Parse the output of SAMPLE_SCRIPT.
+
+    Args:
+        output: Output of one sampling shell call
+
+    Returns:
+        The sample (CPU usage excluded) and the (busy, total) jiffies of
+        /proc/stat, from which CPU usage is derived between two samples
+    """
+    sections: Dict[str, List[str]] = {"battery": []}
+    current = sections["battery"]
+    for line in output.splitlines():
+        if line.startswith("@@"):
+            current = sections.setdefault(line[2:].strip(), [])
+        else:
+            current.append(line)
+
+    sample: Dict[str, Optional[float]] = dict.fromkeys(METRICS)
+
+    battery = {}
+    for line in sections["battery"]:
+        key, _, value = line.strip().partition(":")
+        battery[key] = _number(value.strip())
+    sample["battery_level"] = battery.get("level")
+    if battery.get("temperature") is not None:
+        # Reported in tenths of a degree
+        sample["battery_temp_c"] = battery["temperature"] / 10
+    if battery.get("voltage") is not None:
+        # Most devices report millivolts, some volts
+        voltage = battery["voltage"]
+        sample["battery_voltage_mv"] = voltage * 1000 if voltage < 100 else voltage
+
+    meminfo = {}
+    for line in sections.get("meminfo", []):
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[key] = _number(fields[0])
+    total, available = meminfo.get("MemTotal"), meminfo.get("MemAvailable")
+    if total and available is not None:
+        sample["mem_used_percent"] = round(100 * (total - available) / total, 2)
+        sample["mem_available_mb"] = round(available / 1024, 1)
+
+    cpu = None
+    for line in sections.get("stat", []):
+        fields = line.split()
+        if fields and fields[0] == "cpu":
+            # user nice system idle iowait irq softirq steal
+            jiffies = [_number(field) or 0 for field in fields[1:9]]
+            idle = jiffies[3] + (jiffies[4] if len(jiffies) > 4 else 0)
+            cpu = (sum(jiffies) - idle, sum(jiffies))
+
+    temperatures = []
+    for line in sections.get("thermal", []):
+        value = _number(line.strip())
+        if value is None:
+            continue
+        # Usually millidegrees, on some devices degrees
+        celsius = value / 1000 if abs(value) >= 1000 else value
+        if 0 < celsius < 150:
+            temperatures.append(celsius)
+    if temperatures:
+        sample["thermal_max_c"] = max(temperatures)
+
+    return sample, cpu
+
+
+class _SeriesBuffer:
+    """Fixed-size ring buffer of samples backed by one flat float array per metric."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = [array("d", [NAN]) * capacity for _ in METRICS]
+        self.count = 0  # Samples appended so far
+
+    def append(self, timestamp: float, sample: Dict[str, Optional[float]]) -> None:
+        index = self.count % self.capacity
+        self.times[index] = timestamp
+        for metric, values in zip(METRICS, self.values):
+            value = sample.get(metric)
+            values[index] = NAN if value is None else value
+        self.count += 1
+
+    def _index(self, position: int) -> int:
+        """Array index of the position-th oldest retained sample."""
+        return (max(0, self.count - self.capacity) + position) % self.capacity
+
+    def _first_at_or_after(self, timestamp: float) -> int:
+        """Position of the oldest retained sample taken at or after a time."""
+        low, high = 0, min(self.count, self.capacity)
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[self._index(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(self, start: float, end: float, metrics: List[int], limit: int) -> Tuple[List[float], List[List[float]]]:
+        """
+        Get the samples taken between two times.
+
+        Args:
+            start: Earliest sample time (Unix time)
+            end: Latest sample time (Unix time)
+            metrics: Indexes into METRICS to return
+            limit: Maximum number of samples; the most recent are kept
+
+        Returns:
+            Sample times and, per requested metric, its values
+        """
+        first = self._first_at_or_after(start)
+        last = self._first_at_or_after(math.nextafter(end, math.inf))
+        first = max(first, last - limit)
+        indexes = [self._index(position) for position in range(first, last)]
+        return (
+            [self.times[index] for index in indexes],
+            [[self.values[metric][index] for index in indexes] for metric in metrics]
+        )
+
+    def latest(self) -> Optional[Tuple[float, List[float]]]:
+        if not self.count:
+            return None
+        index = (self.count - 1) % self.capacity
+        return self.times[index], [values[index] for values in self.values]
+
+
+class _Rollup:
+    """Running avg/min/max of each metric over the current bucket of one resolution."""
+
+    def __init__(self, resolution: int):
+        self.resolution = resolution
+        self.bucket: Optional[int] = None
+        self.samples = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.counts = [0] * len(METRICS)
+        self.sums = [0.0] * len(METRICS)
+        self.mins = [math.inf] * len(METRICS)
+        self.maxs = [-math.inf] * len(METRICS)
+
+    def add(self, timestamp: float, sample: Dict[str, Optional[float]]) -> Optional[Tuple[int, int, str]]:
+        """
+        Add a sample, closing the current bucket if the sample starts a new one.
+
+        Returns:
+            The closed bucket as (bucket, samples, stats JSON), or None. Stats
+            map each metric to [avg, min, max, readings]
+        """
+        bucket = int(timestamp // self.resolution) * self.resolution
+        closed = self.close() if self.bucket is not None and bucket != self.bucket else None
+        self.bucket = bucket
+        self.samples += 1
+        for index, metric in enumerate(METRICS):
+            value = sample.get(metric)
+            if value is None:
+                continue
+            self.counts[index] += 1
+            self.sums[index] += value
+            self.mins[index] = min(self.mins[index], value)
+            self.maxs[index] = max(self.maxs[index], value)
+        return closed
+
+    def close(self) -> Optional[Tuple[int, int, str]]:
+        """Close the current bucket, if any, and return it."""
+        if self.bucket is None or not self.samples:
+            return None
+        # The reading count lets a later part of the same bucket be merged in (see save_telemetry_rollups)
+        stats = {
+            metric: [round(self.sums[index] / self.counts[index], 3), self.mins[index], self.maxs[index],
+                     self.counts[index]]
+            for index, metric in enumerate(METRICS) if self.counts[index]
+        }
+        closed = (self.bucket, self.samples, json.dumps(stats, separators=(",", ":")))
+        self.bucket = None
+        self.samples = 0
+        self._reset()
+        return closed
+
+
+class _DeviceTelemetry:
+    """Sampling state of one device."""
+
+    def __init__(self, buffer_size: int):
+        self.buffer = _SeriesBuffer(buffer_size)
+        self.rollups = [_Rollup(resolution) for resolution in RESOLUTIONS.values()]
+        self.cpu: Optional[Tuple[float, float]] = None  # Previous (busy, total) jiffies
+        self.sampling = False  # A sampling call is in flight
+
+
+class TelemetryService:
+    """Samples battery, CPU, memory and thermal readings of ready devices.
+
+    Every tick each ready device is sampled with a single shell call. Samples
+    go into a fixed-size ring buffer per device, are published on the
+    device's telemetry topic and are rolled up into 1 s, 1 min and 1 h
+    buckets, which are written to SQLite in batches. A device whose previous
+    sample is still running skips the tick instead of queuing another call.
+    """
+
+    def __init__(self,
+                 adb_repo: ADBRepository,
+                 db_repo: DBRepository,
+                 device_service,
+                 event_bus = None,
+                 interval: float = 1.0,
+                 buffer_size: int = 3600,
+                 max_concurrent: int = 16,
+                 flush_interval: float = 5.0,
+                 retention: Optional[Dict[int, float]] = None):
+        """
+        Initialize the telemetry service.
+
+        Args:
+            adb_repo: ADB repository for executing commands
+            db_repo: Database repository storing rollups
+            device_service: Device service listing the devices to sample
+            event_bus: Event bus for real-time updates
+            interval: Seconds between samples of a device
+            buffer_size: Raw samples kept in memory per device
+            max_concurrent: Maximum sampling calls running at once
+            flush_interval: Seconds between rollup writes to the database
+            retention: Seconds each rollup resolution is kept
+                (default: 1 s for an hour, 1 min for a week, 1 h for 90 days)
+        """
+        self.adb_repo = adb_repo
+        self.db_repo = db_repo
+        self.device_service = device_service
+        self.event_bus = event_bus
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.retention = retention or DEFAULT_RETENTION
+        self._limit = asyncio.Semaphore(max_concurrent)
+        self._devices: Dict[str, _DeviceTelemetry] = {}
+        self._pending_rows: List[Tuple[str, int, int, int, str]] = []
+        self._sampling_tasks = set()  # Strong references to in-flight samples
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+        self.samples_taken = 0
+        self.sample_errors = 0
+        self.samples_skipped = 0
+        self.rows_written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, interval: Optional[float] = None) -> None:
+        """
+        Start sampling every ready device.
+
+        Args:
+            interval: Seconds between samples of a device (default: unchanged)
+        """
+        if interval is not None:
+            self.interval = interval
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop sampling and write out the partial rollup buckets."""
+        for task in (self._task, self._flush_task):
+            if task:
+                task.cancel()
+        self._task = self._flush_task = None
+        for device_id in list(self._devices):
+            self._close_rollups(device_id)
+        await self.flush()
+
+    async def _run(self) -> None:
+        """Sampling loop: one tick per interval, without drifting."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            try:
+                await self._tick()
+            except Exception as e:
+                print(f"Error in telemetry sampling: {str(e)}")
+
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Fell behind; skip the missed ticks rather than bursting
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def _tick(self) -> None:
+        """Start a sample of every ready device that is not still being sampled."""
+        devices = await self.device_service.get_connected_devices(include_lost=True)
+
+        tracked = {device["device_id"] for device in devices}
+        for device_id in list(self._devices):
+            if device_id not in tracked:
+                # Forgotten by the device registry
+                self._close_rollups(device_id)
+                del self._devices[device_id]
+
+        for device in devices:
+            if device.get("state") not in (DeviceState.READY.value, DeviceState.SCANNING.value):
+                continue
+            device_id = device["device_id"]
+            telemetry = self._devices.get(device_id)
+            if telemetry is None:
+                telemetry = self._devices[device_id] = _DeviceTelemetry(self.buffer_size)
+            if telemetry.sampling:
+                self.samples_skipped += 1
+                continue
+            telemetry.sampling = True
+            task = asyncio.create_task(self._sample(device_id, telemetry))
+            self._sampling_tasks.add(task)
+            task.add_done_callback(self._sampling_tasks.discard)
+
+    async def _sample(self, device_id: str, telemetry: _DeviceTelemetry) -> None:
+        """Take one sample of a device and record it."""
+        try:
+            async with self._limit:
+                output = await self.adb_repo.execute_command(device_id, shlex.quote(SAMPLE_SCRIPT))
+            timestamp = time.time()
+            sample, cpu = parse_sample(output)
+        except Exception:
+            self.sample_errors += 1
+            return
+        finally:
+            telemetry.sampling = False
+
+        if cpu and telemetry.cpu and cpu[1] > telemetry.cpu[1]:
+            busy, total = cpu[0] - telemetry.cpu[0], cpu[1] - telemetry.cpu[1]
+            sample["cpu_percent"] = round(100 * busy / total, 2)
+        telemetry.cpu = cpu
+
+        telemetry.buffer.append(timestamp, sample)
+        for rollup in telemetry.rollups:
+            closed = rollup.add(timestamp, sample)
+            if closed:
+                self._pending_rows.append((device_id, rollup.resolution) + closed)
+        self.samples_taken += 1
+
+        if self.event_bus:
+            await self.event_bus.publish(
+                {"type": "telemetry", "device_id": device_id, "timestamp": timestamp, "sample": sample},
+                topics=[telemetry_topic(device_id)],
+                # Only the newest sample of a device matters to a live view
+                coalesce_key=("telemetry", device_id)
+            )
+
+    def _close_rollups(self, device_id: str) -> None:
+        """Queue a device's partial rollup buckets for writing."""
+        for rollup in self._devices[device_id].rollups:
+            closed = rollup.close()
+            if closed:
+                self._pending_rows.append((device_id, rollup.resolution) + closed)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error writing telemetry: {str(e)}")
+
+    async def flush(self) -> None:
+        """Write closed rollup buckets to the database and drop expired ones."""
+        rows, self._pending_rows = self._pending_rows, []
+        await self.db_repo.save_telemetry_rollups(rows)
+        self.rows_written += len(rows)
+
+        now = time.time()
+        if now - self._last_prune >= 60:
+            self._last_prune = now
+            await self.db_repo.prune_telemetry_rollups(
+                {resolution: now - seconds for resolution, seconds in self.retention.items()}
+            )
+
+    async def get_series(self,
+                         device_id: str,
+                         resolution: str = "raw",
+                         start: Optional[float] = None,
+                         end: Optional[float] = None,
+                         metrics: Optional[List[str]] = None,
+                         limit: int = 3600) -> Dict[str, Any]:
+        """
+        Get a device's telemetry between two times.
+
+        Raw samples come from the in-memory ring buffer; rollups ("1s", "1m",
+        "1h") from the database and include per-bucket min and max.
+
+        Args:
+            device_id: The device identifier
+            resolution: "raw", "1s", "1m" or "1h"
+            start: Earliest time (Unix time; default: limit samples or buckets before end)
+            end: Latest time (Unix time; default: now)
+            metrics: Metrics to return (default: all, see METRICS)
+            limit: Maximum number of points; the most recent are kept
+
+        Returns:
+            Point timestamps and one value list per metric
+        """
+        if resolution != "raw" and resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of raw, {', '.join(RESOLUTIONS)}")
+        metrics = metrics or list(METRICS)
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+
+        end = time.time() if end is None else end
+        step = RESOLUTIONS.get(resolution, self.interval)
+        start = end - step * limit if start is None else start
+        result = {"device_id": device_id, "resolution": resolution, "start": start, "end": end}
+
+        if resolution == "raw":
+            telemetry = self._devices.get(device_id)
+            if telemetry is None:
+                times, columns = [], [[] for _ in metrics]
+            else:
+                times, columns = telemetry.buffer.range(
+                    start, end, [METRICS.index(metric) for metric in metrics], limit
+                )
+            result["timestamps"] = times
+            result["series"] = {
+                metric: [None if math.isnan(value) else value for value in column]
+                for metric, column in zip(metrics, columns)
+            }
+            return result
+
+        # Make buckets closed since the last write visible
+        await self.flush()
+        rows = await self.db_repo.get_telemetry_rollups(device_id, RESOLUTIONS[resolution], start, end, limit)
+        decoded = [json.loads(stats) for _, _, stats in rows]
+        result["timestamps"] = [bucket for bucket, _, _ in rows]
+        result["samples"] = [samples for _, samples, _ in rows]
+        for key, position in (("series", 0), ("min", 1), ("max", 2)):
+            result[key] = {
+                metric: [stats[metric][position] if metric in stats else None for stats in decoded]
+                for metric in metrics
+            }
+        return result
+
+    async def get_latest(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a device's most recent sample.
+
+        Args:
+            device_id: The device identifier
+
+        Returns:
+            The sample with its timestamp, or None if the device has not been sampled
+        """
+        telemetry = self._devices.get(device_id)
+        latest = telemetry.buffer.latest() if telemetry else None
+        if latest is None:
+            return None
+        timestamp, values = latest
+        return {
+            "device_id": device_id,
+            "timestamp": timestamp,
+            "sample": {metric: None if math.isnan(value) else value for metric, value in zip(METRICS, values)}
+        }
+
+    async def stats(self) -> Dict[str, Any]:
+        """Get sampling counters."""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "devices": len(self._devices),
+            "samples_taken": self.samples_taken,
+            "sample_errors": self.sample_errors,
+            "samples_skipped": self.samples_skipped,
+            "pending_rows": len(self._pending_rows),
+            "rows_written": self.rows_written
+        }
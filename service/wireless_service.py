@@ -0,0 +1,375 @@
+import asyncio
+import datetime
+import random
+import re
+import time
+from typing import Dict, Any, List, Optional
+
+from repositories.adb_repository import ADBRepository
+from repositories.db_repository import DBRepository
+from service.connection_manager import TOPIC_DEVICES, device_topic
+
+# Port adbd listens on after `adb tcpip` when none is given
+DEFAULT_PORT = 5555
+
+# host, host:port, [ipv6] or [ipv6]:port
+ADDRESS_PATTERN = re.compile(r"^(\[[0-9A-Fa-f:.]+\]|[A-Za-z0-9._-]+)(?::(\d{1,5}))?$")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Validate a wireless target address and add the default port if missing.
+
+    Args:
+        address: host, host:port, [ipv6] or [ipv6]:port
+
+    Returns:
+        The address as host:port, which is also its ADB device ID
+
+    Raises:
+        ValueError: If the address is invalid
+    """
+    match = ADDRESS_PATTERN.match(address.strip())
+    if match is None:
+        raise ValueError(f"Invalid address: {address!r}; expected host:port")
+    host, port = match.group(1), int(match.group(2) or DEFAULT_PORT)
+    if not 0 < port < 65536:
+        raise ValueError(f"Invalid address: {address!r}; port must be between 1 and 65535")
+    return f"{host}:{port}"
+
+
+class _Target:
+    """A wireless device kept connected, with its connection state."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.state = "connecting"  # connecting, connected, backoff
+        self.connected = asyncio.Event()
+        self.lost = asyncio.Event()  # Set by a failed keep-alive to make the task reconnect
+        self.wake = asyncio.Event()  # Set to cut a backoff wait short
+        self.attempted = asyncio.Event()  # Set once the first connection attempt is over
+        self.task: Optional[asyncio.Task] = None
+        self.attempts = 0  # Failed connection attempts since the last success
+        self.keepalive_failures = 0
+        self.connects = 0
+        self.drops = 0
+        self.last_error: Optional[str] = None
+        self.connected_at: Optional[str] = None
+        self.last_seen: Optional[float] = None
+        self.retry_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "state": self.state,
+            "connected_at": self.connected_at,
+            "last_seen": self.last_seen,
+            "retry_at": self.retry_at if self.state == "backoff" else None,
+            "attempts": self.attempts,
+            "connects": self.connects,
+            "drops": self.drops,
+            "last_error": self.last_error
+        }
+
+
+class WirelessService:
+    """Keeps devices reached over Wi-Fi (`adb connect host:port`) connected.
+
+    Targets are stored in the database and each has a task that connects
+    it and reconnects it with exponential backoff whenever it drops.
+    Connection attempts run in parallel, a limited number at a time.
+
+    Dropped Wi-Fi sessions often go unnoticed by adb, which keeps listing
+    the device. One keep-alive loop therefore checks every connected
+    target: a single `adb devices` for all of them, then a no-op shell
+    command per target that is still listed. A target that fails
+    consecutive keep-alives is disconnected and reconnected, so the device
+    registry (where targets appear under their address like any USB
+    device) stops offering a stale transport.
+    """
+
+    def __init__(self,
+                 adb_repo: ADBRepository,
+                 db_repo: DBRepository,
+                 device_service = None,
+                 event_bus = None,
+                 keepalive_interval: float = 15.0,
+                 keepalive_timeout: float = 5.0,
+                 keepalive_failures: int = 2,
+                 connect_timeout: float = 10.0,
+                 min_retry_delay: float = 1.0,
+                 max_retry_delay: float = 60.0,
+                 max_concurrent: int = 16):
+        """
+        Initialize the wireless service.
+
+        Args:
+            adb_repo: ADB repository for connecting and pinging devices
+            db_repo: Database repository storing the targets
+            device_service: Device service refreshed when a target connects or drops
+            event_bus: Event bus for real-time updates
+            keepalive_interval: Seconds between keep-alive rounds
+            keepalive_timeout: Seconds a device has to answer a keep-alive
+            keepalive_failures: Consecutive failed keep-alives after which a
+                target is reconnected
+            connect_timeout: Seconds an `adb connect` may take
+            min_retry_delay: First wait in seconds after a failed connection attempt
+            max_retry_delay: Longest wait in seconds between connection attempts
+            max_concurrent: Connection attempts and keep-alives running at once
+        """
+        self.adb_repo = adb_repo
+        self.db_repo = db_repo
+        self.device_service = device_service
+        self.event_bus = event_bus
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_timeout = keepalive_timeout
+        self.keepalive_failures = keepalive_failures
+        self.connect_timeout = connect_timeout
+        self.min_retry_delay = min_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._limit = asyncio.Semaphore(max_concurrent)
+        self._targets: Dict[str, _Target] = {}
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Connect every stored target and start the keep-alive loop."""
+        if self._keepalive_task is not None:
+            return
+        for address in await self.db_repo.get_wireless_targets():
+            self._add(address)
+        self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def stop(self) -> None:
+        """Stop connecting and keeping targets alive; established connections are left to adb."""
+        tasks = [target.task for target in self._targets.values() if target.task]
+        if self._keepalive_task:
+            tasks.append(self._keepalive_task)
+            self._keepalive_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._targets.clear()
+
+    async def add_targets(self, addresses: List[str], wait: float = 0) -> List[Dict[str, Any]]:
+        """
+        Add wireless targets and start connecting them.
+
+        Args:
+            addresses: host:port addresses (the port defaults to 5555)
+            wait: Seconds to wait for the new targets' first connection attempts
+
+        Returns:
+            The state of each given target
+
+        Raises:
+            ValueError: If an address is invalid
+        """
+        normalized = list(dict.fromkeys(normalize_address(address) for address in addresses))
+        await self.db_repo.add_wireless_targets(normalized)
+        targets = [self._targets.get(address) or self._add(address) for address in normalized]
+
+        if wait > 0:
+            # Done once each target has connected or failed its first attempt
+            pending = [asyncio.ensure_future(target.attempted.wait()) for target in targets]
+            _, not_done = await asyncio.wait(pending, timeout=wait)
+            for future in not_done:
+                future.cancel()
+        return [target.to_dict() for target in targets]
+
+    async def remove_target(self, address: str) -> bool:
+        """
+        Stop managing a target and disconnect it.
+
+        Args:
+            address: host:port address
+
+        Returns:
+            True if the target existed
+        """
+        address = normalize_address(address)
+        target = self._targets.pop(address, None)
+        if target and target.task:
+            target.task.cancel()
+            await asyncio.gather(target.task, return_exceptions=True)
+        deleted = await self.db_repo.delete_wireless_target(address)
+        if target is None and not deleted:
+            return False
+        try:
+            await self.adb_repo.disconnect_device(address)
+        except Exception as e:
+            print(f"Error disconnecting {address}: {str(e)}")
+        await self._refresh_devices()
+        return True
+
+    async def reconnect(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Reconnect a target now, skipping any remaining backoff.
+
+        Args:
+            address: host:port address
+
+        Returns:
+            The target's state, or None if it is not managed
+        """
+        target = self._targets.get(normalize_address(address))
+        if target is None:
+            return None
+        self._mark_lost(target)
+        return target.to_dict()
+
+    async def get_targets(self) -> List[Dict[str, Any]]:
+        """Get every target with its connection state."""
+        return [target.to_dict() for target in self._targets.values()]
+
+    async def ensure_connected(self, device_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Make sure a wireless device's transport works before it is used.
+
+        The device is pinged; if it does not answer it is reconnected at
+        once. Devices that are not wireless targets are left alone.
+
+        Args:
+            device_id: The device identifier
+            timeout: Seconds to wait for a reconnect (default: connect_timeout)
+
+        Returns:
+            False if the device is a wireless target that could not be reached
+        """
+        target = self._targets.get(device_id)
+        if target is None:
+            return True
+        if target.connected.is_set():
+            async with self._limit:
+                alive = await self.adb_repo.ping_device(device_id, self.keepalive_timeout)
+            if alive:
+                target.last_seen = time.time()
+                return True
+            self._mark_lost(target)
+        else:
+            target.wake.set()
+
+        try:
+            await asyncio.wait_for(target.connected.wait(), timeout or self.connect_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _add(self, address: str) -> _Target:
+        target = self._targets[address] = _Target(address)
+        target.task = asyncio.create_task(self._run(target))
+        return target
+
+    def _mark_lost(self, target: _Target) -> None:
+        """Have a target's task drop its transport and reconnect."""
+        if target.connected.is_set():
+            target.connected.clear()
+            target.lost.set()
+        else:
+            target.wake.set()
+
+    async def _run(self, target: _Target) -> None:
+        """Keep one target connected, retrying with backoff."""
+        delay = self.min_retry_delay
+        while True:
+            target.state = "connecting"
+            try:
+                async with self._limit:
+                    await self.adb_repo.connect_device(target.address, self.connect_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                target.attempts += 1
+                target.last_error = str(e)
+                target.attempted.set()
+            else:
+                target.state = "connected"
+                target.attempts = 0
+                target.keepalive_failures = 0
+                target.connects += 1
+                target.connected_at = datetime.datetime.now().isoformat()
+                target.last_seen = time.time()
+                target.lost.clear()
+                target.connected.set()
+                target.attempted.set()
+                delay = self.min_retry_delay
+                await self._send_update(target)
+                await self._refresh_devices()
+
+                await target.lost.wait()
+                target.lost.clear()
+                target.connected.clear()
+                target.drops += 1
+                target.last_error = "Device stopped answering"
+                try:
+                    # adb may still list the dead transport; drop it before reconnecting
+                    await self.adb_repo.disconnect_device(target.address)
+                except Exception as e:
+                    print(f"Error disconnecting {target.address}: {str(e)}")
+                await self._refresh_devices()
+                # Try again at once; back off only if that fails
+                continue
+
+            target.state = "backoff"
+            target.retry_at = time.time() + delay
+            await self._send_update(target)
+            target.wake.clear()
+            try:
+                # Jittered so targets that dropped together do not retry in lockstep
+                await asyncio.wait_for(target.wake.wait(), delay * random.uniform(0.8, 1.2))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _keepalive(self) -> None:
+        """Check connected targets every keepalive_interval."""
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            targets = [target for target in self._targets.values() if target.connected.is_set()]
+            if not targets:
+                continue
+            try:
+                adb_states = await self.adb_repo.get_device_states()
+                await asyncio.gather(*(self._check(target, adb_states.get(target.address))
+                                       for target in targets))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error checking wireless devices: {str(e)}")
+
+    async def _check(self, target: _Target, adb_state: Optional[str]) -> None:
+        """Keep-alive one target given its state in `adb devices`."""
+        if adb_state == "device":
+            async with self._limit:
+                alive = await self.adb_repo.ping_device(target.address, self.keepalive_timeout)
+        else:
+            # Waiting for debugging approval still means the transport is up
+            alive = adb_state == "unauthorized"
+
+        if alive:
+            target.keepalive_failures = 0
+            target.last_seen = time.time()
+            return
+        target.keepalive_failures += 1
+        if target.keepalive_failures >= self.keepalive_failures and target.connected.is_set():
+            self._mark_lost(target)
+
+    async def _refresh_devices(self) -> None:
+        """Have the device registry pick up a connected or dropped target without waiting for its next poll."""
+        if self.device_service:
+            try:
+                await self.device_service.refresh()
+            except Exception as e:
+                print(f"Error refreshing devices: {str(e)}")
+
+    async def _send_update(self, target: _Target) -> None:
+        """Publish a target's connection state."""
+        if self.event_bus:
+            await self.event_bus.publish(
+                {
+                    "type": "wireless_update",
+                    "device_id": target.address,
+                    "data": target.to_dict(),
+                    "timestamp": datetime.datetime.now().isoformat()
+                },
+                topics=[TOPIC_DEVICES, device_topic(target.address)]
+            )
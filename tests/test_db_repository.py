@@ -0,0 +1,41 @@
+import json
+import lzma
+import zlib
+
+import pytest
+
+from repositories.db_repository import (
+    FORMAT_LZMA, FORMAT_ZLIB, LZMA_MIN_SIZE, _encode_payload, _iter_payload
+)
+
+
+def _body(size: int) -> bytes:
+    apps = [f"com.example.app{index}" for index in range(size // 20)]
+    return json.dumps({"installed_apps": apps}).encode('utf-8')
+
+
+def test_iter_payload_round_trips_in_bounded_chunks():
+    body = _body(4 * LZMA_MIN_SIZE)
+    stored = _encode_payload(body)
+    assert stored[0] == FORMAT_LZMA
+
+    chunks = list(_iter_payload(stored, chunk_size=4096))
+    assert b''.join(chunks) == body
+    assert max(len(chunk) for chunk in chunks) <= 4096
+
+
+def test_iter_payload_rejects_truncated_lzma():
+    stored = _encode_payload(_body(4 * LZMA_MIN_SIZE))
+    assert stored[0] == FORMAT_LZMA
+
+    # Used to spin forever asking the decompressor for output it could not produce
+    with pytest.raises(lzma.LZMAError):
+        list(_iter_payload(stored[:len(stored) // 2], chunk_size=4096))
+
+
+def test_iter_payload_rejects_truncated_zlib():
+    stored = _encode_payload(_body(LZMA_MIN_SIZE // 2))
+    assert stored[0] == FORMAT_ZLIB
+
+    with pytest.raises(zlib.error):
+        list(_iter_payload(stored[:len(stored) // 2], chunk_size=4096))
@@ -0,0 +1,58 @@
+import asyncio
+
+from service.device_service import DeviceService, DeviceState
+
+
+class OneDeviceADBRepository:
+    """Lists one authorized device and records the poller's interval at every poll."""
+
+    def __init__(self):
+        self.service = None
+        self.intervals = []
+
+    async def start_adb_server(self) -> None:
+        pass
+
+    async def get_device_states(self):
+        self.intervals.append(self.service.current_polling_interval)
+        return {"SERIAL1": "device"}
+
+
+class FailingBrandFactory:
+    """Brand detection that always fails, like a device that never answers getprop."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def detect_brand(self, device_id: str) -> str:
+        self.attempts += 1
+        raise Exception("getprop timed out")
+
+
+def test_failing_onboarding_lets_poll_interval_grow():
+    adb_repo = OneDeviceADBRepository()
+    brand_factory = FailingBrandFactory()
+
+    async def main():
+        service = adb_repo.service = DeviceService(
+            adb_repo, brand_factory,
+            polling_interval=0.01, min_polling_interval=0.01, max_polling_interval=0.08,
+            onboarding_retry_delay=0.02, max_onboarding_retry_delay=0.04
+        )
+        service.set_listener_count("test", 1)
+        await service.start_device_polling()
+        try:
+            while len(adb_repo.intervals) < 10:
+                await asyncio.sleep(0.01)
+        finally:
+            await service.stop_device_polling()
+        return service
+
+    service = asyncio.run(main())
+
+    assert service.devices["SERIAL1"].state == DeviceState.FAILED
+    # Set-up is retried while the device keeps failing...
+    assert brand_factory.attempts > 2
+    # ...but the retries do not hold the poller at its fastest rate
+    assert adb_repo.intervals[1:5] == [0.01, 0.02, 0.04, 0.08]
+    assert adb_repo.intervals[5:] == [0.08] * (len(adb_repo.intervals) - 5)
@@ -0,0 +1,294 @@
+import asyncio
+import os
+import stat
+import sys
+import types
+
+import pytest
+
+from repositories.adb_repository import ADBRepository
+from repositories.db_repository import DBRepository
+from service import wireless_service
+from service.wireless_service import WirelessService
+
+# Stand-in for the adb client. Transports are files in STATE, like the
+# adb server's list; connect and the shell ping talk to a FakeAdbd over TCP,
+# and output mimics adb's, which exits 0 even when a connect fails.
+FAKE_ADB = '''#!{python}
+import os, socket, sys
+
+STATE = {state!r}
+
+def transport(address):
+    return os.path.join(STATE, address.replace(":", "_"))
+
+def exchange(address, request):
+    host, port = address.rsplit(":", 1)
+    try:
+        with socket.create_connection((host, int(port)), timeout=5) as sock:
+            # A hung adbd blocks the command until adb is killed, as on a dead Wi-Fi link
+            sock.settimeout(None)
+            sock.sendall(request)
+            return sock.makefile("rb").readline() == b"OK\\n"
+    except OSError:
+        return False
+
+args = sys.argv[1:]
+if args[0] == "connect":
+    address = args[1]
+    if os.path.exists(transport(address)):
+        print(f"already connected to {{address}}")
+    elif exchange(address, b"CNXN\\n"):
+        with open(transport(address), "w") as file:
+            file.write(address)
+        print(f"connected to {{address}}")
+    else:
+        print(f"failed to connect to '{{address}}': Connection refused")
+elif args[0] == "disconnect":
+    if os.path.exists(transport(args[1])):
+        os.unlink(transport(args[1]))
+    print(f"disconnected {{args[1]}}")
+elif args[0] == "devices":
+    print("List of devices attached")
+    for name in sorted(os.listdir(STATE)):
+        with open(os.path.join(STATE, name)) as file:
+            print(f"{{file.read()}}\\tdevice")
+    print()
+elif args[0] == "-s" and args[2:] == ["shell", "true"]:
+    sys.exit(0 if os.path.exists(transport(args[1])) and exchange(args[1], b"PING\\n") else 1)
+else:
+    sys.exit(f"unexpected adb command: {{args}}")
+'''
+
+
+@pytest.fixture
+def adb_repo(tmp_path):
+    """An ADBRepository running the fake adb."""
+    state = tmp_path / "transports"
+    state.mkdir()
+    adb = tmp_path / "adb"
+    adb.write_text(FAKE_ADB.format(python=sys.executable, state=str(state)))
+    adb.chmod(adb.stat().st_mode | stat.S_IXUSR)
+    return ADBRepository(adb_path=str(adb))
+
+
+class ConnectGate:
+    """Holds connection handshakes until released, counting how many are waiting."""
+
+    def __init__(self):
+        self.waiting = 0
+        self.opened = asyncio.Event()
+
+    async def pass_through(self) -> None:
+        self.waiting += 1
+        await self.opened.wait()
+
+
+class FakeAdbd:
+    """Local TCP stand-in for a device's adbd.
+
+    Answers every request line with "OK", holding connection handshakes at
+    the gate if one is given. While hang is set it accepts connections but
+    never answers, like a device whose Wi-Fi session dropped silently.
+    """
+
+    def __init__(self, gate: ConnectGate = None):
+        self.gate = gate
+        self.hang = False
+        self.address = None
+        self._server = None
+        self._released = asyncio.Event()
+
+    async def start(self, port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        self.address = f"127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+
+    async def stop(self) -> None:
+        self._released.set()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readline()
+            if self.hang:
+                await self._released.wait()
+                return
+            if request == b"CNXN\n" and self.gate:
+                await self.gate.pass_through()
+            writer.write(b"OK\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class RecordingDeviceService:
+    def __init__(self):
+        self.refreshes = 0
+
+    async def refresh(self) -> bool:
+        self.refreshes += 1
+        return True
+
+
+class RecordingEventBus:
+    def __init__(self):
+        self.retry_ats = []
+
+    async def publish(self, event, topics=None, coalesce_key=None) -> None:
+        data = event["data"]
+        if data["state"] == "backoff":
+            self.retry_ats.append(data["retry_at"])
+
+
+async def _closed_address() -> str:
+    """An address nothing listens on."""
+    adbd = FakeAdbd()
+    await adbd.start()
+    await adbd.stop()
+    return adbd.address
+
+
+def _run(tmp_path, adb_repo, scenario, **settings):
+    async def main():
+        db_repo = DBRepository(str(tmp_path / "scans.db"))
+        await db_repo.initialize()
+        settings.setdefault("keepalive_timeout", 0.5)
+        settings.setdefault("connect_timeout", 5)
+        service = WirelessService(adb_repo, db_repo, **settings)
+        try:
+            await scenario(service)
+        finally:
+            await service.stop()
+    asyncio.run(main())
+
+
+def test_adb_connect_output_and_ping(tmp_path, adb_repo):
+    async def main():
+        adbd = FakeAdbd()
+        await adbd.start()
+
+        await adb_repo.connect_device(adbd.address)
+        # "already connected to" is success too
+        await adb_repo.connect_device(adbd.address)
+        assert await adb_repo.get_device_states() == {adbd.address: "device"}
+        assert await adb_repo.ping_device(adbd.address, timeout=5) is True
+
+        adbd.hang = True
+        assert await adb_repo.ping_device(adbd.address, timeout=0.3) is False
+        adbd.hang = False
+
+        await adb_repo.disconnect_device(adbd.address)
+        assert await adb_repo.get_device_states() == {}
+        assert await adb_repo.ping_device(adbd.address, timeout=5) is False
+
+        # adb exits 0 here; the output is what tells failure apart
+        address = await _closed_address()
+        with pytest.raises(Exception, match=f"failed to connect to '{address}'"):
+            await adb_repo.connect_device(address)
+        await adbd.stop()
+
+    asyncio.run(main())
+
+
+def test_targets_connect_in_parallel(tmp_path, adb_repo):
+    device_service = RecordingDeviceService()
+
+    async def scenario(service):
+        gate = ConnectGate()
+        adbds = [FakeAdbd(gate) for _ in range(5)]
+        for adbd in adbds:
+            await adbd.start()
+
+        adding = asyncio.create_task(service.add_targets([adbd.address for adbd in adbds], wait=30))
+        # One at a time, the second handshake would never start before the first is let through
+        while gate.waiting < 5:
+            await asyncio.sleep(0.01)
+        gate.opened.set()
+        targets = await adding
+
+        assert [target["state"] for target in targets] == ["connected"] * 5
+        assert device_service.refreshes == 5
+        assert set(await service.db_repo.get_wireless_targets()) == {adbd.address for adbd in adbds}
+        assert set(await service.adb_repo.get_device_states()) == {adbd.address for adbd in adbds}
+        for adbd in adbds:
+            await adbd.stop()
+
+    _run(tmp_path, adb_repo, lambda service: asyncio.wait_for(scenario(service), 30),
+         device_service=device_service)
+
+
+def test_failed_keepalives_trigger_reconnect(tmp_path, adb_repo):
+    async def scenario(service):
+        adbd = FakeAdbd()
+        await adbd.start()
+        await service.add_targets([adbd.address], wait=10)
+        target = service._targets[adbd.address]
+        assert target.connected.is_set()
+
+        # The session dies silently: adb still lists the device
+        adbd.hang = True
+        for _ in range(2):
+            await service._check(target, "device")
+            assert target.connected.is_set()
+
+        # A successful keep-alive resets the count
+        adbd.hang = False
+        await service._check(target, "device")
+        assert target.keepalive_failures == 0
+
+        adbd.hang = True
+        for _ in range(3):
+            await service._check(target, "device")
+        assert not target.connected.is_set()
+
+        adbd.hang = False
+        await asyncio.wait_for(target.connected.wait(), 10)
+        assert target.drops == 1
+        assert target.connects == 2
+        await adbd.stop()
+
+    _run(tmp_path, adb_repo, scenario, keepalive_failures=3, min_retry_delay=0.05, max_retry_delay=0.1)
+
+
+def test_backoff_grows_up_to_max_retry_delay(tmp_path, adb_repo, monkeypatch):
+    # Without jitter and with the clock at 0, retry_at is exactly the wait
+    monkeypatch.setattr(wireless_service.random, "uniform", lambda low, high: 1.0)
+    monkeypatch.setattr(wireless_service, "time", types.SimpleNamespace(time=lambda: 0.0))
+    event_bus = RecordingEventBus()
+
+    async def scenario(service):
+        address = await _closed_address()
+        await service.add_targets([address])
+        while len(event_bus.retry_ats) < 5:
+            await asyncio.sleep(0.01)
+
+        assert event_bus.retry_ats[:5] == [0.05, 0.1, 0.2, 0.2, 0.2]
+        assert service._targets[address].attempts >= 5
+        assert service._targets[address].last_error == f"failed to connect to '{address}': Connection refused"
+
+    _run(tmp_path, adb_repo, lambda service: asyncio.wait_for(scenario(service), 30),
+         event_bus=event_bus, min_retry_delay=0.05, max_retry_delay=0.2)
+
+
+def test_ensure_connected_false_for_unreachable_target(tmp_path, adb_repo):
+    async def scenario(service):
+        # Never reachable
+        address = await _closed_address()
+        await service.add_targets([address], wait=10)
+        assert await service.ensure_connected(address, timeout=0.3) is False
+
+        # Connected, then stops answering and cannot be reconnected in time
+        adbd = FakeAdbd()
+        await adbd.start()
+        await service.add_targets([adbd.address], wait=10)
+        assert await service.ensure_connected(adbd.address) is True
+        adbd.hang = True
+        assert await service.ensure_connected(adbd.address, timeout=0.3) is False
+        assert not service._targets[adbd.address].connected.is_set()
+
+        # Devices that are not wireless targets are left alone
+        assert await service.ensure_connected("USB0001") is True
+        await adbd.stop()
+
+    _run(tmp_path, adb_repo, scenario, min_retry_delay=0.05, max_retry_delay=0.1)